@@ -0,0 +1,190 @@
+"""
+Badge engine: declarative rules from data/badges_config.json, checked against the rollups.
+
+Each rule tests one per-user metric (see METRICS) against "min" (inclusive)
+and optionally "below" (exclusive):
+
+    {"name": "Week Warrior", "description": "...", "metric": "active_days", "min": 7}
+
+An incoming event only re-checks the rules whose metric it can change: an
+unscored click can't move a module count, only a passed module can move
+eco impact. Awards are INSERT OR IGNORE against the unique
+(user_id, badge_name) index, so re-checking is harmless.
+
+Badges are never taken back, so a rule checked per event awards it the first
+time the metric qualifies. That is only right for metrics that never go down.
+An average score can (a first quiz at 95 is not a "maintained" 90%+), so
+average rules are left to the batch re-evaluation, which judges everyone's
+current average; run it on a schedule (nightly) and after a rule change with:
+
+    python -m ai_module.badges reevaluate
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from database.db_config import db_transaction, get_db_connection
+from ai_module.rollups import ECO_TOPICS, PASS_SCORE, Event, eco_impact, utc_timestamp
+
+BADGES_CONFIG = Path(__file__).resolve().parent.parent / "data" / "badges_config.json"
+CHUNK = 500  # users per query
+BULK_CHUNK = 10_000  # users per transaction in reevaluate_all
+
+# Which events can change a metric, from any event to passed modules only.
+# BATCH_ONLY metrics can go down, so they are never checked per event.
+ANY_EVENT, SCORED, SCORED_MODULE, PASSED_MODULE, BATCH_ONLY = range(5)
+
+# metric -> (events that can change it, value from a user's rollups)
+METRICS = {
+    "total_interactions": (ANY_EVENT, lambda u: u["total_interactions"]),
+    "active_days": (ANY_EVENT, lambda u: u["active_days"]),
+    "scored_interactions": (SCORED, lambda u: u["scored_interactions"]),
+    "average_score": (BATCH_ONLY, lambda u: round(u["score_sum"] / u["scored_interactions"], 2)
+                      if u["scored_interactions"] else 0),
+    "modules_attempted": (SCORED_MODULE, lambda u: u["modules_attempted"]),
+    "co2_saved_kg": (PASSED_MODULE, lambda u: u["eco"]["co2_saved_kg"]),
+    "water_saved_liters": (PASSED_MODULE, lambda u: u["eco"]["water_saved_liters"]),
+    "waste_reduced_kg": (PASSED_MODULE, lambda u: u["eco"]["waste_reduced_kg"]),
+    "trees_equivalent": (PASSED_MODULE, lambda u: u["eco"]["trees_equivalent"]),
+}
+
+
+NO_IMPACT = eco_impact({})
+
+
+class BadgeRule(NamedTuple):
+    name: str
+    description: str
+    metric: str
+    min: Optional[float] = None
+    below: Optional[float] = None
+
+    def matches(self, user: Dict) -> bool:
+        value = METRICS[self.metric][1](user)
+        return (self.min is None or value >= self.min) and (self.below is None or value < self.below)
+
+
+def load_rules(path: Path = BADGES_CONFIG) -> List[BadgeRule]:
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    rules = []
+    for entry in config.get("badges", []):
+        if entry.get("metric") not in METRICS:
+            raise ValueError(f"Badge {entry.get('name')!r}: unknown metric {entry.get('metric')!r}")
+        rules.append(BadgeRule(entry["name"], entry.get("description", ""), entry["metric"],
+                               entry.get("min"), entry.get("below")))
+    if len({rule.name for rule in rules}) != len(rules):
+        raise ValueError("Badge names must be unique")
+    return rules
+
+
+def event_level(event: Event) -> int:
+    _, _, module_id, score, _, _ = event
+    if score is None:
+        return ANY_EVENT
+    if module_id is None:
+        return SCORED
+    return PASSED_MODULE if score >= PASS_SCORE else SCORED_MODULE
+
+
+class BadgeEngine:
+    def __init__(self, rules: Optional[List[BadgeRule]] = None):
+        self.rules = load_rules() if rules is None else rules
+        # Rules an event of each level can affect
+        self._rules_by_level = [[r for r in self.rules if METRICS[r.metric][0] <= level]
+                                for level in range(PASSED_MODULE + 1)]
+
+    def evaluate_events(self, conn, events: Iterable[Event]) -> int:
+        """
+        Checks the rules these events can affect (never BATCH_ONLY ones), for their users.
+        Returns the number of new awards.
+        """
+        levels = {}
+        for event in events:
+            levels[event[0]] = max(levels.get(event[0], ANY_EVENT), event_level(event))
+        return self._award(conn, {user_id: self._rules_by_level[level]
+                                  for user_id, level in levels.items() if self._rules_by_level[level]})
+
+    def evaluate_users(self, conn, user_ids: Iterable[int]) -> int:
+        """Checks every rule for these users"""
+        return self._award(conn, {user_id: self.rules for user_id in user_ids})
+
+    def reevaluate_all(self, path=None) -> int:
+        """Checks every rule for every user with rollups, one transaction per chunk"""
+        user_ids = [row[0] for row in get_db_connection(path).execute("SELECT user_id FROM user_stats")]
+        awarded = 0
+        for i in range(0, len(user_ids), BULK_CHUNK):
+            with db_transaction(path) as conn:
+                awarded += self.evaluate_users(conn, user_ids[i:i + BULK_CHUNK])
+        return awarded
+
+    def _award(self, conn, rules_by_user: Dict[int, List[BadgeRule]]) -> int:
+        if not rules_by_user:
+            return 0
+        now = utc_timestamp()
+        awards = []
+        user_ids = list(rules_by_user)
+        for i in range(0, len(user_ids), CHUNK):
+            chunk = user_ids[i:i + CHUNK]
+            # Badges already earned need no check (most events come from users who have the easy ones)
+            marks = ",".join("?" * len(chunk))
+            held = {(row[0], row[1]) for row in conn.execute(
+                f"SELECT user_id, badge_name FROM user_badges WHERE user_id IN ({marks})", chunk)}
+            pending = {}
+            for user_id in chunk:
+                rules = [r for r in rules_by_user[user_id] if (user_id, r.name) not in held]
+                if rules:
+                    pending[user_id] = rules
+            need_eco = [u for u, rules in pending.items() if any(METRICS[r.metric][0] == PASSED_MODULE for r in rules)]
+            for user_id, user in self._load_users(conn, list(pending), need_eco).items():
+                awards.extend((user_id, rule.name, rule.description, now)
+                              for rule in pending[user_id] if rule.matches(user))
+        conn.executemany("""
+            INSERT OR IGNORE INTO user_badges (user_id, badge_name, description, earned_date)
+            VALUES (?, ?, ?, ?)
+        """, awards)
+        return len(awards)
+
+    @staticmethod
+    def _load_users(conn, user_ids: List[int], need_eco: List[int]) -> Dict[int, Dict]:
+        if not user_ids:
+            return {}
+        marks = ",".join("?" * len(user_ids))
+        users = {
+            row[0]: {
+                "total_interactions": row[1], "scored_interactions": row[2], "score_sum": row[3],
+                "modules_attempted": row[4], "active_days": row[5], "eco": NO_IMPACT,
+            }
+            for row in conn.execute(f"""
+                SELECT user_id, total_interactions, scored_interactions, score_sum, modules_attempted, active_days
+                FROM user_stats
+                WHERE user_id IN ({marks})
+            """, user_ids)
+        }
+        if need_eco:
+            completed = {}
+            marks = ",".join("?" * len(need_eco))
+            for user_id, topic, passed in conn.execute(f"""
+                SELECT ums.user_id, mt.topic, SUM(ums.passed)
+                FROM user_module_stats ums
+                JOIN module_topics mt ON mt.module_id = ums.module_id
+                WHERE ums.user_id IN ({marks}) AND ums.passed > 0
+                  AND mt.topic IN (?, ?, ?)
+                GROUP BY ums.user_id, mt.topic
+            """, (*need_eco, *ECO_TOPICS)):
+                completed.setdefault(user_id, {})[topic.lower()] = passed
+            for user_id, topics in completed.items():
+                if user_id in users:
+                    users[user_id]["eco"] = eco_impact(topics)
+        return users
+
+
+if __name__ == "__main__":
+    # python -m ai_module.badges reevaluate
+    from database.models import init_db
+    if sys.argv[1:] == ["reevaluate"]:
+        init_db()
+        print(f"Done: {BadgeEngine().reevaluate_all()} badges awarded.")
+    else:
+        print("usage: python -m ai_module.badges reevaluate")
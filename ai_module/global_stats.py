@@ -0,0 +1,114 @@
+"""
+Platform-wide stats for the landing page.
+
+The counters live in the single-row global_stats table, kept current by the
+ingestion path (ai_module/rollups.py), so reading them is one primary-key
+lookup. GlobalStatsCache serves them from memory and refreshes in the
+background once they are older than max_age (stale-while-revalidate), and can
+write each refresh to data/eco_stats.json for static hosting:
+
+    python -m ai_module.global_stats snapshot
+"""
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from database.db_config import close_db_connections, get_db_connection
+
+SNAPSHOT_PATH = Path(__file__).resolve().parent.parent / "data" / "eco_stats.json"
+MAX_AGE = float(os.environ.get("ECO_STATS_MAX_AGE", 10))
+# Set ECO_STATS_SNAPSHOT=1 to rewrite data/eco_stats.json on every refresh
+SNAPSHOT = os.environ.get("ECO_STATS_SNAPSHOT") == "1"
+
+
+def read_global_stats(conn) -> Dict:
+    row = conn.execute("""
+        SELECT scored_users, scored_interactions, score_sum, completions
+        FROM global_stats
+        WHERE id = 1
+    """).fetchone() or (0, 0, 0, 0)
+    users, interactions, score_sum, completions = row
+    total_co2_saved = completions * 50
+    total_water_saved = completions * 100
+    total_waste_reduced = completions * 25
+    return {
+        'total_users': users,
+        'total_interactions': interactions,
+        'average_platform_score': round(score_sum / interactions, 2) if interactions else 0,
+        'total_completions': completions,
+        'global_eco_impact': {
+            'co2_saved_kg': total_co2_saved,
+            'water_saved_liters': total_water_saved,
+            'waste_reduced_kg': total_waste_reduced,
+            'trees_equivalent': round(total_co2_saved / 21.7, 1) if total_co2_saved else 0
+        }
+    }
+
+
+def write_snapshot(stats: Dict, path: Path = SNAPSHOT_PATH):
+    # Written to a temporary file and renamed, so a static server never sees half a file
+    tmp = Path(f"{path}.tmp")
+    tmp.write_text(json.dumps(dict(stats, generated_at=int(time.time())), indent=2))
+    os.replace(tmp, path)
+
+
+class GlobalStatsCache:
+    """
+    In-memory global stats. The first call loads them; afterwards callers always
+    get the cached value at once, and a stale value triggers one background refresh.
+    """
+    def __init__(self, db_path=None, max_age: float = MAX_AGE,
+                 snapshot_path: Optional[Path] = SNAPSHOT_PATH if SNAPSHOT else None, clock=time.monotonic):
+        self.db_path = db_path
+        self.max_age = max_age
+        self.snapshot_path = snapshot_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self.refreshes = 0
+
+    def get(self) -> Dict:
+        with self._lock:
+            value, age = self._value, self._clock() - self._loaded_at
+            stale = value is not None and age > self.max_age and not self._refreshing
+            if stale:
+                self._refreshing = True
+        if value is None:
+            return self._load()
+        if stale:
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+        return value
+
+    def _load(self) -> Dict:
+        value = read_global_stats(get_db_connection(self.db_path))
+        with self._lock:
+            self._value, self._loaded_at = value, self._clock()
+            self.refreshes += 1
+        if self.snapshot_path:
+            write_snapshot(value, self.snapshot_path)
+        return value
+
+    def _background_refresh(self):
+        try:
+            self._load()
+        finally:
+            with self._lock:
+                self._refreshing = False
+            close_db_connections()
+
+
+if __name__ == "__main__":
+    # python -m ai_module.global_stats snapshot
+    from database.models import init_db
+    if sys.argv[1:] == ["snapshot"]:
+        init_db()
+        write_snapshot(read_global_stats(get_db_connection()))
+        print(f"Done: wrote {SNAPSHOT_PATH}.")
+    else:
+        print("usage: python -m ai_module.global_stats snapshot")
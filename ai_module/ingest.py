@@ -0,0 +1,184 @@
+"""
+Buffered ingestion of user_interactions for high-volume telemetry.
+
+Producers (request handlers) append events to a bounded in-process buffer and
+return at once; one background writer drains it in batches through
+rollups.record_interactions (a single executemany transaction per batch). A
+batch is written when BATCH_SIZE events are waiting or the oldest has waited
+FLUSH_INTERVAL seconds. When the buffer is full, submit() waits up to
+SUBMIT_TIMEOUT for room and then raises IngestQueueFull, so callers can shed
+load (the HTTP endpoint answers 503 with Retry-After). Pending events are
+flushed on close() and at interpreter exit.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+from database.db_config import close_db_connections, db_transaction
+from ai_module.rollups import Event, record_interactions, utc_timestamp
+
+MAX_PENDING = int(os.environ.get("INGEST_MAX_PENDING", 100_000))
+BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", 5000))
+FLUSH_INTERVAL = float(os.environ.get("INGEST_FLUSH_INTERVAL", 0.25))
+SUBMIT_TIMEOUT = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueFull(Exception):
+    """The buffer stayed full for the whole submit timeout"""
+
+
+def parse_event(data: Dict) -> Event:
+    """Validates one event posted by a client; the server assigns the timestamp"""
+    if not isinstance(data, dict):
+        raise ValueError("Event must be an object")
+    user_id, interaction_type = data.get("user_id"), data.get("interaction_type")
+    if not isinstance(user_id, int) or isinstance(user_id, bool):
+        raise ValueError("user_id must be an integer")
+    if not isinstance(interaction_type, str) or not interaction_type:
+        raise ValueError("interaction_type must be a non-empty string")
+    module_id, score, time_spent = data.get("module_id"), data.get("score"), data.get("time_spent")
+    if module_id is not None and (not isinstance(module_id, int) or isinstance(module_id, bool)):
+        raise ValueError("module_id must be an integer")
+    if score is not None and (not isinstance(score, (int, float)) or isinstance(score, bool)):
+        raise ValueError("score must be a number")
+    if time_spent is not None and (not isinstance(time_spent, int) or isinstance(time_spent, bool)):
+        raise ValueError("time_spent must be an integer")
+    return (user_id, interaction_type, module_id, score, time_spent, utc_timestamp())
+
+
+class InteractionIngestor:
+    def __init__(self, db_path=None, max_pending: int = MAX_PENDING, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, listeners: Optional[List[Callable]] = None):
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Called as listener(conn, batch) after each batch is recorded, in the same transaction
+        self.listeners = listeners if listeners is not None else []
+        self._pending = deque()
+        self._oldest = 0.0      # when the oldest pending event arrived
+        self._writing = 0       # events taken by the writer but not yet committed
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self.accepted = 0
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="interaction-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+        return self
+
+    def submit(self, events: Iterable[Event], timeout: float = SUBMIT_TIMEOUT) -> int:
+        """Queues events as one unit (all or none). Raises IngestQueueFull under sustained overload."""
+        events = list(events)
+        if len(events) > self.max_pending:
+            raise ValueError(f"At most {self.max_pending} events per submit")
+        if self._thread is None:
+            self.start()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._pending) + len(events) > self.max_pending and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += len(events)
+                    raise IngestQueueFull("Interaction buffer is full")
+                self._cond.wait(remaining)
+            if self._closed:
+                raise RuntimeError("Ingestor is closed")
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(events)
+            self.accepted += len(events)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return len(events)
+
+    def _next_batch(self) -> List[Event]:
+        with self._cond:
+            while not self._closed:
+                if len(self._pending) >= self.batch_size:
+                    break
+                waited = time.monotonic() - self._oldest
+                if self._pending and waited >= self.flush_interval:
+                    break
+                self._cond.wait(self.flush_interval - waited if self._pending else self.flush_interval)
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            self._oldest = time.monotonic()
+            self._writing = len(batch)
+            # Room was freed: wake producers waiting on a full buffer
+            self._cond.notify_all()
+            return batch
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    if self._closed:
+                        return
+                    continue
+                try:
+                    with db_transaction(self.db_path) as conn:
+                        record_interactions(conn, batch)
+                        for listener in self.listeners:
+                            listener(conn, batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                except Exception as e:
+                    self.failed += len(batch)
+                    logger.error(f"Dropped {len(batch)} interactions: {e}")
+                finally:
+                    with self._cond:
+                        self._writing = 0
+                        self._cond.notify_all()
+        finally:
+            close_db_connections()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Waits until everything submitted so far is committed"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            # Don't wait out the flush interval for a partial batch
+            self._oldest = 0.0
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 30.0):
+        """Stops accepting events, writes what is pending and stops the writer"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "max_pending": self.max_pending,
+                "accepted": self.accepted,
+                "written": self.written,
+                "batches": self.batches,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
@@ -0,0 +1,267 @@
+"""
+Item-item module recommendations: students who attempted X also attempted Y.
+
+The model is built offline from which modules each user has attempted (the
+scored (user, module) pairs behind user_module_stats). Co-occurrence counts
+are accumulated with dense NumPy blocks of users, turned into cosine
+similarities, and the TOP_N neighbours of every module are written to one
+compact .npy file that workers memory-map. Serving a user's next modules is a
+primary-key read of their attempts plus a few array lookups.
+
+The counts are kept in a state file, so a refresh only folds in the
+interactions logged since the previous run instead of rereading everything:
+
+    python -m ai_module.recommender rebuild   # from scratch
+    python -m ai_module.recommender refresh   # new interactions only
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database.db_config import BASE_DIR, get_db_connection
+
+MODEL_PATH = Path(os.environ.get("RECOMMENDER_MODEL_PATH", BASE_DIR / "module_similarity.npy"))
+STATE_PATH = Path(os.environ.get("RECOMMENDER_STATE_PATH", BASE_DIR / "recommender_state.npz"))
+TOP_N = 20  # neighbours kept per module
+RELOAD_INTERVAL = 5.0  # seconds between checks for a newer model file
+BLOCK_CELLS = 1 << 22  # cells per dense block of users x modules (16 MB of float32)
+
+
+def _pair_keys(users: np.ndarray, modules: np.ndarray) -> np.ndarray:
+    # (user, module) as one sortable int64, grouped by user
+    return (users.astype(np.int64) << 32) | modules.astype(np.int64)
+
+
+def _in_sorted(values: np.ndarray, sorted_values: np.ndarray) -> np.ndarray:
+    if not len(sorted_values):
+        return np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[pos] == values
+
+
+class CooccurrenceState:
+    """
+    Co-occurrence counts between modules (the diagonal is each module's user count),
+    the (user, module) pairs already counted and the last user_interactions id seen.
+    """
+    def __init__(self, module_ids=None, counts=None, pairs=None, watermark: int = 0):
+        self.module_ids = np.zeros(0, dtype=np.int64) if module_ids is None else module_ids
+        self.counts = np.zeros((0, 0), dtype=np.int64) if counts is None else counts
+        self.pairs = np.zeros(0, dtype=np.int64) if pairs is None else pairs
+        self.watermark = watermark
+
+    @classmethod
+    def load(cls, path: Path = STATE_PATH) -> "CooccurrenceState":
+        with np.load(path) as data:
+            return cls(data["module_ids"], data["counts"], data["pairs"], int(data["watermark"]))
+
+    def save(self, path: Path = STATE_PATH):
+        tmp = Path(f"{path}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, module_ids=self.module_ids, counts=self.counts, pairs=self.pairs,
+                     watermark=np.int64(self.watermark))
+        os.replace(tmp, path)
+
+    def _ensure_modules(self, module_ids: np.ndarray):
+        merged = np.union1d(self.module_ids, module_ids)
+        if len(merged) == len(self.module_ids):
+            return
+        counts = np.zeros((len(merged), len(merged)), dtype=np.int64)
+        old = np.searchsorted(merged, self.module_ids)
+        counts[np.ix_(old, old)] = self.counts
+        self.module_ids, self.counts = merged, counts
+
+    def _accumulate(self, keys: np.ndarray, sign: int):
+        """Adds (or removes) X^T X for the users in sorted pair keys, X being their 0/1 module rows"""
+        if not len(keys):
+            return
+        _, rows = np.unique(keys >> 32, return_inverse=True)
+        cols = np.searchsorted(self.module_ids, keys & 0xFFFFFFFF)
+        block = max(1, BLOCK_CELLS // len(self.module_ids))
+        bounds = np.searchsorted(rows, np.arange(0, rows[-1] + block + 1, block))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if start == end:
+                continue
+            first = rows[start]
+            x = np.zeros((rows[end - 1] - first + 1, len(self.module_ids)), dtype=np.float32)
+            x[rows[start:end] - first, cols[start:end]] = 1
+            self.counts += sign * (x.T @ x).astype(np.int64)
+
+    def add_pairs(self, users, modules) -> int:
+        """Counts (user, module) pairs not seen before. Returns how many were new."""
+        keys = np.unique(_pair_keys(np.asarray(users), np.asarray(modules)))
+        new = keys[~_in_sorted(keys, self.pairs)]
+        if not len(new):
+            return 0
+        self._ensure_modules(np.unique(new & 0xFFFFFFFF))
+        # Swap each affected user's old module row for the new one
+        affected = np.unique(new >> 32)
+        before = self.pairs[_in_sorted(self.pairs >> 32, affected)]
+        self.pairs = np.union1d(self.pairs, new)
+        after = self.pairs[_in_sorted(self.pairs >> 32, affected)]
+        self._accumulate(before, -1)
+        self._accumulate(after, 1)
+        return len(new)
+
+    def similarities(self, top_n: int = TOP_N) -> np.ndarray:
+        """One row per module: its user count and top_n neighbours by cosine similarity"""
+        size = len(self.module_ids)
+        model = np.zeros(size, dtype=model_dtype(top_n))
+        model["module_id"] = self.module_ids
+        model["neighbors"] = -1
+        if not size:
+            return model
+        users = np.diag(self.counts).astype(np.float64)
+        model["count"] = users
+        norms = np.sqrt(users)
+        k = min(top_n, size - 1)
+        block = max(1, BLOCK_CELLS // size)
+        for start in range(0, size, block):
+            end = min(start + block, size)
+            denom = np.outer(norms[start:end], norms)
+            sim = np.divide(self.counts[start:end], denom, out=np.zeros(denom.shape), where=denom > 0)
+            sim[np.arange(end - start), np.arange(start, end)] = 0  # not its own neighbour
+            if k <= 0:
+                continue
+            top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(sim, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+            model["neighbors"][start:end, :k] = np.where(top_scores > 0, self.module_ids[top], -1)
+            model["scores"][start:end, :k] = top_scores
+        return model
+
+
+def model_dtype(top_n: int = TOP_N) -> np.dtype:
+    return np.dtype([("module_id", "<i4"), ("count", "<i4"),
+                     ("neighbors", "<i4", (top_n,)), ("scores", "<f4", (top_n,))])
+
+
+def write_model(model: np.ndarray, path: Path = MODEL_PATH):
+    # Renamed into place: workers still mapping the old file keep reading it safely
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, model)
+    os.replace(tmp, path)
+
+
+def rebuild(path=None, model_path: Path = MODEL_PATH, state_path: Path = STATE_PATH) -> CooccurrenceState:
+    """Builds the model from every attempted (user, module) pair"""
+    conn = get_db_connection(path)
+    # Read first: pairs logged after it are counted now and skipped as known by the next refresh
+    watermark = conn.execute("SELECT COALESCE(MAX(id), 0) FROM user_interactions").fetchone()[0]
+    pairs = np.array(conn.execute("SELECT user_id, module_id FROM user_module_stats").fetchall(),
+                     dtype=np.int64).reshape(-1, 2)
+    state = CooccurrenceState(watermark=watermark)
+    state.add_pairs(pairs[:, 0], pairs[:, 1])
+    state.save(state_path)
+    write_model(state.similarities(), model_path)
+    return state
+
+
+def refresh(path=None, model_path: Path = MODEL_PATH, state_path: Path = STATE_PATH) -> int:
+    """Folds in interactions logged since the last rebuild/refresh. Returns the number of new pairs."""
+    if not state_path.exists():
+        return len(rebuild(path, model_path, state_path).pairs)
+    state = CooccurrenceState.load(state_path)
+    rows = np.array(get_db_connection(path).execute("""
+        SELECT id, user_id, module_id
+        FROM user_interactions
+        WHERE id > ? AND module_id IS NOT NULL AND score IS NOT NULL
+    """, (state.watermark,)).fetchall(), dtype=np.int64).reshape(-1, 3)
+    if not len(rows):
+        return 0
+    added = state.add_pairs(rows[:, 1], rows[:, 2])
+    state.watermark = int(rows[:, 0].max())
+    state.save(state_path)
+    if added:
+        write_model(state.similarities(), model_path)
+    return added
+
+
+class ModuleRecommender:
+    """Serves recommendations from the memory-mapped model, picking up new files as they are written"""
+    def __init__(self, db_path=None, model_path: Path = MODEL_PATH, reload_interval: float = RELOAD_INTERVAL):
+        self.db_path = db_path
+        self.model_path = model_path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._model = None
+        self._popular = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def model(self) -> Optional[np.ndarray]:
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return self._model
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.model_path).st_mtime_ns
+            except FileNotFoundError:
+                return self._model
+            if mtime != self._mtime:
+                model = np.load(self.model_path, mmap_mode="r")
+                self._popular = model["module_id"][np.argsort(-model["count"], kind="stable")]
+                self._model, self._mtime = model, mtime
+            return self._model
+
+    def similar(self, module_id: int, limit: int = 5) -> List[Dict]:
+        model = self.model()
+        if model is None:
+            return []
+        row = np.searchsorted(model["module_id"], module_id)
+        if row == len(model) or model["module_id"][row] != module_id:
+            return []
+        return [{"module_id": int(m), "score": round(float(s), 4)}
+                for m, s in zip(model["neighbors"][row], model["scores"][row]) if m >= 0][:limit]
+
+    def recommend(self, user_id: int, limit: int = 5) -> List[Dict]:
+        """Modules the user hasn't attempted, ranked by similarity to the ones they have"""
+        model = self.model()
+        if model is None:
+            return []
+        conn = get_db_connection(self.db_path)
+        attempted = np.array([row[0] for row in conn.execute(
+            "SELECT module_id FROM user_module_stats WHERE user_id = ?", (user_id,))], dtype=np.int64)
+        rows = np.searchsorted(model["module_id"], attempted)
+        known = rows < len(model)
+        known[known] = model["module_id"][rows[known]] == attempted[known]
+        rows = rows[known]
+
+        scores = {}
+        for neighbor, score in zip(model["neighbors"][rows].ravel(), model["scores"][rows].ravel()):
+            if neighbor >= 0:
+                scores[int(neighbor)] = scores.get(int(neighbor), 0.0) + float(score)
+        for module_id in attempted:
+            scores.pop(int(module_id), None)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        # New users and short lists are topped up with the most attempted modules
+        if len(ranked) < limit:
+            seen = set(scores) | set(attempted.tolist())
+            ranked += [(int(m), 0.0) for m in self._popular if int(m) not in seen][:limit - len(ranked)]
+
+        titles = {row[0]: row[1] for row in conn.execute(
+            f"SELECT id, title FROM learning_modules WHERE id IN ({','.join('?' * len(ranked))})",
+            [m for m, _ in ranked])} if ranked else {}
+        return [{"module_id": m, "title": titles.get(m), "score": round(s, 4)} for m, s in ranked]
+
+
+if __name__ == "__main__":
+    # python -m ai_module.recommender rebuild|refresh
+    from database.models import init_db
+    if sys.argv[1:] == ["rebuild"]:
+        init_db()
+        state = rebuild()
+        print(f"Done: {len(state.module_ids)} modules, {len(state.pairs)} (user, module) pairs.")
+    elif sys.argv[1:] == ["refresh"]:
+        init_db()
+        print(f"Done: {refresh()} new (user, module) pairs.")
+    else:
+        print("usage: python -m ai_module.recommender rebuild|refresh")
@@ -0,0 +1,184 @@
+"""
+Per-user rollups of user_interactions, so dashboards never aggregate the raw log.
+
+    user_stats         one row per user: totals behind get_user_progress
+    user_daily_stats   one row per user per day: weekly progress, active days
+    user_module_stats  one row per user per module (scored attempts only):
+                       modules attempted, topic performance, eco impact
+    global_stats       a single row of platform-wide counters
+
+record_interactions() inserts events and updates every rollup in the caller's
+transaction. rebuild_rollups() recomputes them from user_interactions, for
+existing data or after a bulk fix:  python -m ai_module.rollups rebuild
+"""
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from database.db_config import db_transaction
+
+PASS_SCORE = 70  # a scored interaction at or above this counts as a completion
+ECO_TOPICS = ("solar", "carbon", "sustainability")
+
+# (user_id, interaction_type, module_id, score, time_spent, timestamp)
+Event = Tuple[int, str, Optional[int], Optional[float], Optional[int], str]
+
+
+def utc_timestamp() -> str:
+    """Same format as SQLite's datetime('now')"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def eco_impact(completed: Dict[str, int]) -> Dict:
+    """Simulated environmental impact of the modules passed, counted per ECO_TOPICS topic"""
+    co2_saved = completed.get("solar", 0) * 50  # 50kg CO2 per solar module
+    water_saved = completed.get("carbon", 0) * 100  # 100L water per carbon module
+    waste_reduced = completed.get("sustainability", 0) * 25  # 25kg waste per sustainability module
+    return {
+        'co2_saved_kg': co2_saved,
+        'water_saved_liters': water_saved,
+        'waste_reduced_kg': waste_reduced,
+        'trees_equivalent': round(co2_saved / 21.7, 1) if co2_saved else 0  # 1 tree = ~21.7kg CO2/year
+    }
+
+
+def record_interactions(conn, events: Iterable[Event]) -> int:
+    """Inserts events into user_interactions and folds them into the rollups. Returns the event count."""
+    events = list(events)
+    if not events:
+        return 0
+    conn.executemany("""
+        INSERT INTO user_interactions (user_id, interaction_type, module_id, score, time_spent, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, events)
+
+    # Aggregate the batch first, so each rollup row is written once
+    users = defaultdict(lambda: [0, 0, 0.0, 0, 0, 0, ""])  # total, scored, score_sum, scored_time, modules, days, last
+    days = defaultdict(lambda: [0, 0.0, 0])                # interactions, score_sum, time_spent
+    modules = defaultdict(lambda: [0, 0.0, 0])             # attempts, score_sum, passed
+    for user_id, _, module_id, score, time_spent, timestamp in events:
+        user = users[user_id]
+        user[0] += 1
+        user[6] = max(user[6], timestamp)
+        day = days[(user_id, timestamp[:10])]
+        day[0] += 1
+        day[1] += score or 0
+        day[2] += time_spent or 0
+        if score is not None:
+            user[1] += 1
+            user[2] += score
+            user[3] += time_spent or 0
+            if module_id is not None:
+                module = modules[(user_id, module_id)]
+                module[0] += 1
+                module[1] += score
+                module[2] += score >= PASS_SCORE
+
+    # Days and modules seen for the first time add to the user's distinct counts,
+    # a user's first scored interaction to the platform's
+    new_scored_users = 0
+    for user_id, values in users.items():
+        if values[1]:
+            row = conn.execute("SELECT scored_interactions FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+            new_scored_users += row is None or row[0] == 0
+    for user_id, day in days:
+        if conn.execute("SELECT 1 FROM user_daily_stats WHERE user_id = ? AND day = ?", (user_id, day)).fetchone() is None:
+            users[user_id][5] += 1
+    for user_id, module_id in modules:
+        if conn.execute("SELECT 1 FROM user_module_stats WHERE user_id = ? AND module_id = ?",
+                        (user_id, module_id)).fetchone() is None:
+            users[user_id][4] += 1
+
+    conn.executemany("""
+        INSERT INTO user_stats (user_id, total_interactions, scored_interactions, score_sum, scored_time,
+                                modules_attempted, active_days, last_interaction)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            total_interactions = total_interactions + excluded.total_interactions,
+            scored_interactions = scored_interactions + excluded.scored_interactions,
+            score_sum = score_sum + excluded.score_sum,
+            scored_time = scored_time + excluded.scored_time,
+            modules_attempted = modules_attempted + excluded.modules_attempted,
+            active_days = active_days + excluded.active_days,
+            last_interaction = MAX(last_interaction, excluded.last_interaction)
+    """, [(user_id, *values) for user_id, values in users.items()])
+    conn.executemany("""
+        INSERT INTO user_daily_stats (user_id, day, interactions, score_sum, time_spent)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day) DO UPDATE SET
+            interactions = interactions + excluded.interactions,
+            score_sum = score_sum + excluded.score_sum,
+            time_spent = time_spent + excluded.time_spent
+    """, [(*key, *values) for key, values in days.items()])
+    conn.executemany("""
+        INSERT INTO user_module_stats (user_id, module_id, attempts, score_sum, passed)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, module_id) DO UPDATE SET
+            attempts = attempts + excluded.attempts,
+            score_sum = score_sum + excluded.score_sum,
+            passed = passed + excluded.passed
+    """, [(*key, *values) for key, values in modules.items()])
+    conn.execute("""
+        UPDATE global_stats SET
+            scored_users = scored_users + ?,
+            scored_interactions = scored_interactions + ?,
+            score_sum = score_sum + ?,
+            completions = completions + ?
+        WHERE id = 1
+    """, (new_scored_users, sum(u[1] for u in users.values()), sum(u[2] for u in users.values()),
+          sum(1 for e in events if e[3] is not None and e[3] >= PASS_SCORE)))
+    return len(events)
+
+
+def rebuild_rollups(path=None) -> int:
+    """Recomputes every rollup table from user_interactions. Returns the number of users."""
+    with db_transaction(path) as conn:
+        conn.execute("DELETE FROM user_stats")
+        conn.execute("DELETE FROM user_daily_stats")
+        conn.execute("DELETE FROM user_module_stats")
+        conn.execute("DELETE FROM global_stats")
+        conn.execute("""
+            INSERT INTO user_stats (user_id, total_interactions, scored_interactions, score_sum, scored_time,
+                                    modules_attempted, active_days, last_interaction)
+            SELECT user_id,
+                   COUNT(*),
+                   COUNT(score),
+                   COALESCE(SUM(score), 0),
+                   COALESCE(SUM(CASE WHEN score IS NOT NULL THEN time_spent END), 0),
+                   COUNT(DISTINCT CASE WHEN score IS NOT NULL THEN module_id END),
+                   COUNT(DISTINCT DATE(timestamp)),
+                   MAX(timestamp)
+            FROM user_interactions
+            GROUP BY user_id
+        """)
+        conn.execute("""
+            INSERT INTO user_daily_stats (user_id, day, interactions, score_sum, time_spent)
+            SELECT user_id, DATE(timestamp), COUNT(*), SUM(COALESCE(score, 0)), SUM(COALESCE(time_spent, 0))
+            FROM user_interactions
+            GROUP BY user_id, DATE(timestamp)
+        """)
+        conn.execute("""
+            INSERT INTO user_module_stats (user_id, module_id, attempts, score_sum, passed)
+            SELECT user_id, module_id, COUNT(*), SUM(score), SUM(score >= ?)
+            FROM user_interactions
+            WHERE score IS NOT NULL AND module_id IS NOT NULL
+            GROUP BY user_id, module_id
+        """, (PASS_SCORE,))
+        conn.execute("""
+            INSERT INTO global_stats (id, scored_users, scored_interactions, score_sum, completions)
+            SELECT 1, COUNT(DISTINCT user_id), COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(score >= ?), 0)
+            FROM user_interactions
+            WHERE score IS NOT NULL
+        """, (PASS_SCORE,))
+        return conn.execute("SELECT COUNT(*) FROM user_stats").fetchone()[0]
+
+
+if __name__ == "__main__":
+    # python -m ai_module.rollups rebuild
+    from database.models import init_db
+    if sys.argv[1:] == ["rebuild"]:
+        init_db()
+        print(f"Done: rollups rebuilt for {rebuild_rollups()} users.")
+    else:
+        print("usage: python -m ai_module.rollups rebuild")
@@ -0,0 +1,76 @@
+"""
+Bytes written per save: full /api/save rows vs journaled autosave deltas.
+
+Run from the repo root:  python -m benchmarks.bench_autosave
+"""
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from database.db_config import db_transaction, get_db_connection, close_db_connections
+from database.models import _create_schema
+from database import save_store
+from simulations.procedural_engine import generate_procedural_config
+
+SAVES = 2000
+
+
+def wal_pages(conn):
+    # Every page a commit writes lands in the WAL first; count them and reset
+    _, frames, _ = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return frames
+
+
+def report(label, request_bytes, elapsed, pages):
+    print(f"{label:<16} {request_bytes:8.0f} B request  {elapsed / SAVES * 1e6:6.0f} us/save"
+          f"  {pages / SAVES:5.2f} pages written/save")
+
+
+def main():
+    rng = random.Random(0)
+    config = generate_procedural_config("city")
+    w, h = config["grid"]["width"], config["grid"]["height"]
+    grid = [[rng.choice(config["entities"]) if rng.random() < 0.4 else None for _ in range(w)] for _ in range(h)]
+    state = {"grid": grid, "resources": dict(config["global_resources"]), "gameDay": 1, "history": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "autosave.db")
+        conn = get_db_connection(path)
+        conn.execute("PRAGMA wal_autocheckpoint=0")
+        _create_schema(conn.cursor())
+        conn.commit()
+
+        with db_transaction(path) as conn:
+            base_id = save_store.insert_save(conn, "a@school.test", "bench", config, state)
+        wal_pages(conn)
+
+        start = time.perf_counter()
+        payload = 0
+        for day in range(SAVES):
+            delta = {"place": [[rng.randrange(w), rng.randrange(h), rng.choice(config["entities"])["id"]]],
+                     "resources": {"score": 3}, "gameDay": day + 2}
+            payload += len(json.dumps({"email": "a@school.test", "changes": delta}))
+            with db_transaction(path) as conn:
+                save_store.append_delta(conn, base_id, "a@school.test", delta)
+        elapsed = time.perf_counter() - start
+        stored = sum(len(r[0]) for r in conn.execute("SELECT delta_json FROM save_journal"))
+        stored += len(conn.execute("SELECT state_blob FROM simulation_saves WHERE id = ?", (base_id,)).fetchone()[0])
+        report("autosave delta", payload / SAVES, elapsed, wal_pages(conn))
+        print(f"  (compacting every {save_store.COMPACT_EVERY}; journal + snapshot now {stored} B)")
+
+        state_full = save_store.load_save(conn, base_id)[1]
+        start = time.perf_counter()
+        payload = len(json.dumps({"email": "a@school.test", "title": "bench", "config": config, "state": state_full}))
+        for _ in range(SAVES):
+            with db_transaction(path) as conn:
+                save_store.insert_save(conn, "a@school.test", "bench", config, state_full)
+        elapsed = time.perf_counter() - start
+        report("full save", payload, elapsed, wal_pages(conn))
+        close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Badge evaluation for 100k users (1M interactions): the old check_and_award_badges
+(full get_user_progress, then SELECT COUNT + INSERT per badge) on a sample vs
+the rule engine's bulk re-evaluation of everyone. Checks both award the same
+badges, times per-event evaluation during ingest, and checks per-event awards
+are ones the bulk pass grants too.
+
+Run from the repo root:  python -m benchmarks.bench_badges
+"""
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+USERS = 100_000
+INTERACTIONS = 1_000_000
+MODULES = 40
+TOPICS = ["solar", "carbon", "sustainability", "water", "wind", "biodiversity", "recycling"]
+SAMPLE = 1_000
+
+
+def legacy_badges(progress):
+    """The rules check_and_award_badges used to hardcode"""
+    earned = set()
+    if progress.get('modules_attempted', 0) >= 1:
+        earned.add("First Steps")
+    streak = progress.get('learning_streak_days', 0)
+    if streak >= 7:
+        earned.add("Week Warrior")
+    if streak >= 30:
+        earned.add("Month Master")
+    avg_score = progress.get('average_score', 0)
+    if avg_score >= 90:
+        earned.add("Excellence")
+    elif avg_score >= 80:
+        earned.add("High Achiever")
+    eco_impact = progress.get('eco_impact', {})
+    if eco_impact.get('co2_saved_kg', 0) >= 500:
+        earned.add("Carbon Saver")
+    if eco_impact.get('trees_equivalent', 0) >= 10:
+        earned.add("Forest Friend")
+    return earned
+
+
+def legacy_award(conn, user_id, badge_name):
+    if conn.execute("SELECT COUNT(*) FROM user_badges WHERE user_id = ? AND badge_name = ?",
+                    (user_id, badge_name)).fetchone()[0] == 0:
+        conn.execute("INSERT INTO user_badges (user_id, badge_name, earned_date) VALUES (?, ?, datetime('now'))",
+                     (user_id, badge_name))
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["ECOLEARN_DB_PATH"] = path
+    import logging
+    from database.db_config import db_transaction, get_db_connection
+    from database.models import init_db
+    from ai_module.analytics import LearningAnalytics
+    from ai_module.badges import BadgeEngine
+    from ai_module.rollups import rebuild_rollups, record_interactions
+
+    init_db(path)
+    rng = random.Random(0)
+    with db_transaction(path) as conn:
+        conn.executemany("INSERT INTO learning_modules (id, title, topics) VALUES (?, ?, ?)",
+                         [(m, f"Module {m}", json.dumps(rng.sample(TOPICS, 2))) for m in range(1, MODULES + 1)])
+    # Skewed activity, so a share of users earn the streak and eco badges
+    weights = [1 / (u ** 0.5) for u in range(1, USERS + 1)]
+    users = rng.choices(range(1, USERS + 1), weights, k=INTERACTIONS)
+    now = datetime.now(timezone.utc)
+    events = []
+    for user_id in users:
+        ts = (now - timedelta(minutes=rng.randrange(60 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S")
+        scored = rng.random() < 0.8
+        events.append((user_id, "quiz" if scored else "view", rng.randrange(1, MODULES + 1),
+                       round(rng.uniform(50, 100), 1) if scored else None, rng.randrange(1, 30), ts))
+    with db_transaction(path) as conn:
+        conn.executemany("""
+            INSERT INTO user_interactions (user_id, interaction_type, module_id, score, time_spent, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, events)
+    rebuild_rollups(path)
+
+    analytics = LearningAnalytics(path)
+    logging.getLogger("ai_module.analytics").setLevel(logging.WARNING)
+    engine = BadgeEngine()
+    conn = get_db_connection(path)
+    total_users = conn.execute("SELECT COUNT(*) FROM user_stats").fetchone()[0]
+    sample = rng.sample(range(1, total_users + 1), SAMPLE)
+
+    start = time.perf_counter()
+    expected = {}
+    with db_transaction(path) as tx:
+        for user_id in sample:
+            expected[user_id] = legacy_badges(analytics.get_user_progress(user_id))
+            for badge in expected[user_id]:
+                legacy_award(tx, user_id, badge)
+    legacy_s = (time.perf_counter() - start) * total_users / SAMPLE
+    conn.execute("DELETE FROM user_badges")
+    conn.commit()
+
+    start = time.perf_counter()
+    awarded = engine.reevaluate_all(path)
+    bulk_s = time.perf_counter() - start
+    print(f"evaluate {total_users:,} users: ~{legacy_s:.0f} s with per-user progress + COUNT/INSERT "
+          f"(extrapolated from {SAMPLE:,}) -> {bulk_s:.1f} s bulk ({awarded:,} badges)")
+
+    for user_id in sample:
+        got = {row[0] for row in conn.execute("SELECT badge_name FROM user_badges WHERE user_id = ?", (user_id,))}
+        assert got == expected[user_id], (user_id, got, expected[user_id])
+    start = time.perf_counter()
+    assert engine.reevaluate_all(path) == 0
+    print(f"same badges as the old rules for {SAMPLE:,} users; a second pass awards nothing "
+          f"({time.perf_counter() - start:.1f} s)")
+
+    # Ingest cost of checking the affected rules per batch
+    fresh = [(rng.randrange(1, USERS + 1), *e[1:]) for e in events[:100_000]]
+    timings = {}
+    for name, with_badges in (("rollups only", False), ("rollups + badges", True)):
+        start = time.perf_counter()
+        for i in range(0, len(fresh), 5_000):
+            with db_transaction(path) as tx:
+                record_interactions(tx, fresh[i:i + 5_000])
+                if with_badges:
+                    engine.evaluate_events(tx, fresh[i:i + 5_000])
+        timings[name] = len(fresh) / (time.perf_counter() - start)
+    print("ingest: " + ", ".join(f"{name} {rate:,.0f} events/sec" for name, rate in timings.items()))
+
+    # Per-event awards for new users, then the same users re-evaluated from scratch: the two must agree
+    newcomers = range(USERS + 1, USERS + 501)
+    replay = [(rng.choice(newcomers), "quiz", rng.randrange(1, MODULES + 1), round(rng.uniform(60, 100), 1),
+               5, now.strftime("%Y-%m-%d %H:%M:%S")) for _ in range(5_000)]
+    for i in range(0, len(replay), 50):
+        with db_transaction(path) as tx:
+            record_interactions(tx, replay[i:i + 50])
+            engine.evaluate_events(tx, replay[i:i + 50])
+    marks = ",".join("?" * len(newcomers))
+    query = f"SELECT user_id, badge_name FROM user_badges WHERE user_id IN ({marks})"
+    incremental = set(conn.execute(query, newcomers).fetchall())
+    with db_transaction(path) as tx:
+        tx.execute(f"DELETE FROM user_badges WHERE user_id IN ({marks})", newcomers)
+        engine.evaluate_users(tx, newcomers)
+    bulk = set(conn.execute(query, newcomers).fetchall())
+    assert incremental <= bulk, incremental - bulk
+    print(f"{len(replay):,} events for {len(newcomers)} new users: {len(incremental)} badges per event, "
+          f"{len(bulk - incremental)} more (average score) from the batch pass, none it would not grant")
+
+
+if __name__ == "__main__":
+    main()
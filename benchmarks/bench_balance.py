@@ -0,0 +1,37 @@
+"""
+Timing for the Monte Carlo balance evaluator (simulation_builder.validator).
+
+Run from the repo root:  python -m benchmarks.bench_balance
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from simulation_builder.validator import evaluate_balance, balance_problems
+from simulations.procedural_engine import generate_procedural_config
+
+TEMPLATE = Path(__file__).resolve().parent.parent / "simulations" / "custom" / "template.json"
+PLAYTHROUGHS = 10000
+
+
+def timed(label, config, workers):
+    evaluate_balance(config, 200, workers=workers)  # warm the pool
+    start = time.perf_counter()
+    report = evaluate_balance(config, PLAYTHROUGHS, workers=workers, seed=0)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} workers={workers:<3} {elapsed * 1000:7.1f} ms   problems: {balance_problems(report) or 'none'}")
+
+
+def main():
+    print(f"{PLAYTHROUGHS} playthroughs x 120 days, {os.cpu_count()} CPUs")
+    configs = [("template.json", json.loads(TEMPLATE.read_text()))]
+    configs += [(f"procedural '{p}'", generate_procedural_config(p)) for p in ("city", "ocean", "space")]
+    for label, config in configs:
+        timed(label, config, 1)
+        if (os.cpu_count() or 1) > 1:
+            timed(label, config, os.cpu_count())
+
+
+if __name__ == "__main__":
+    main()
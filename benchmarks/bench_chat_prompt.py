@@ -0,0 +1,51 @@
+"""
+Chat system-prompt size with the full config JSON (as before) vs the cached
+context digest, for template.json and a 200-entity world.
+
+Run from the repo root:  python -m benchmarks.bench_chat_prompt
+"""
+import json
+import random
+import time
+
+from simulations.context_digest import DIGEST_CACHE, build_context_digest, estimate_tokens
+
+RESOURCES = ["money", "energy", "co2", "water", "food", "pollution", "score"]
+
+
+def large_world(n, rng):
+    config = json.load(open("simulations/custom/template.json"))
+    config["global_resources"] = {r: rng.randint(0, 1000) for r in RESOURCES}
+    config["entities"] = [{
+        "id": f"entity_{i}",
+        "name": f"Building {i}",
+        "icon": "🏠",
+        "description": "A generated building with a fairly long flavour text describing what it does to the world.",
+        "cost": {r: rng.randint(10, 500) for r in rng.sample(RESOURCES[:3], 2)},
+        "effects": {r: round(rng.uniform(-20, 20), 1) for r in rng.sample(RESOURCES, 3)},
+    } for i in range(n)]
+    return config
+
+
+def report(label, config, resources):
+    before = json.dumps(config, indent=2) + json.dumps(resources)
+    start = time.perf_counter()
+    DIGEST_CACHE.clear()
+    build_context_digest(config, resources)
+    cold = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    after = build_context_digest(config, resources)
+    warm = (time.perf_counter() - start) * 1000
+    print(f"{label}: full JSON {len(before)} chars / ~{estimate_tokens(before)} tokens -> "
+          f"digest {len(after)} chars / ~{estimate_tokens(after)} tokens "
+          f"(build {cold:.2f} ms, cached {warm:.2f} ms)")
+
+
+def main():
+    template = json.load(open("simulations/custom/template.json"))
+    report("template.json", template, {"money": 850, "energy": 40, "co2": 35})
+    report("200 entities ", large_world(200, random.Random(0)), {r: 100 for r in RESOURCES})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Soak test for the chat session store: 100k simulated messages from a rotating
+population of users, with traced memory sampled every 10k messages. Compared
+with the old behaviour (one unbounded history list).
+
+Run from the repo root:  python -m benchmarks.bench_chat_sessions
+"""
+import random
+import time
+import tracemalloc
+
+from simulations.chat_sessions import ChatSessionStore
+
+MESSAGES = 100_000
+ACTIVE_USERS = 2_000      # users chatting at any one time
+SECONDS_PER_MESSAGE = 0.5  # simulated time between messages across the whole class
+WORDS = "why does my pollution keep rising when I build more trees and solar panels".split()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def message(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 60)))
+
+
+def soak(append):
+    rng = random.Random(0)
+    clock.now = 0.0
+    tracemalloc.start()
+    samples = []
+    start = time.perf_counter()
+    for i in range(1, MESSAGES + 1):
+        clock.now += SECONDS_PER_MESSAGE
+        # Users drift: the active window slides, so old users go idle and never return
+        user = rng.randrange(ACTIVE_USERS) + i // 10
+        text = message(rng)
+        append(user, "user", text)
+        append(user, "assistant", f"Echo: {text}")
+        if i % 10_000 == 0:
+            samples.append(tracemalloc.get_traced_memory()[0] / 1e6)
+    tracemalloc.stop()
+    return samples, time.perf_counter() - start
+
+
+clock = FakeClock()
+
+
+def main():
+    for label, store in (("idle eviction", ChatSessionStore(clock=clock)),
+                         ("200k token cap", ChatSessionStore(max_total_tokens=200_000, clock=clock))):
+        samples, elapsed = soak(store.append)
+        print(f"{label} MB:", " ".join(f"{s:.1f}" for s in samples), f"({elapsed:.1f} s)")
+        print("  ", store.stats())
+
+    history = []
+    samples, elapsed = soak(lambda user, role, content: history.append({"role": role, "content": content}))
+    print("unbounded list MB:", " ".join(f"{s:.1f}" for s in samples), f"({elapsed:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+/api/simulation/chat time-to-first-byte and total time, JSON vs server-sent events,
+against the local fake provider (latency before the first token, then a delay per token).
+
+Run from the repo root:  python -m benchmarks.bench_chat_stream
+"""
+import itertools
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.fake_llm_server import FakeLLMServer
+
+LATENCY = 0.3        # provider time to first token
+TOKEN_DELAY = 0.02   # provider time per following token
+QUESTION_IDS = itertools.count(1)
+
+
+def measure(url, body, runs):
+    ttfb, total = [], []
+    for _ in range(runs):
+        # A new question every time, so each run reaches the provider instead of the reply cache
+        question = dict(body, message=f"{body['message']} ({next(QUESTION_IDS)})")
+        start = time.perf_counter()
+        with requests.post(url, json=question, stream=True, timeout=30) as response:
+            first = None
+            for chunk in response.iter_content(chunk_size=None):
+                if first is None and chunk:
+                    first = time.perf_counter()
+        end = time.perf_counter()
+        ttfb.append((first - start) * 1000)
+        total.append((end - start) * 1000)
+    return {"ttfb_ms": round(statistics.median(ttfb), 1), "total_ms": round(statistics.median(total), 1)}
+
+
+def main():
+    provider = FakeLLMServer(latency=LATENCY, token_delay=TOKEN_DELAY).start()
+    tmp = tempfile.mkdtemp()
+    os.environ.update(LLM_API_BASE=provider.url, LLM_API_KEY="fake",
+                      ECOLEARN_DB_PATH=os.path.join(tmp, "bench.db"),
+                      LLM_CACHE_PATH=os.path.join(tmp, "llm_cache.db"),
+                      SESSION_SECRET_PATH=os.path.join(tmp, "session_secret"))
+    from werkzeug.serving import make_server
+    from main import app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/simulation/chat"
+    config = json.load(open("simulations/custom/template.json"))
+    body = {"message": "Why is my pollution rising?", "config": config}
+
+    measure(url, body, 1)  # warm the provider connection pool
+    print(f"provider: {LATENCY * 1000:.0f} ms to first token, {TOKEN_DELAY * 1000:.0f} ms per token")
+    print("JSON reply:", measure(url, body, 10))
+    print("SSE stream:", measure(url, dict(body, stream=True), 10))
+    server.shutdown()
+    provider.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Saves/sec benchmark for the simulation_saves write path.
+
+Compares the old pattern (fresh connection per save, rollback journal)
+against the pooled WAL connections from database.db_config.
+
+Run from the repo root:  python -m benchmarks.bench_db_saves
+"""
+import json
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from database.db_config import db_transaction, close_db_connections
+
+STUDENTS = 30
+SAVES_PER_STUDENT = 50
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS simulation_saves (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT,
+        title TEXT,
+        config_json TEXT,
+        state_json TEXT,
+        saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+INSERT = 'INSERT INTO simulation_saves (user_email, title, config_json, state_json) VALUES (?, ?, ?, ?)'
+
+TEMPLATE = Path(__file__).resolve().parent.parent / "simulations" / "custom" / "template.json"
+CONFIG_STR = TEMPLATE.read_text()
+STATE_STR = json.dumps({"grid": [[None] * 8 for _ in range(6)], "resources": {"money": 1000}, "gameDay": 1})
+
+
+def legacy_save(path, email):
+    locked = 0
+    for _ in range(SAVES_PER_STUDENT):
+        while True:
+            conn = sqlite3.connect(path, timeout=0.05)
+            try:
+                conn.execute(INSERT, (email, "bench", CONFIG_STR, STATE_STR))
+                conn.commit()
+                break
+            except sqlite3.OperationalError:
+                locked += 1
+            finally:
+                conn.close()
+    return locked
+
+
+def pooled_save(path, email):
+    try:
+        for _ in range(SAVES_PER_STUDENT):
+            with db_transaction(path) as conn:
+                conn.execute(INSERT, (email, "bench", CONFIG_STR, STATE_STR))
+    finally:
+        close_db_connections()
+    return 0
+
+
+def run(label, worker, path):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=STUDENTS) as pool:
+        locked = sum(pool.map(lambda i: worker(path, f"student{i}@school.test"), range(STUDENTS)))
+    elapsed = time.perf_counter() - start
+    total = STUDENTS * SAVES_PER_STUDENT
+    print(f"{label:<28} {total / elapsed:10.0f} saves/sec   'database is locked' retries: {locked}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = str(Path(tmp) / "legacy.db")
+        pooled_db = str(Path(tmp) / "pooled.db")
+        for path in (legacy_db, pooled_db):
+            conn = sqlite3.connect(path)
+            conn.execute(SCHEMA)
+            conn.close()
+
+        print(f"{STUDENTS} concurrent students x {SAVES_PER_STUDENT} saves")
+        run("before (connect per save)", legacy_save, legacy_db)
+        run("after (pooled, WAL)", pooled_save, pooled_db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Interaction ingest throughput: one transaction per event (track_user_interaction)
+vs the buffered pipeline (ai_module/ingest.py) fed by concurrent producers
+posting batches of 100 events. Also drives the POST /api/analytics/events
+endpoint, overloads a small buffer to show backpressure, and checks the
+rollups match the raw log afterwards.
+
+Run from the repo root:  python -m benchmarks.bench_ingest
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+
+SINGLE_EVENTS = 3_000
+PRODUCERS = 8
+BATCHES_PER_PRODUCER = 500
+BATCH = 100
+USERS = 10_000
+MODULES = 40
+
+
+def random_event(rng):
+    scored = rng.random() < 0.8
+    return {
+        "user_id": rng.randrange(1, USERS + 1),
+        "interaction_type": "quiz" if scored else "click",
+        "module_id": rng.randrange(1, MODULES + 1),
+        "score": round(rng.uniform(30, 100), 1) if scored else None,
+        "time_spent": rng.randrange(1, 30),
+    }
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["ECOLEARN_DB_PATH"] = path
+    os.environ["SESSION_SECRET_PATH"] = path + ".secret"
+    import logging
+    from database.db_config import get_db_connection
+    from database.models import init_db
+    from ai_module.analytics import LearningAnalytics
+    from ai_module.ingest import IngestQueueFull, InteractionIngestor, parse_event
+
+    init_db(path)
+    analytics = LearningAnalytics(path)
+    logging.getLogger("ai_module.analytics").setLevel(logging.WARNING)
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    for _ in range(SINGLE_EVENTS):
+        analytics.track_user_interaction(**random_event(rng))
+    single_rate = SINGLE_EVENTS / (time.perf_counter() - start)
+
+    batches = [[random_event(rng) for _ in range(BATCH)] for _ in range(PRODUCERS * BATCHES_PER_PRODUCER)]
+
+    def produce(mine):
+        for batch in mine:
+            while True:
+                try:
+                    analytics.track_interactions(batch)
+                    break
+                except IngestQueueFull:
+                    time.sleep(0.01)
+
+    total = len(batches) * BATCH
+    threads = [threading.Thread(target=produce, args=(batches[i::PRODUCERS],)) for i in range(PRODUCERS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    accept_s = time.perf_counter() - start
+    assert analytics.ingestor.flush()
+    buffered_s = time.perf_counter() - start
+    stats = analytics.ingestor.stats()
+    print(f"one transaction per event: {single_rate:,.0f} events/sec")
+    print(f"buffered pipeline, {PRODUCERS} producers x {BATCH}-event batches: {total / buffered_s:,.0f} events/sec "
+          f"committed ({total:,} events, accepted in {accept_s:.2f} s, {stats['batches']} write batches)")
+
+    # Through Flask; main.py uses the default LearningAnalytics, pointed at the same file by ECOLEARN_DB_PATH
+    from main import app, analytics as app_analytics
+    from user_system.sessions import SESSIONS
+    client = app.test_client()
+    # A client only posts its own events: the user comes from the session token
+    auth = {"Authorization": f"Bearer {SESSIONS.issue({'id': 1, 'email': 'u1@school.test', 'role': 'student'})}"}
+    http_batches = [[{k: v for k, v in e.items() if k != "user_id"} for e in batch] for batch in batches[:200]]
+    start = time.perf_counter()
+    for batch in http_batches:
+        assert client.post("/api/analytics/events", json={"events": batch}, headers=auth).status_code == 202
+    assert app_analytics.ingestor.flush()
+    http_s = time.perf_counter() - start
+    print(f"POST /api/analytics/events (single client): {len(http_batches) * BATCH / http_s:,.0f} events/sec")
+    assert client.post("/api/analytics/events", json={"events": http_batches[0]}).status_code == 401
+    assert client.post("/api/analytics/events", json={"events": [{"user_id": 2}]}, headers=auth).status_code == 403
+    assert client.post("/api/analytics/events", json={"events": [{"module_id": "x"}]}, headers=auth).status_code == 400
+
+    # A buffer of 1,000 events that the writer can't drain fast enough
+    tiny = InteractionIngestor(path, max_pending=1_000, batch_size=500, flush_interval=0.05)
+    events = [parse_event(e) for e in batches[0]]
+    rejected = 0
+    for _ in range(2_000):
+        try:
+            tiny.submit(events, timeout=0)
+        except IngestQueueFull:
+            rejected += 1
+    tiny.close()
+    print(f"backpressure: {rejected} of 2,000 batches rejected by a 1,000-event buffer, "
+          f"{tiny.stats()['written']:,} events written, pending after close: {tiny.stats()['pending']}")
+
+    conn = get_db_connection(path)
+    logged = conn.execute("SELECT COUNT(*) FROM user_interactions").fetchone()[0]
+    rolled = conn.execute("SELECT SUM(total_interactions) FROM user_stats").fetchone()[0]
+    assert logged == rolled == SINGLE_EVENTS + total + len(http_batches) * BATCH + tiny.stats()["written"], \
+        (logged, rolled)
+    print(f"rollups consistent with the log ({logged:,} interactions)")
+
+
+if __name__ == "__main__":
+    main()
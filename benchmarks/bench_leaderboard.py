@@ -0,0 +1,99 @@
+"""
+Leaderboard with 1M ranked users: "my rank" and top-10 from the in-memory
+RankIndex vs the same questions asked of SQLite (a COUNT over the
+(period, points) index, and ORDER BY ... LIMIT). Also times building the board
+from SQLite at startup, applying ingest batches, and checks ranks agree.
+
+Run from the repo root:  python -m benchmarks.bench_leaderboard
+"""
+import os
+import random
+import resource
+import tempfile
+import time
+
+USERS = int(os.environ.get("BENCH_USERS", 1_000_000))
+LOOKUPS = 200
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["ECOLEARN_DB_PATH"] = path
+    from database.db_config import db_transaction, get_db_connection
+    from database.models import init_db
+    from ai_module.rollups import utc_timestamp
+    from ui.leaderboard import Leaderboard
+
+    init_db(path)
+    rng = random.Random(0)
+    # Long-tailed points: most students have a few quizzes, a few have hundreds
+    points = {u: int(rng.paretovariate(1.2) * 80) for u in range(1, USERS + 1)}
+    with db_transaction(path) as conn:
+        conn.executemany("INSERT INTO leaderboard_points (user_id, period, points) VALUES (?, 'all', ?)",
+                         points.items())
+
+    board = Leaderboard(path)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    board.top()
+    load_s = time.perf_counter() - start
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024
+    print(f"build all-time board of {USERS:,} users from SQLite: {load_s:.1f} s, ~{rss_mb:.0f} MB")
+
+    conn = get_db_connection(path)
+    sample = rng.sample(range(1, USERS + 1), LOOKUPS)
+    start = time.perf_counter()
+    sql_ranks = [1 + conn.execute("SELECT COUNT(*) FROM leaderboard_points WHERE period = 'all' AND points > ?",
+                                  (points[u],)).fetchone()[0] for u in sample]
+    sql_us = (time.perf_counter() - start) * 1e6 / LOOKUPS
+    start = time.perf_counter()
+    mem_ranks = [board.rank(u)["rank"] for u in sample]
+    mem_us = (time.perf_counter() - start) * 1e6 / LOOKUPS
+    assert sql_ranks == mem_ranks
+    print(f"my rank: {sql_us:,.0f} us SQL COUNT over the index -> {mem_us:.1f} us in memory (same ranks)")
+
+    start = time.perf_counter()
+    for _ in range(200):
+        sql_top = conn.execute("""
+            SELECT user_id, points FROM leaderboard_points WHERE period = 'all'
+            ORDER BY points DESC, user_id LIMIT 10
+        """).fetchall()
+    sql_top_us = (time.perf_counter() - start) * 1e6 / 200
+    start = time.perf_counter()
+    for _ in range(200):
+        mem_top = board.top(limit=10)
+    mem_top_us = (time.perf_counter() - start) * 1e6 / 200
+    assert [(r[0], r[1]) for r in sql_top] == [(e["user_id"], e["points"]) for e in mem_top]
+    start = time.perf_counter()
+    for _ in range(20):
+        conn.execute("""
+            SELECT user_id, points FROM leaderboard_points WHERE period = 'all'
+            ORDER BY points DESC, user_id LIMIT 10 OFFSET ?
+        """, (USERS // 2,)).fetchall()
+    sql_mid_us = (time.perf_counter() - start) * 1e6 / 20
+    start = time.perf_counter()
+    for _ in range(200):
+        board.top(limit=10, offset=USERS // 2)
+    mid_us = (time.perf_counter() - start) * 1e6 / 200
+    print(f"top 10: {sql_top_us:,.0f} us SQL ORDER BY/LIMIT, {mem_top_us:.0f} us in memory (with names)")
+    print(f"page at rank {USERS // 2:,}: {sql_mid_us:,.0f} us SQL OFFSET -> {mid_us:.0f} us in memory")
+
+    now = utc_timestamp()
+    batches = [[(rng.randrange(1, USERS + 1), "quiz", 1, rng.uniform(40, 100), 5, now) for _ in range(5_000)]
+               for _ in range(20)]
+    start = time.perf_counter()
+    for batch in batches:
+        with db_transaction(path) as tx:
+            board.record(tx, batch)
+    print(f"ingest: {100_000 / (time.perf_counter() - start):,.0f} events/sec into leaderboard_points + board")
+    for u in rng.sample(range(1, USERS + 1), 50):
+        expected = 1 + conn.execute("""
+            SELECT COUNT(*) FROM leaderboard_points WHERE period = 'all'
+              AND points > (SELECT points FROM leaderboard_points WHERE period = 'all' AND user_id = ?)
+        """, (u,)).fetchone()[0]
+        assert board.rank(u)["rank"] == expected
+    print("ranks still match SQLite after the updates")
+
+
+if __name__ == "__main__":
+    main()
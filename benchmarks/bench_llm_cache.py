@@ -0,0 +1,62 @@
+"""
+A class of 30 asking the Professor the same starter question (as plain replies
+and as streamed ones, which is what the frontend sends) and generating the same
+theme at once, against the fake provider: upstream calls, coalesced requests
+and cache hit rate, cold and warm.
+
+Run from the repo root:  python -m benchmarks.bench_llm_cache
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.fake_llm_server import FakeLLMServer
+
+CLASS_SIZE = 30
+
+
+def burst(fn):
+    barrier = threading.Barrier(CLASS_SIZE)
+    results = [None] * CLASS_SIZE
+
+    def student(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=student, args=(i,)) for i in range(CLASS_SIZE)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, (time.perf_counter() - start) * 1000
+
+
+def main():
+    provider = FakeLLMServer(latency=0.5).start()
+    os.environ.update(LLM_API_BASE=provider.url, LLM_CACHE_PATH=os.path.join(tempfile.mkdtemp(), "llm_cache.db"))
+    from simulations.llm_bridge import chat_with_simulation, generate_with_llm, stream_chat_with_simulation
+    from simulations.llm_cache import LLM_CACHE
+
+    config = json.load(open("simulations/custom/template.json"))
+    resources = dict(config["global_resources"])
+    ask = lambda: chat_with_simulation("What is smog?", config, "fake", "Professor", resources, "Fighting Smog")
+    stream = lambda: "".join(stream_chat_with_simulation("What is acid rain?", config, "fake", "Professor",
+                                                         resources, "Fighting Smog"))
+    generate = lambda: generate_with_llm("A rainforest with jaguars", "fake")
+
+    for label, fn in (("chat", ask), ("chat stream", stream), ("generate", generate)):
+        for phase in ("cold", "warm"):
+            before = provider.requests
+            results, elapsed = burst(fn)
+            assert all(r == results[0] for r in results)
+            print(f"{label} {phase}: {CLASS_SIZE} requests in {elapsed:.0f} ms, "
+                  f"upstream calls={provider.requests - before}")
+    print("cache stats:", LLM_CACHE.stats())
+    provider.stop()
+
+
+if __name__ == "__main__":
+    main()
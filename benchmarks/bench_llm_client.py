@@ -0,0 +1,78 @@
+"""
+LLM client behaviour against the local fake provider: connection reuse, retries
+on flaky responses, Retry-After on rate limits, read timeouts on stalls, and
+circuit-breaker failover.
+
+Run from the repo root:  python -m benchmarks.bench_llm_client
+"""
+import statistics
+import time
+
+import requests
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from simulations.llm_client import CircuitBreaker, LLMClient, LLMError
+
+MESSAGES = [{"role": "system", "content": "You are the Spirit of the Simulation."},
+            {"role": "user", "content": "Why is my pollution rising?"}]
+
+
+def timed_calls(call, n):
+    latencies, failures = [], 0
+    for _ in range(n):
+        start = time.perf_counter()
+        try:
+            call()
+        except LLMError:
+            failures += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+        "failures": failures,
+    }
+
+
+def main():
+    n = 300
+    with FakeLLMServer(seed=0) as server:
+        client = LLMClient("fake", base_url=server.url)
+        url = f"{server.url}/chat/completions"
+        payload = {"model": "fake", "messages": MESSAGES}
+        print("new connection per call:", timed_calls(lambda: requests.post(url, json=payload, timeout=5).json(), n))
+        print("pooled session:         ", timed_calls(lambda: client.chat(MESSAGES), n))
+
+    with FakeLLMServer(fail_rate=0.3, seed=1) as server:
+        client = LLMClient("fake", base_url=server.url, breaker=CircuitBreaker(failure_threshold=10 ** 6))
+        result = timed_calls(lambda: client.chat(MESSAGES), n)
+        print(f"30% HTTP 503, {client.max_retries} retries: ", result,
+              f"attempts/call={client.stats()['attempts'] / client.stats()['calls']:.2f}")
+
+    with FakeLLMServer(stall_rate=0.1, stall=3.0, seed=2) as server:
+        client = LLMClient("fake", base_url=server.url, read_timeout=0.25,
+                           breaker=CircuitBreaker(failure_threshold=10 ** 6))
+        print("10% stalls, 0.25 s read timeout:", timed_calls(lambda: client.chat(MESSAGES), 100),
+              f"retries={client.stats()['retries']}")
+
+    with FakeLLMServer(throttle_rate=0.3, retry_after=0.05, seed=4) as server:
+        waits = []
+        client = LLMClient("fake", base_url=server.url, breaker=CircuitBreaker(failure_threshold=10 ** 6),
+                           sleep=lambda s: (waits.append(s), time.sleep(s)))
+        result = timed_calls(lambda: client.chat(MESSAGES), n)
+        assert waits and all(w == 0.05 for w in waits), waits
+        print("30% HTTP 429, Retry-After 0.05:", result, f"retries={client.stats()['retries']} (each waited 0.05 s)")
+
+    with FakeLLMServer(seed=3) as server:
+        server.down = True
+        client = LLMClient("fake", base_url=server.url, breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30))
+        tripping = timed_calls(lambda: client.chat(MESSAGES), 5)
+        before = server.requests
+        open_calls = timed_calls(lambda: client.chat(MESSAGES), n)
+        print("provider down, tripping breaker:", tripping)
+        print("provider down, breaker open:    ", open_calls,
+              f"requests reaching provider={server.requests - before}, state={client.breaker.state}")
+
+
+if __name__ == "__main__":
+    main()
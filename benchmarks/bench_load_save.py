@@ -0,0 +1,92 @@
+"""
+Latency and peak memory of /api/load for a ~1 MB save: the old
+parse + jsonify path against the streamed payload (database/save_store.py).
+
+Run from the repo root:  python -m benchmarks.bench_load_save
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("ECOLEARN_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_load.db"))
+os.environ.setdefault("SESSION_SECRET_PATH", os.environ["ECOLEARN_DB_PATH"] + ".secret")
+
+from flask import jsonify
+
+from main import app
+from user_system.sessions import SESSIONS
+from database import save_store
+from database.db_config import db_transaction, get_db_connection
+
+RUNS = 20
+
+
+def make_save():
+    entities = [{
+        "id": f"entity_{i}",
+        "name": f"Entity {i}",
+        "icon": "🏭",
+        "description": "A building with a long description that is copied into every grid cell. " * 2,
+        "cost": {"money": 100 + i},
+        "effects": {"money": -i, "co2": 2, "energy": 3},
+    } for i in range(12)]
+    config = {"title": "Big World", "description": "Benchmark", "grid": {"width": 60, "height": 60, "background_color": "#fff"},
+              "global_resources": {"money": 1000, "energy": 0, "co2": 50}, "entities": entities}
+    grid = [[entities[(x * y) % len(entities)] for x in range(60)] for y in range(60)]
+    state = {"grid": grid, "resources": dict(config["global_resources"]), "gameDay": 42, "history": []}
+    return config, state
+
+
+def old_load(conn, save_id):
+    # The previous handler: parse both documents, then jsonify re-serializes them
+    row = conn.execute("SELECT config_json, state_json FROM simulation_saves WHERE id = ?", (save_id,)).fetchone()
+    return jsonify({"config": json.loads(row["config_json"]), "state": json.loads(row["state_json"])}).get_data()
+
+
+def new_load(conn, save_id):
+    _, chunks = save_store.read_save_payload(conn, save_id)
+    return b"".join(chunks)
+
+
+def measure(label, fn, conn, save_id):
+    fn(conn, save_id)
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        body = fn(conn, save_id)
+    elapsed = (time.perf_counter() - start) / RUNS
+    tracemalloc.start()
+    fn(conn, save_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} {len(body) / 1e6:5.2f} MB body  {elapsed * 1000:7.2f} ms  peak {peak / 1e6:6.2f} MB")
+
+
+def main():
+    config, state = make_save()
+    with app.app_context():
+        with db_transaction() as conn:
+            conn.execute("INSERT INTO simulation_saves (user_email, title, config_json, state_json) VALUES (?, ?, ?, ?)",
+                         ("bench", "legacy", json.dumps(config), json.dumps(state)))
+            legacy_id = conn.execute("SELECT MAX(id) FROM simulation_saves").fetchone()[0]
+            compact_id = save_store.insert_save(conn, "bench", "compact", config, state)
+        conn = get_db_connection()
+
+        measure("before: json.loads + jsonify", old_load, conn, legacy_id)
+        measure("after: stream stored JSON (legacy)", new_load, conn, legacy_id)
+        measure("after: stream compact save", new_load, conn, compact_id)
+
+        client = app.test_client()
+        auth = {"Authorization": f"Bearer {SESSIONS.issue({'id': 1, 'email': 'bench', 'role': 'student'})}"}
+        other = {"Authorization": f"Bearer {SESSIONS.issue({'id': 2, 'email': 'other', 'role': 'student'})}"}
+        assert client.get(f"/api/load/{compact_id}", headers=other).status_code == 404
+        etag = client.get(f"/api/load/{compact_id}", headers=auth).headers["ETag"]
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            status = client.get(f"/api/load/{compact_id}", headers={**auth, "If-None-Match": etag}).status_code
+        print(f"{'repeat load with ETag':<34} status {status}       {(time.perf_counter() - start) / RUNS * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+A class of 30 logging in at once, against a threaded server: p50/p99 latency
+of an unrelated route (GET /api/stats/global) while the logins hash passwords
+on the request threads vs in the bounded process pool (user_system/passwords.py).
+Also checks that a hash made with old parameters is upgraded on login.
+
+Run from the repo root:  python -m benchmarks.bench_login_storm
+"""
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import requests
+
+STUDENTS = 30
+LOGINS_EACH = 3
+PROBE_INTERVAL = 0.01
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["ECOLEARN_DB_PATH"] = path
+    from werkzeug.security import generate_password_hash
+    from werkzeug.serving import make_server
+    from database.db_config import db_transaction, get_db_connection
+    from user_system.passwords import HASHER
+    from main import app
+
+    stored = generate_password_hash("correct horse", HASHER.method)
+    with db_transaction() as conn:
+        conn.executemany("INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, 'student')",
+                         [(f"Student {i}", f"s{i}@school.test", stored) for i in range(STUDENTS)])
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    def probe(stop, latencies):
+        session = requests.Session()
+        while not stop.is_set():
+            start = time.perf_counter()
+            session.get(f"{base}/api/stats/global").raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(PROBE_INTERVAL)
+
+    def student(i, statuses, login_ms):
+        session = requests.Session()
+        for _ in range(LOGINS_EACH):
+            start = time.perf_counter()
+            response = session.post(f"{base}/login", json={"email": f"s{i}@school.test", "password": "correct horse"})
+            login_ms.append((time.perf_counter() - start) * 1000)
+            statuses.append(response.status_code)
+
+    def run(label, storm):
+        stop, latencies, statuses, login_ms = threading.Event(), [], [], []
+        prober = threading.Thread(target=probe, args=(stop, latencies))
+        prober.start()
+        if storm:
+            students = [threading.Thread(target=student, args=(i, statuses, login_ms)) for i in range(STUDENTS)]
+            for t in students:
+                t.start()
+            for t in students:
+                t.join()
+        else:
+            time.sleep(2)
+        stop.set()
+        prober.join()
+        line = f"{label}: unrelated route p50 {statistics.median(latencies):.1f} ms, p99 {percentile(latencies, 99):.1f} ms"
+        if storm:
+            line += (f"; logins p50 {statistics.median(login_ms):.0f} ms, p99 {percentile(login_ms, 99):.0f} ms, "
+                     f"{statuses.count(200)} ok, {statuses.count(503)} shed")
+        print(line)
+
+    workers = HASHER.workers
+    run("idle", storm=False)
+    HASHER.workers = 0
+    run(f"{STUDENTS} logging in, hashing on request threads", storm=True)
+    HASHER.workers = workers
+    HASHER.hash("warm up the pool")
+    run(f"{STUDENTS} logging in, hashing in a pool of {workers}", storm=True)
+
+    # A hash from before the parameters changed is replaced on the next login
+    with db_transaction() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE email = 's0@school.test'",
+                     (generate_password_hash("correct horse", "pbkdf2:sha256:600000"),))
+    requests.post(f"{base}/login", json={"email": "s0@school.test", "password": "correct horse"}).raise_for_status()
+    method = get_db_connection().execute("SELECT password FROM users WHERE email = 's0@school.test'").fetchone()[0]
+    assert method.startswith(HASHER.method + "$"), method
+    print(f"pbkdf2 hash upgraded to {HASHER.method} on login")
+    server.shutdown()
+    HASHER.shutdown()
+
+
+if __name__ == "__main__":
+    main()
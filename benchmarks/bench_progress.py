@@ -0,0 +1,133 @@
+"""
+get_user_progress on 1M interactions (10k users, 60 days, 40 modules):
+aggregating user_interactions per call (the old queries) vs the rollup tables.
+Also times rollup maintenance during ingest and a full rebuild, checks that
+both paths return the same numbers, and does the same for get_global_stats.
+
+Run from the repo root:  python -m benchmarks.bench_progress
+"""
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+USERS = 10_000
+INTERACTIONS = 1_000_000
+MODULES = 40
+TOPICS = ["solar", "carbon", "sustainability", "water", "wind", "biodiversity", "recycling"]
+
+
+def legacy_progress(conn, user_id):
+    """The queries get_user_progress used to run against the raw log"""
+    stats = conn.execute("""
+        SELECT COUNT(*), AVG(score), SUM(time_spent), COUNT(DISTINCT module_id)
+        FROM user_interactions WHERE user_id = ? AND score IS NOT NULL
+    """, (user_id,)).fetchone()
+    streak = conn.execute("""
+        SELECT COUNT(*) FROM (SELECT DATE(timestamp) FROM user_interactions
+                              WHERE user_id = ? GROUP BY DATE(timestamp))
+    """, (user_id,)).fetchone()[0]
+    topics = conn.execute("""
+        SELECT lm.topics, AVG(ui.score) FROM user_interactions ui
+        JOIN learning_modules lm ON ui.module_id = lm.id
+        WHERE ui.user_id = ? AND ui.score IS NOT NULL GROUP BY lm.topics
+    """, (user_id,)).fetchall()
+    eco = conn.execute("""
+        SELECT SUM(CASE WHEN lm.topics LIKE '%solar%' THEN 1 ELSE 0 END)
+        FROM user_interactions ui JOIN learning_modules lm ON ui.module_id = lm.id
+        WHERE ui.user_id = ? AND ui.score >= 70
+    """, (user_id,)).fetchone()[0]
+    weekly = conn.execute("""
+        SELECT DATE(timestamp), COUNT(*), AVG(COALESCE(score, 0)), SUM(COALESCE(time_spent, 0))
+        FROM user_interactions WHERE user_id = ? AND timestamp >= date('now', '-7 days')
+        GROUP BY DATE(timestamp) ORDER BY DATE(timestamp)
+    """, (user_id,)).fetchall()
+    return {
+        "total_interactions": stats[0],
+        "average_score": round(stats[1], 2) if stats[1] is not None else 0,
+        "total_time_minutes": stats[2] or 0,
+        "modules_attempted": stats[3],
+        "learning_streak_days": streak,
+        "co2_saved_kg": (eco or 0) * 50,
+        "weekly_days": len(weekly),
+        "topic_rows": len(topics),
+    }
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["ECOLEARN_DB_PATH"] = path
+    from database.db_config import db_transaction, get_db_connection
+    from database.models import init_db
+    from ai_module.analytics import LearningAnalytics
+    from ai_module.rollups import rebuild_rollups, record_interactions
+    from ai_module.global_stats import read_global_stats
+
+    init_db(path)
+    rng = random.Random(0)
+    with db_transaction(path) as conn:
+        conn.executemany("INSERT INTO learning_modules (id, title, topics) VALUES (?, ?, ?)",
+                         [(m, f"Module {m}", json.dumps(rng.sample(TOPICS, 2))) for m in range(1, MODULES + 1)])
+
+    now = datetime.now(timezone.utc)
+    batch, start = [], time.perf_counter()
+    for i in range(INTERACTIONS):
+        ts = (now - timedelta(minutes=rng.randrange(60 * 24 * 60))).strftime("%Y-%m-%d %H:%M:%S")
+        scored = rng.random() < 0.8
+        batch.append((rng.randrange(1, USERS + 1), "quiz" if scored else "view", rng.randrange(1, MODULES + 1),
+                      round(rng.uniform(30, 100), 1) if scored else None, rng.randrange(1, 30), ts))
+        if len(batch) == 10_000:
+            with db_transaction(path) as conn:
+                record_interactions(conn, batch)
+            batch = []
+    print(f"ingest with rollups: {INTERACTIONS / (time.perf_counter() - start):,.0f} interactions/sec")
+
+    start = time.perf_counter()
+    rebuild_rollups(path)
+    print(f"rebuild_rollups over {INTERACTIONS:,} interactions: {time.perf_counter() - start:.1f} s")
+
+    analytics = LearningAnalytics(path)
+    conn = get_db_connection(path)
+    sample = rng.sample(range(1, USERS + 1), 50)
+
+    start = time.perf_counter()
+    legacy = {u: legacy_progress(conn, u) for u in sample}
+    legacy_ms = (time.perf_counter() - start) * 1000 / len(sample)
+    start = time.perf_counter()
+    current = {u: analytics.get_user_progress(u) for u in sample}
+    current_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+    for u in sample:
+        old, new = legacy[u], current[u]
+        for key in ("total_interactions", "average_score", "total_time_minutes", "modules_attempted",
+                    "learning_streak_days"):
+            assert old[key] == new[key], (u, key, old[key], new[key])
+        assert old["co2_saved_kg"] == new["eco_impact"]["co2_saved_kg"]
+        assert old["weekly_days"] == len(new["weekly_progress"])
+    print(f"get_user_progress: {legacy_ms:.1f} ms/call aggregating the log -> {current_ms:.2f} ms/call from rollups "
+          f"(same results for {len(sample)} users)")
+
+    start = time.perf_counter()
+    legacy = conn.execute("""
+        SELECT COUNT(DISTINCT user_id), COUNT(*), AVG(score), SUM(score >= 70)
+        FROM user_interactions WHERE score IS NOT NULL
+    """).fetchone()
+    legacy_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    counters = read_global_stats(conn)
+    counters_ms = (time.perf_counter() - start) * 1000
+    analytics.get_global_stats()
+    start = time.perf_counter()
+    for _ in range(1000):
+        analytics.get_global_stats()
+    cached_us = (time.perf_counter() - start) * 1000
+    assert (counters["total_users"], counters["total_interactions"], counters["average_platform_score"],
+            counters["total_completions"]) == (legacy[0], legacy[1], round(legacy[2], 2), legacy[3])
+    print(f"get_global_stats: {legacy_ms:.0f} ms full aggregate -> {counters_ms:.2f} ms counter row "
+          f"-> {cached_us:.1f} us from memory (same results)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Term start: a 50k-row roster (plus duplicates and bad rows) through the
+streaming bulk import (user_system/admin.py), accounts created with one-time
+setup tokens, vs one /signup per row (timed on a sample and extrapolated).
+Also times rows that carry passwords, hashed at full strength across the pool.
+Checks the error report, class membership, and that a setup token lets the
+student choose a password and sign in.
+
+Run from the repo root:  python -m benchmarks.bench_roster_import
+"""
+import io
+import os
+import random
+import tempfile
+import time
+
+ROWS = 50_000
+EXISTING = 1_000  # already registered: rejected by the users.email UNIQUE constraint
+BAD = 500  # missing name / invalid email
+CLASSES = 50
+SIGNUP_SAMPLE = 20
+WITH_PASSWORDS = 200
+
+
+def roster_csv(bad):
+    lines = ["name,email,role,class"]
+    for i in range(ROWS):
+        email = f"s{i}@school.test" if i not in bad else "not-an-email"
+        lines.append(f"Student {i},{email},student,Class {i % CLASSES}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    os.environ["ECOLEARN_DB_PATH"] = os.path.join(tmp, "bench.db")
+    os.environ["SESSION_SECRET_PATH"] = os.path.join(tmp, "session_secret")
+    from database.db_config import db_transaction, get_db_connection
+    from user_system.admin import import_roster
+    from user_system.auth import register_user
+    from user_system.passwords import HASHER
+    from user_system.sessions import SESSIONS
+    from main import app
+
+    picked = random.Random(0).sample(range(ROWS), EXISTING + BAD)
+    existing, bad = set(picked[:EXISTING]), set(picked[EXISTING:])
+    with db_transaction() as conn:
+        conn.executemany("INSERT INTO users (name, email, password, role) VALUES (?, ?, '!', 'student')",
+                         [(f"Old {i}", f"s{i}@school.test") for i in existing])
+    text = roster_csv(bad)
+    HASHER.hash("warm up the pool")
+
+    start = time.perf_counter()
+    for i in range(SIGNUP_SAMPLE):
+        register_user(f"Signup {i}", f"signup{i}@school.test", f"pw-{i}", "student")
+    signup_s = (time.perf_counter() - start) / SIGNUP_SAMPLE * ROWS
+
+    start = time.perf_counter()
+    report = import_roster(io.StringIO(text), "csv", "admin")
+    import_s = time.perf_counter() - start
+    print(f"{ROWS:,} rows: one signup per row ~{signup_s / 60:.0f} min (extrapolated), "
+          f"bulk import with setup tokens {import_s:.1f} s ({ROWS / import_s:,.0f} rows/s)")
+
+    assert report["created"] == ROWS - EXISTING - BAD and report["failed"] == EXISTING + BAD
+    assert {e["error"] for e in report["errors"]} == {"email already registered", "invalid email"}
+    members = get_db_connection().execute("SELECT COUNT(*) FROM class_members").fetchone()[0]
+    assert members == report["created"] and len(report["classes"]) == CLASSES
+    print(f"report: {report['created']:,} created, {report['failed']:,} rejected "
+          f"({EXISTING:,} already registered, {BAD} invalid; first {len(report['errors']):,} listed), "
+          f"{members:,} class memberships")
+
+    with_pw = "name,email,password\n" + "".join(f"P {i},p{i}@school.test,pw-{i}\n" for i in range(WITH_PASSWORDS))
+    start = time.perf_counter()
+    assert import_roster(io.StringIO(with_pw), "csv", "admin")["created"] == WITH_PASSWORDS
+    pw_s = time.perf_counter() - start
+    print(f"rows with passwords ({HASHER.method}, {HASHER.workers} worker(s)): {WITH_PASSWORDS / pw_s:,.1f} rows/s, "
+          f"~{ROWS / (WITH_PASSWORDS / pw_s) / 60:.0f} min for {ROWS:,}")
+
+    client = app.test_client()
+    invite = report["invites"][0]
+    assert client.post("/login", json={"email": invite["email"], "password": ""}).status_code == 401
+    assert client.post("/reset-password", data={"token": invite["token"], "new_password": "chosen"}).status_code < 400
+    assert client.post("/login", json={"email": invite["email"], "password": "chosen"}).status_code == 200
+    assert client.post("/login", json={"email": "p0@school.test", "password": "pw-0"}).status_code == 200
+    print(f"{len(report['invites']):,} setup tokens issued; a student sets a password with one and signs in")
+
+    student = {"Authorization": f"Bearer {SESSIONS.issue({'id': 1, 'email': invite['email'], 'role': 'student'})}"}
+    teacher = {"Authorization": f"Bearer {SESSIONS.issue({'id': 2, 'email': 't@school.test', 'role': 'teacher'})}"}
+    small = "name,email,role\nNew One,new1@school.test,student\nNew Two,new2@school.test,admin\n"
+    assert client.post("/api/admin/roster", data=small, content_type="text/csv").status_code == 401
+    assert client.post("/api/admin/roster", data=small, content_type="text/csv", headers=student).status_code == 403
+    response = client.post("/api/admin/roster?class=Extra", data=small, content_type="text/csv", headers=teacher)
+    body = response.get_json()
+    assert response.status_code == 200 and body["created"] == 1 and body["errors"][0]["row"] == 3, body
+    print("POST /api/admin/roster: 401 without a session, 403 for students, teachers may only add students")
+    HASHER.shutdown()
+
+
+if __name__ == "__main__":
+    main()
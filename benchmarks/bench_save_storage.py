@@ -0,0 +1,72 @@
+"""
+On-disk size of simulation_saves before and after the compact format
+(database/save_store.py), on a synthetic database of legacy rows.
+
+Run from the repo root:  python -m benchmarks.bench_save_storage [saves]
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from database.db_config import get_db_connection, close_db_connections
+from database.models import _create_schema
+from database import save_store
+from simulations.procedural_engine import generate_procedural_config
+
+SAVES = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+WORLDS = 500
+PROMPTS = ["city", "ocean", "space", "desert", "farm", "snow", "magic kingdom", "future tech"]
+
+
+def synthetic_rows(rng):
+    worlds = []
+    for i in range(WORLDS):
+        config = generate_procedural_config(PROMPTS[i % len(PROMPTS)])
+        worlds.append((config, json.dumps(config)))
+    for n in range(SAVES):
+        config, config_str = rng.choice(worlds)
+        w, h = config["grid"]["width"], config["grid"]["height"]
+        grid = [[rng.choice(config["entities"]) if rng.random() < 0.4 else None for _ in range(w)] for _ in range(h)]
+        state = {"grid": grid, "resources": dict(config["global_resources"]), "gameDay": rng.randint(1, 300), "history": []}
+        yield (f"student{n % 3000}@school.test", config["title"], config_str, json.dumps(state))
+
+
+def size_mb(path):
+    return os.path.getsize(path) / 1e6
+
+
+def main():
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "saves.db")
+        conn = get_db_connection(path)
+        _create_schema(conn.cursor())
+        conn.executemany("INSERT INTO simulation_saves (user_email, title, config_json, state_json) VALUES (?, ?, ?, ?)",
+                         synthetic_rows(rng))
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        before = size_mb(path)
+        print(f"{SAVES} legacy saves over {WORLDS} worlds: {before:8.1f} MB")
+
+        start = time.perf_counter()
+        save_store.migrate_legacy_saves(path)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        elapsed = time.perf_counter() - start
+        after = size_mb(path)
+        print(f"after migration ({elapsed:.1f}s):          {after:8.1f} MB  ({before / after:.1f}x smaller)")
+
+        # Spot-check that loads still round-trip
+        for save_id in rng.sample(range(1, SAVES + 1), 5):
+            config, state = save_store.load_save(conn, save_id)
+            assert state["grid"] and isinstance(config["entities"], list)
+        close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
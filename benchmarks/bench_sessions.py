@@ -0,0 +1,76 @@
+"""
+Who is calling: verifying a signed session token in memory (user_system/sessions.py)
+vs looking the user up in SQLite, and the dashboard's profile read with and
+without the read-through cache. Also checks the routes refuse missing, forged
+and other users' tokens.
+
+Run from the repo root:  python -m benchmarks.bench_sessions
+"""
+import os
+import random
+import tempfile
+import time
+
+USERS = 50_000
+ACTIVE = 2_000  # students online at once; the dashboard reloads for the same few
+LOOKUPS = 20_000
+
+
+def timed_us(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) * 1e6 / len(items)
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    os.environ["ECOLEARN_DB_PATH"] = os.path.join(tmp, "bench.db")
+    os.environ["SESSION_SECRET_PATH"] = os.path.join(tmp, "session_secret")
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    from database.db_config import db_transaction, get_db_connection
+    from user_system.auth import PROFILE_CACHE, get_user_by_email
+    from user_system.passwords import HASHER
+    from user_system.sessions import SESSIONS
+    from main import app
+
+    with db_transaction() as conn:
+        conn.executemany("INSERT INTO users (name, email, password, role) VALUES (?, ?, 'x', 'student')",
+                         [(f"Student {i}", f"s{i}@school.test") for i in range(USERS)])
+    rng = random.Random(0)
+    active = rng.sample(range(USERS), ACTIVE)
+    emails = [f"s{rng.choice(active)}@school.test" for _ in range(LOOKUPS)]
+    tokens = [SESSIONS.issue(get_user_by_email(e)) for e in emails]
+    conn = get_db_connection()
+
+    db_us = timed_us(lambda e: conn.execute("SELECT id, email, role FROM users WHERE email = ?", (e,)).fetchone(),
+                     emails)
+    token_us = timed_us(SESSIONS.verify, tokens)
+    assert [s["email"] for s in map(SESSIONS.verify, tokens[:100])] == emails[:100]
+    print(f"identify the caller: {db_us:.1f} us SQLite lookup, {token_us:.1f} us token check in memory")
+
+    PROFILE_CACHE.clear()
+    timed_us(get_user_by_email, emails[:ACTIVE])  # warm up
+    warm_us = timed_us(get_user_by_email, emails)
+    print(f"profile read: {db_us:.1f} us SQLite, {warm_us:.1f} us through the cache "
+          f"({PROFILE_CACHE.stats()['hit_rate']:.0%} hits with {ACTIVE:,} active users)")
+
+    client = app.test_client()
+    with db_transaction() as conn:
+        conn.execute("UPDATE users SET password = ? WHERE email = 's0@school.test'", (HASHER.hash("pw"),))
+    token = client.post("/login", json={"email": "s0@school.test", "password": "pw"}).get_json()["token"]
+    auth = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/user/s0@school.test", headers=auth).status_code == 200
+    assert client.get("/api/user/s0@school.test").status_code == 401
+    assert client.get("/api/user/s0@school.test", headers={"Authorization": f"Bearer {token}x"}).status_code == 401
+    assert client.get("/api/user/s1@school.test", headers=auth).status_code == 403
+    assert client.get("/api/saves/s1@school.test", headers=auth).status_code == 403
+    assert client.post("/api/saves/batch", json={"emails": ["s1@school.test"]}, headers=auth).status_code == 403
+    client.get("/api/user/s0@school.test", headers=auth)
+    route_us = timed_us(lambda _: client.get("/api/user/s0@school.test", headers=auth), range(2_000))
+    print(f"GET /api/user/<email> with a token: {route_us:.0f} us per request (missing, forged and "
+          f"other users' tokens refused)")
+
+
+if __name__ == "__main__":
+    main()
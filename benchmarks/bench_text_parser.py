@@ -0,0 +1,60 @@
+"""
+TextParser throughput on design documents of 1 KB, 100 KB and 1 MB, and the
+sentence reader on long input with no sentence breaks.
+
+Run from the repo root:  python -m benchmarks.bench_text_parser
+"""
+import io
+import random
+import time
+
+from simulations.procedural_engine import TextParser, _iter_sentences
+
+SPECIES = ["Goats", "Elephants", "Predators", "Wolves", "Trees", "Bees", "Farmers", "Fish"]
+VERBS = ["produces", "consumes", "destroys", "restores", "needs", "eats", "provides", "damages"]
+RESOURCES = ["soil", "water", "grass", "food", "population", "terrain", "honey", "oxygen"]
+
+
+def design_document(size, rng):
+    """Species sheets and rules like the one in debug_parser.py, plus some run-on paragraphs"""
+    lines = []
+    total = 0
+    while total < size:
+        kind = rng.random()
+        if kind < 0.4:
+            line = f"{rng.choice(SPECIES)}: high reproduction, {rng.choice(VERBS)} {rng.choice(RESOURCES)}"
+        elif kind < 0.9:
+            line = f"{rng.choice(SPECIES)} {rng.choice(VERBS)} the {rng.choice(RESOURCES)}."
+        else:
+            # A long unpunctuated paragraph, the worst case for per-word rescans
+            line = " ".join(f"{rng.choice(SPECIES)} {rng.choice(VERBS)} {rng.choice(RESOURCES)}" for _ in range(200))
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+
+def main():
+    rng = random.Random(0)
+    for label, size in (("1 KB", 1_000), ("100 KB", 100_000), ("1 MB", 1_000_000)):
+        text = design_document(size, rng)
+        for source, make in (("str", lambda: text), ("file", lambda: io.StringIO(text))):
+            runs = 50 if size < 10_000 else 3
+            start = time.perf_counter()
+            for _ in range(runs):
+                data = TextParser().parse(make())
+            elapsed = (time.perf_counter() - start) / runs
+            print(f"{label:>7} {source:<5} {elapsed * 1000:9.2f} ms  {len(text) / elapsed / 1e6:6.1f} MB/s"
+                  f"  ({len(data['entities'])} entities)")
+
+    # No '.' or newline anywhere: the reader must not rescan the growing tail on every chunk
+    for label, size in (("4 MB", 4_000_000), ("16 MB", 16_000_000)):
+        text = ("Goats eat grass " * (size // 16 + 1))[:size]
+        start = time.perf_counter()
+        for _ in _iter_sentences(io.StringIO(text)):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"{label:>7} file, no sentence breaks: split in {elapsed * 1000:.0f} ms ({size / elapsed / 1e6:.0f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Local stand-in for an OpenAI-compatible /chat/completions provider, for exercising
+the LLM client's timeouts, retries and circuit breaker without network access.
+
+    python -m benchmarks.fake_llm_server --port 8089 --latency 0.3 --fail-rate 0.2
+
+then point the app at it:  LLM_API_BASE=http://127.0.0.1:8089/v1 LLM_API_KEY=fake
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from simulations.procedural_engine import generate_procedural_config
+
+
+class FakeLLMServer:
+    """
+    Serves canned completions with configurable behaviour:
+      latency     seconds before every response (time to first token when streaming)
+      token_delay seconds between streamed tokens ("stream": true requests)
+      fail_rate   fraction of requests answered with HTTP 503
+      stall_rate  fraction of requests that hang for `stall` seconds (read timeouts)
+      throttle_rate fraction of requests answered with HTTP 429 and "Retry-After: `retry_after`"
+      down        refuse every request with 503 (toggle at runtime)
+    """
+    def __init__(self, port: int = 0, latency: float = 0.0, fail_rate: float = 0.0,
+                 stall_rate: float = 0.0, stall: float = 5.0, token_delay: float = 0.0, seed=None,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.fail_rate = fail_rate
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.down = False
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _roll(self):
+        with self._lock:
+            self.requests += 1
+            return self._rng.random()
+
+    def reply(self, messages) -> str:
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        if "Game Designer API" in system:
+            config = generate_procedural_config(user, seed=len(user))
+            return (f"[DESIGN]\nA {config['title']} built around the theme '{user}'.\n[/DESIGN]\n\n"
+                    f"```json\n{json.dumps(config, indent=2)}\n```")
+        return (f"[Fake LLM]: You asked '{user}'. Every factory you build adds pollution each day, "
+                "and once it passes fifty the smog starts eating into your score. Trees and solar "
+                "panels cost more up front but pay you back in clean air, so balance them against "
+                "your budget. Try replacing one factory with two trees and watch the numbers for "
+                "the next five days before you decide.")
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like a real provider
+            disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                roll = server._roll()
+                if server.down or roll < server.fail_rate:
+                    return self._send(503, {"error": {"message": "Service unavailable"}})
+                if roll < server.fail_rate + server.stall_rate:
+                    time.sleep(server.stall)
+                elif roll < server.fail_rate + server.stall_rate + server.throttle_rate:
+                    return self._send(429, {"error": {"message": "Rate limit reached"}},
+                                      {"Retry-After": f"{server.retry_after:g}"})
+                time.sleep(server.latency)
+                content = server.reply(body.get("messages", []))
+                if body.get("stream"):
+                    return self._stream(content, body.get("model"))
+                # A non-streamed reply takes as long as generating every token
+                time.sleep(server.token_delay * (len(content.split(" ")) - 1))
+                self._send(200, {
+                    "id": "fake-completion",
+                    "object": "chat.completion",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                })
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    for name, value in (headers or {}).items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up (read timeout) while we stalled
+
+            def _stream(self, content, model):
+                # OpenAI-style SSE over chunked transfer encoding, one word per event
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    words = content.split(" ")
+                    for i, word in enumerate(words):
+                        if i:
+                            time.sleep(server.token_delay)
+                        event = {"object": "chat.completion.chunk", "model": model,
+                                 "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+                        self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                    self._chunk(b"data: [DONE]\n\n")
+                    self._chunk(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM provider")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=5.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeLLMServer(args.port, args.latency, args.fail_rate, args.stall_rate, args.stall, args.token_delay)
+    print(f"Fake LLM provider on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
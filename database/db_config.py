@@ -1,16 +1,136 @@
+import logging
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 # Ensure the database folder exists (relative to this script's location)
 BASE_DIR = Path(__file__).resolve().parent
 db_folder = BASE_DIR
 db_folder.mkdir(exist_ok=True)
-db_path = db_folder / "ecolearn.db"
+db_path = Path(os.environ.get("ECOLEARN_DB_PATH", db_folder / "ecolearn.db"))
 
-def get_db_connection():
-    """Establishes and returns a database connection.
-    remember to close the connection after use.
-    """
-    conn = sqlite3.connect(db_path)
+# Pragmas applied once to every pooled connection.
+# WAL lets readers run alongside the single writer, NORMAL sync is safe in WAL mode,
+# and busy_timeout makes concurrent writers wait instead of failing with "database is locked".
+BUSY_TIMEOUT_MS = int(os.environ.get("ECOLEARN_DB_BUSY_TIMEOUT_MS", 5000))
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+# One connection per (thread, database file). The pid is recorded so that a
+# gunicorn worker forked from a preloaded master never reuses the master's handle.
+_local = threading.local()
+logger = logging.getLogger(__name__)
+
+
+def _open_connection(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=256)
     conn.row_factory = sqlite3.Row # Access columns by name
-    return conn
\ No newline at end of file
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _pool():
+    pid = os.getpid()
+    if getattr(_local, "pid", None) != pid:
+        _local.pid = pid
+        _local.connections = {}
+        _local.depth = {}
+        _local.hooks = {}  # key -> callbacks waiting for the outermost commit
+    return _local
+
+
+def get_db_connection(path=None):
+    """Returns this thread's reusable connection to the database.
+    The connection is shared by every caller on the thread, so do not close it;
+    use db_transaction() for writes so they are committed or rolled back.
+    """
+    key = str(path or db_path)
+    pool = _pool()
+    conn = pool.connections.get(key)
+    if conn is None:
+        conn = _open_connection(key)
+        pool.connections[key] = conn
+    return conn
+
+
+@contextmanager
+def db_transaction(path=None, immediate=False):
+    """Yields the pooled connection and commits on success or rolls back on error.
+    Nested blocks on the same thread join the outermost transaction.
+    immediate=True takes the write lock up front (BEGIN IMMEDIATE), for read-then-write
+    blocks whose reads must not go stale before they write.
+    """
+    key = str(path or db_path)
+    conn = get_db_connection(key)
+    pool = _pool()
+    depth = pool.depth.get(key, 0)
+    pool.depth[key] = depth + 1
+    try:
+        if immediate and not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        if depth == 0:
+            conn.commit()
+    except Exception:
+        if depth == 0:
+            conn.rollback()
+            pool.hooks.pop(key, None)
+        raise
+    finally:
+        pool.depth[key] = depth
+    if depth == 0:
+        _run_hooks(pool.hooks.pop(key, []))
+
+
+def _run_hooks(hooks):
+    # The data is committed by now: a failing callback is logged, not raised as if the write failed
+    for fn in hooks:
+        try:
+            fn()
+        except Exception as e:
+            logger.error(f"on_commit callback failed: {e}")
+
+
+def on_commit(fn, path=None):
+    """Runs fn once this thread's open transaction commits; it is dropped if the transaction
+    rolls back. Outside a transaction it runs at once.
+    """
+    key = str(path or db_path)
+    pool = _pool()
+    if pool.depth.get(key, 0) == 0:
+        fn()
+    else:
+        pool.hooks.setdefault(key, []).append(fn)
+
+
+@contextmanager
+def read_transaction(conn):
+    """Runs several reads against one snapshot, so a writer committing between them
+    can't be half-seen. Inside an open transaction the reads simply join it.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.commit()
+
+
+def close_db_connections():
+    """Closes every pooled connection owned by the current thread."""
+    pool = _pool()
+    for conn in pool.connections.values():
+        conn.close()
+    pool.connections.clear()
+    pool.depth.clear()
+    pool.hooks.clear()
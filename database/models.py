@@ -1,9 +1,18 @@
-from database.db_config import get_db_connection
+from database.db_config import db_transaction
 
-def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def init_db(path=None):
+    with db_transaction(path) as conn:
+        _create_schema(conn.cursor())
+    print("Database initialized successfully.")
+
+# Topics of NEW.topics (a JSON list; anything else means no topics)
+_INSERT_MODULE_TOPICS = '''
+            INSERT OR IGNORE INTO module_topics (module_id, topic)
+            SELECT NEW.id, value
+            FROM json_each(CASE WHEN json_valid(NEW.topics) THEN NEW.topics ELSE '[]' END)
+            WHERE type = 'text';'''
 
+def _create_schema(cursor):
     # Create users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -37,7 +46,220 @@ def init_db():
             FOREIGN KEY(user_email) REFERENCES users(email)
         )
     ''')
-    
-    conn.commit()
-    conn.close()
-    print("Database initialized successfully.")
+
+    # Configs shared by saves, stored once per content hash (see database/save_store.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS simulation_configs (
+            hash TEXT PRIMARY KEY, -- SHA-256 of the canonical config JSON
+            config_json TEXT NOT NULL
+        )
+    ''')
+    _add_missing_columns(cursor, 'simulation_saves', {
+        'config_hash': 'TEXT REFERENCES simulation_configs(hash)',
+        'state_blob': 'BLOB', # Compact/compressed state, format given by state_format
+        'state_format': 'TEXT', # NULL for rows still using config_json/state_json
+    })
+
+    # Covers the per-user save listing (filter, order and returned columns) without touching the table
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_simulation_saves_user
+        ON simulation_saves (user_email, saved_at DESC, id DESC, title)
+    ''')
+
+    # Autosave deltas waiting to be folded into their save's snapshot
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS save_journal (
+            save_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            delta_json TEXT NOT NULL,
+            PRIMARY KEY (save_id, seq),
+            FOREIGN KEY(save_id) REFERENCES simulation_saves(id)
+        ) WITHOUT ROWID
+    ''')
+
+    # === LEARNING ANALYTICS (ai_module/analytics.py) ===
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS learning_modules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            topics TEXT -- JSON list of topic names
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            interaction_type TEXT NOT NULL,
+            module_id INTEGER,
+            score REAL,
+            time_spent INTEGER, -- minutes
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(module_id) REFERENCES learning_modules(id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_badges (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            badge_name TEXT NOT NULL,
+            description TEXT,
+            earned_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    ''')
+    # One award per badge per user, so awarding is a single INSERT OR IGNORE.
+    # Duplicates left by the old check-then-insert go first (the earliest award is kept).
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_user_badges_user_badge'").fetchone():
+        cursor.execute('''
+            DELETE FROM user_badges
+            WHERE id NOT IN (SELECT MIN(id) FROM user_badges GROUP BY user_id, badge_name)
+        ''')
+        cursor.execute('''
+            CREATE UNIQUE INDEX idx_user_badges_user_badge ON user_badges (user_id, badge_name)
+        ''')
+
+    # One row per (module, topic), so topic filters and groupings can use an index.
+    # The triggers keep it in sync with learning_modules.topics, whoever writes the module.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS module_topics (
+            module_id INTEGER NOT NULL,
+            topic TEXT NOT NULL COLLATE NOCASE,
+            PRIMARY KEY (module_id, topic),
+            FOREIGN KEY(module_id) REFERENCES learning_modules(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_module_topics_topic ON module_topics (topic, module_id)
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS learning_modules_topics_insert
+        AFTER INSERT ON learning_modules
+        BEGIN
+            {_INSERT_MODULE_TOPICS}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS learning_modules_topics_update
+        AFTER UPDATE OF id, topics ON learning_modules
+        BEGIN
+            DELETE FROM module_topics WHERE module_id = OLD.id;
+            {_INSERT_MODULE_TOPICS}
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS learning_modules_topics_delete
+        AFTER DELETE ON learning_modules
+        BEGIN
+            DELETE FROM module_topics WHERE module_id = OLD.id;
+        END
+    ''')
+    # Backfill modules written before the triggers existed
+    cursor.execute('''
+        INSERT OR IGNORE INTO module_topics (module_id, topic)
+        SELECT lm.id, t.value
+        FROM learning_modules lm, json_each(CASE WHEN json_valid(lm.topics) THEN lm.topics ELSE '[]' END) t
+        WHERE t.type = 'text'
+    ''')
+
+    # Rollups of user_interactions, kept current by ai_module/rollups.py
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            total_interactions INTEGER NOT NULL DEFAULT 0,
+            scored_interactions INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            scored_time INTEGER NOT NULL DEFAULT 0, -- time_spent of scored interactions
+            modules_attempted INTEGER NOT NULL DEFAULT 0,
+            active_days INTEGER NOT NULL DEFAULT 0,
+            last_interaction TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_daily_stats (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL, -- DATE(timestamp)
+            interactions INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0, -- unscored interactions count as 0
+            time_spent INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_module_stats (
+            user_id INTEGER NOT NULL,
+            module_id INTEGER NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0, -- scored interactions only
+            score_sum REAL NOT NULL DEFAULT 0,
+            passed INTEGER NOT NULL DEFAULT 0, -- attempts scoring 70 or more
+            PRIMARY KEY (user_id, module_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Platform-wide counters behind get_global_stats (a single row, id = 1)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS global_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            scored_users INTEGER NOT NULL DEFAULT 0, -- users with at least one scored interaction
+            scored_interactions INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            completions INTEGER NOT NULL DEFAULT 0 -- interactions scoring 70 or more
+        )
+    ''')
+    # Seeded from the log once; afterwards ai_module/rollups.py keeps it current
+    cursor.execute('''
+        INSERT OR IGNORE INTO global_stats (id, scored_users, scored_interactions, score_sum, completions)
+        SELECT 1, COUNT(DISTINCT user_id), COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(score >= 70), 0)
+        FROM user_interactions
+        WHERE score IS NOT NULL AND NOT EXISTS (SELECT 1 FROM global_stats)
+    ''')
+
+    # Leaderboard points per user, all time ('all') and per week (period = the week's Monday)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS leaderboard_points (
+            user_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            points INTEGER NOT NULL DEFAULT 0, -- each scored interaction earns its rounded score
+            PRIMARY KEY (user_id, period)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_leaderboard_points_period ON leaderboard_points (period, points DESC, user_id)
+    ''')
+    # Seeded from the log once; afterwards ui/leaderboard.py keeps it current
+    cursor.execute('''
+        INSERT OR IGNORE INTO leaderboard_points (user_id, period, points)
+        SELECT user_id, 'all', SUM(CAST(ROUND(MAX(score, 0)) AS INTEGER))
+        FROM user_interactions
+        WHERE score IS NOT NULL AND NOT EXISTS (SELECT 1 FROM leaderboard_points)
+        GROUP BY user_id
+        UNION ALL
+        SELECT user_id, DATE(timestamp, 'weekday 0', '-6 days'), SUM(CAST(ROUND(MAX(score, 0)) AS INTEGER))
+        FROM user_interactions
+        WHERE score IS NOT NULL AND NOT EXISTS (SELECT 1 FROM leaderboard_points)
+        GROUP BY user_id, DATE(timestamp, 'weekday 0', '-6 days')
+    ''')
+
+    # Class rosters, for per-class leaderboards
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS class_members (
+            class_name TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (class_name, user_id),
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_class_members_user ON class_members (user_id, class_name)
+    ''')
+
+def _add_missing_columns(cursor, table, columns):
+    existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
@@ -0,0 +1,501 @@
+"""
+Compact storage for simulation_saves.
+
+Configs are stored once in simulation_configs, keyed by the SHA-256 of their
+canonical JSON. A save row keeps only that hash and a state blob in which the
+grid (a full copy of an entity object per occupied cell on the frontend) is
+reduced to one small integer per cell: 0 for empty, i + 1 for config.entities[i].
+
+state_format says how state_blob is encoded:
+    'grid1'  - JSON envelope with the grid as a base64 index array
+    'grid1z' - the same, zlib-compressed
+    'json' / 'jsonz' - the raw state JSON (used when the grid can't be indexed,
+                       e.g. a cell holding an entity that isn't in the config)
+Rows written before this format have state_format NULL and still use the
+legacy config_json/state_json columns.
+
+Autosaves don't rewrite the row: the client posts only what changed since
+its base save, which is appended to save_journal. Loading replays the
+journal on top of the stored snapshot, and every COMPACT_EVERY entries the
+journal is folded back into the snapshot. A delta looks like:
+    {"place": [[x, y, entity_id], ...], "remove": [[x, y], ...],
+     "resources": {"money": -150}, "gameDay": 12}
+where resources are added to the current values.
+"""
+import base64
+import hashlib
+import json
+import sys
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+
+from database.db_config import db_transaction, get_db_connection, read_transaction
+
+COMPRESS = True
+COMPACT_EVERY = 50
+# zlib level 6 is the library default: most of the size win for a fraction of level 9's CPU
+COMPRESS_LEVEL = 6
+# Pre-serialized entities per config hash, for streaming loads
+FRAGMENT_CACHE_SIZE = 256
+STREAM_CHUNK_BYTES = 64 * 1024
+
+_fragment_cache = OrderedDict()
+
+
+def config_hash(config: Dict) -> str:
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def encode_state(config: Dict, state: Dict, compress: bool = COMPRESS) -> Tuple[bytes, str]:
+    """Returns (state_blob, state_format) for a frontend state object"""
+    cells = _index_grid(config, state.get("grid"))
+    if cells is None:
+        raw = json.dumps(state).encode("utf-8")
+        return (zlib.compress(raw, COMPRESS_LEVEL), "jsonz") if compress else (raw, "json")
+
+    rows, cols, indices = cells
+    typecode = "B" if len(config.get("entities", [])) < 0xFF else "H"
+    envelope = {
+        # Keep the original key order; "grid" is filled back in on decode
+        "state": {k: (None if k == "grid" else v) for k, v in state.items()},
+        "rows": rows,
+        "cols": cols,
+        "typecode": typecode,
+        "cells": base64.b64encode(array(typecode, indices).tobytes()).decode("ascii"),
+    }
+    raw = json.dumps(envelope, separators=(",", ":")).encode("utf-8")
+    return (zlib.compress(raw, COMPRESS_LEVEL), "grid1z") if compress else (raw, "grid1")
+
+
+def decode_state(config: Dict, blob: bytes, state_format: str) -> Dict:
+    if state_format.endswith("z"):
+        blob = zlib.decompress(blob)
+    if state_format.startswith("json"):
+        return json.loads(blob)
+
+    envelope = json.loads(blob)
+    entities = config.get("entities", [])
+    indices = array(envelope["typecode"])
+    indices.frombytes(base64.b64decode(envelope["cells"]))
+    cols = envelope["cols"]
+    grid = [[entities[i - 1] if i else None for i in indices[r * cols:(r + 1) * cols]]
+            for r in range(envelope["rows"])]
+    state = envelope["state"]
+    state["grid"] = grid
+    return state
+
+
+def _index_grid(config, grid) -> Optional[Tuple[int, int, list]]:
+    if not isinstance(grid, list) or not grid or not all(isinstance(row, list) for row in grid):
+        return None
+    cols = len(grid[0])
+    if any(len(row) != cols for row in grid):
+        return None
+    entities = config.get("entities", [])
+    if len(entities) >= 0xFFFF:
+        return None
+    by_id = {e.get("id"): i for i, e in enumerate(entities)}
+
+    indices = []
+    for row in grid:
+        for cell in row:
+            if cell is None:
+                indices.append(0)
+                continue
+            i = by_id.get(cell.get("id")) if isinstance(cell, dict) else None
+            # Only an exact copy of the config entity can be rebuilt from an index
+            if i is None or cell != entities[i]:
+                return None
+            indices.append(i + 1)
+    return len(grid), cols, indices
+
+
+def store_config(conn, config: Dict) -> str:
+    digest = config_hash(config)
+    conn.execute("INSERT OR IGNORE INTO simulation_configs (hash, config_json) VALUES (?, ?)",
+                 (digest, json.dumps(config)))
+    return digest
+
+
+def insert_save(conn, email: str, title: str, config: Dict, state: Dict) -> int:
+    digest = store_config(conn, config)
+    blob, state_format = encode_state(config, state)
+    cursor = conn.execute('''
+        INSERT INTO simulation_saves (user_email, title, config_hash, state_blob, state_format)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (email, title, digest, blob, state_format))
+    return cursor.lastrowid
+
+
+def encode_cursor(saved_at: str, save_id: int) -> str:
+    raw = json.dumps([saved_at, save_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        saved_at, save_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(saved_at, str) or not isinstance(save_id, int):
+        raise ValueError("Invalid cursor")
+    return saved_at, save_id
+
+
+def list_saves(conn, email: str, limit: int = 50, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+    """
+    One page of a user's saves, newest first, plus the cursor for the next page (None on the last).
+    Keyset pagination: the cursor is the (saved_at, id) of the last row returned.
+    """
+    if cursor:
+        saved_at, save_id = decode_cursor(cursor)
+        rows = conn.execute('''
+            SELECT id, title, saved_at FROM simulation_saves
+            WHERE user_email = ? AND (saved_at, id) < (?, ?)
+            ORDER BY saved_at DESC, id DESC LIMIT ?
+        ''', (email, saved_at, save_id, limit + 1)).fetchall()
+    else:
+        rows = conn.execute('''
+            SELECT id, title, saved_at FROM simulation_saves
+            WHERE user_email = ?
+            ORDER BY saved_at DESC, id DESC LIMIT ?
+        ''', (email, limit + 1)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["saved_at"], rows[-1]["id"])
+    return [_save_summary(r) for r in rows], next_cursor
+
+
+def list_saves_for_users(conn, emails: list, limit: int = 20) -> Dict[str, list]:
+    """Newest `limit` saves for each of many users (e.g. a teacher's class) in one query"""
+    result = {email: [] for email in emails}
+    rows = conn.execute('''
+        SELECT user_email, id, title, saved_at FROM (
+            SELECT user_email, id, title, saved_at,
+                   ROW_NUMBER() OVER (PARTITION BY user_email ORDER BY saved_at DESC, id DESC) AS n
+            FROM simulation_saves
+            WHERE user_email IN (SELECT value FROM json_each(?))
+        )
+        WHERE n <= ?
+        ORDER BY user_email, saved_at DESC, id DESC
+    ''', (json.dumps(list(result)), limit))
+    for r in rows:
+        result[r["user_email"]].append(_save_summary(r))
+    return result
+
+
+def save_owner(conn, save_id: int) -> Optional[str]:
+    row = conn.execute('SELECT user_email FROM simulation_saves WHERE id = ?', (save_id,)).fetchone()
+    return row[0] if row else None
+
+
+def _save_summary(row) -> Dict:
+    return {"id": row["id"], "title": row["title"], "date": row["saved_at"]}
+
+
+def load_save(conn, save_id: int) -> Optional[Tuple[Dict, Dict]]:
+    """Returns (config, state) as last saved: the snapshot plus any journaled deltas"""
+    loaded = _load_with_journal(conn, save_id)
+    return loaded and loaded[:2]
+
+
+def _load_with_journal(conn, save_id):
+    """(config, state, seqs of the deltas applied), or None if there is no such save"""
+    # Snapshot and journal from one read transaction: a compaction committing in between
+    # would otherwise pair the old snapshot with a journal it has already folded in
+    with read_transaction(conn):
+        loaded = _load_snapshot(conn, save_id)
+        if loaded is None:
+            return None
+        config, state = loaded
+        journal = conn.execute('SELECT seq, delta_json FROM save_journal WHERE save_id = ? ORDER BY seq',
+                               (save_id,)).fetchall()
+    for _, delta_json in journal:
+        apply_delta(config, state, json.loads(delta_json))
+    return config, state, [seq for seq, _ in journal]
+
+
+def _load_snapshot(conn, save_id):
+    row = conn.execute('''
+        SELECT s.config_json AS legacy_config, s.state_json AS legacy_state,
+               s.state_blob, s.state_format, c.config_json
+        FROM simulation_saves s
+        LEFT JOIN simulation_configs c ON c.hash = s.config_hash
+        WHERE s.id = ?
+    ''', (save_id,)).fetchone()
+    if not row:
+        return None
+    if row["state_format"] is None:
+        return json.loads(row["legacy_config"]), json.loads(row["legacy_state"])
+    config = json.loads(row["config_json"])
+    return config, decode_state(config, row["state_blob"], row["state_format"])
+
+
+def apply_delta(config: Dict, state: Dict, delta: Dict) -> Dict:
+    """
+    Applies one autosave delta to a frontend state object in place.
+    Cells outside the grid and unknown entity ids are skipped, as the frontend would.
+    """
+    grid = state.get("grid")
+    if isinstance(grid, list) and (delta.get("remove") or delta.get("place")):
+        def in_grid(x, y):
+            return y < len(grid) and isinstance(grid[y], list) and x < len(grid[y])
+
+        for x, y in delta.get("remove", []):
+            if in_grid(x, y):
+                grid[y][x] = None
+        entities = {e.get("id"): e for e in config.get("entities", [])}
+        for x, y, entity_id in delta.get("place", []):
+            if in_grid(x, y) and entity_id in entities:
+                grid[y][x] = entities[entity_id]
+
+    resources = state.setdefault("resources", {})
+    for res, change in (delta.get("resources") or {}).items():
+        resources[res] = resources.get(res, 0) + change
+    if "gameDay" in delta:
+        state["gameDay"] = delta["gameDay"]
+    return state
+
+
+def validate_delta(delta) -> Dict:
+    """Checks the shape of a client delta; raises ValueError on anything malformed"""
+    if not isinstance(delta, dict):
+        raise ValueError("Delta must be an object")
+    unknown = set(delta) - {"place", "remove", "resources", "gameDay"}
+    if unknown:
+        raise ValueError(f"Unknown delta fields: {', '.join(sorted(unknown))}")
+
+    def is_cell(x, y):
+        return all(isinstance(v, int) and not isinstance(v, bool) and v >= 0 for v in (x, y))
+
+    if not all(isinstance(p, list) and len(p) == 3 and is_cell(*p[:2]) and isinstance(p[2], str)
+               for p in delta.get("place", [])):
+        raise ValueError("place entries must be [x, y, entity_id]")
+    if not all(isinstance(r, list) and len(r) == 2 and is_cell(*r) for r in delta.get("remove", [])):
+        raise ValueError("remove entries must be [x, y]")
+    if not isinstance(delta.get("resources") or {}, dict):
+        raise ValueError("resources must be an object")
+    for change in (delta.get("resources") or {}).values():
+        if not isinstance(change, (int, float)) or isinstance(change, bool):
+            raise ValueError("resource deltas must be numbers")
+    if "gameDay" in delta and not isinstance(delta["gameDay"], int):
+        raise ValueError("gameDay must be an integer")
+    return delta
+
+
+def append_delta(conn, save_id: int, email: str, delta: Dict) -> Optional[int]:
+    """
+    Journals a delta against a save owned by `email`.
+    Returns the number of uncompacted deltas afterwards, or None if there is no such save.
+    """
+    delta_json = json.dumps(validate_delta(delta), separators=(",", ":"))
+    # Sequence number and ownership check in one statement, so concurrent autosaves can't collide
+    cursor = conn.execute('''
+        INSERT INTO save_journal (save_id, seq, delta_json)
+        SELECT ?, COALESCE((SELECT MAX(seq) FROM save_journal WHERE save_id = ?), 0) + 1, ?
+        WHERE EXISTS (SELECT 1 FROM simulation_saves WHERE id = ? AND user_email = ?)
+    ''', (save_id, save_id, delta_json, save_id, email))
+    if cursor.rowcount == 0:
+        return None
+    length = conn.execute('SELECT COUNT(*) FROM save_journal WHERE save_id = ?', (save_id,)).fetchone()[0]
+    if length >= COMPACT_EVERY:
+        compact_save(conn, save_id)
+        length = 0
+    return length
+
+
+def compact_save(conn, save_id: int) -> int:
+    """
+    Folds a save's journal into its snapshot. Returns how many deltas were folded.
+    Must run inside a write transaction (append_delta's, or compact_all's BEGIN IMMEDIATE),
+    so no autosave can land between reading the journal and deleting it.
+    """
+    loaded = _load_with_journal(conn, save_id)
+    if not loaded or not loaded[2]:
+        return 0
+    config, state, seqs = loaded
+    digest = store_config(conn, config)
+    blob, state_format = encode_state(config, state)
+    conn.execute('''
+        UPDATE simulation_saves
+        SET config_hash = ?, state_blob = ?, state_format = ?, config_json = NULL, state_json = NULL
+        WHERE id = ?
+    ''', (digest, blob, state_format, save_id))
+    # Exactly the deltas folded in above
+    return conn.execute('DELETE FROM save_journal WHERE save_id = ? AND seq IN (SELECT value FROM json_each(?))',
+                        (save_id, json.dumps(seqs))).rowcount
+
+
+def compact_all(path=None) -> int:
+    """Compacts every save that has a pending journal"""
+    save_ids = [r[0] for r in get_db_connection(path).execute('SELECT DISTINCT save_id FROM save_journal')]
+    for save_id in save_ids:
+        with db_transaction(path, immediate=True) as conn:
+            compact_save(conn, save_id)
+    return len(save_ids)
+
+
+def read_save_payload(conn, save_id: int) -> Optional[Tuple[str, Iterator[bytes]]]:
+    """
+    Returns (etag, chunks) for the /api/load response body {"config": ..., "state": ...},
+    or None if there is no such save.
+
+    The stored config text is sent as-is and the grid is written straight from
+    the index array using each entity's pre-serialized JSON, so nothing large is
+    parsed or re-serialized. Everything is read up front; `chunks` needs no DB access.
+    """
+    # One read transaction for the save and its journal (see load_save)
+    with read_transaction(conn):
+        row = conn.execute('''
+            SELECT s.config_json AS legacy_config, s.state_json AS legacy_state,
+                   s.state_blob, s.state_format, s.config_hash, c.config_json
+            FROM simulation_saves s
+            LEFT JOIN simulation_configs c ON c.hash = s.config_hash
+            WHERE s.id = ?
+        ''', (save_id,)).fetchone()
+        if not row:
+            return None
+        journal = conn.execute('SELECT seq, delta_json FROM save_journal WHERE save_id = ? ORDER BY seq', (save_id,)).fetchall()
+
+    legacy = row["state_format"] is None
+    config_text = row["legacy_config"] if legacy else row["config_json"]
+    state_data = row["legacy_state"] if legacy else row["state_blob"]
+    # Saves only change by journal appends and compaction (which rewrites the blob), so this
+    # identifies the response body exactly
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (str(save_id), row["config_hash"] or config_text, row["state_format"] or "legacy"):
+        digest.update(part.encode("utf-8") + b"\0")
+    digest.update(state_data if isinstance(state_data, bytes) else state_data.encode("utf-8"))
+    for seq, delta_json in journal:
+        digest.update(f"\0{seq}:{delta_json}".encode("utf-8"))
+    etag = digest.hexdigest()
+
+    if legacy and not journal:
+        state_chunks = [state_data.encode("utf-8")]
+    elif row["state_format"] in ("grid1", "grid1z"):
+        state_chunks = _stream_grid_state(row["config_hash"], config_text, state_data, row["state_format"],
+                                          [json.loads(d) for _, d in journal])
+    elif row["state_format"] in ("json", "jsonz") and not journal:
+        state_chunks = [zlib.decompress(state_data) if row["state_format"] == "jsonz" else state_data]
+    else:
+        # Raw-JSON state with pending deltas: rebuild it the slow way, from the rows read above
+        config = json.loads(config_text)
+        state = json.loads(state_data) if legacy else decode_state(config, state_data, row["state_format"])
+        for _, delta_json in journal:
+            apply_delta(config, state, json.loads(delta_json))
+        state_chunks = [json.dumps(state).encode("utf-8")]
+
+    def chunks():
+        yield b'{"config":'
+        yield config_text.encode("utf-8")
+        yield b',"state":'
+        yield from state_chunks
+        yield b"}"
+
+    return etag, chunks()
+
+
+def _entity_fragments(digest: str, config_text: str):
+    """(serialized entities with b"null" at index 0, entity id -> index) for a stored config"""
+    cached = _fragment_cache.get(digest)
+    if cached is None:
+        entities = json.loads(config_text).get("entities", [])
+        fragments = [b"null"] + [json.dumps(e).encode("utf-8") for e in entities]
+        cached = (fragments, {e.get("id"): i + 1 for i, e in enumerate(entities)})
+        _fragment_cache[digest] = cached
+        if len(_fragment_cache) > FRAGMENT_CACHE_SIZE:
+            _fragment_cache.popitem(last=False)
+    else:
+        _fragment_cache.move_to_end(digest)
+    return cached
+
+
+def _stream_grid_state(digest, config_text, blob, state_format, deltas):
+    envelope = json.loads(zlib.decompress(blob) if state_format.endswith("z") else blob)
+    fragments, index_of = _entity_fragments(digest, config_text)
+    rows, cols = envelope["rows"], envelope["cols"]
+    cells = array(envelope["typecode"])
+    cells.frombytes(base64.b64decode(envelope["cells"]))
+    state = envelope["state"]
+
+    # Same rules as apply_delta, on the index array
+    for delta in deltas:
+        for x, y in delta.get("remove", []):
+            if x < cols and y < rows:
+                cells[y * cols + x] = 0
+        for x, y, entity_id in delta.get("place", []):
+            if x < cols and y < rows and entity_id in index_of:
+                cells[y * cols + x] = index_of[entity_id]
+        resources = state.setdefault("resources", {})
+        for res, change in (delta.get("resources") or {}).items():
+            resources[res] = resources.get(res, 0) + change
+        if "gameDay" in delta:
+            state["gameDay"] = delta["gameDay"]
+
+    def grid_chunks():
+        buffered, size = [b"["], 1
+        for r in range(rows):
+            line = b"[" + b",".join(fragments[i] for i in cells[r * cols:(r + 1) * cols]) + b"]"
+            buffered.append(line if r == 0 else b"," + line)
+            size += len(line)
+            if size >= STREAM_CHUNK_BYTES:
+                yield b"".join(buffered)
+                buffered, size = [], 0
+        buffered.append(b"]")
+        yield b"".join(buffered)
+
+    yield b"{"
+    for n, (key, value) in enumerate(state.items()):
+        yield (b"," if n else b"") + json.dumps(key).encode("utf-8") + b":"
+        if key == "grid":
+            yield from grid_chunks()
+        else:
+            yield json.dumps(value).encode("utf-8")
+    yield b"}"
+
+
+def migrate_legacy_saves(path=None, batch_size: int = 1000, vacuum: bool = True) -> int:
+    """Rewrites rows still using config_json/state_json into the compact format"""
+    migrated = 0
+    while True:
+        with db_transaction(path) as conn:
+            rows = conn.execute('''
+                SELECT id, config_json, state_json FROM simulation_saves
+                WHERE state_format IS NULL AND config_json IS NOT NULL
+                LIMIT ?
+            ''', (batch_size,)).fetchall()
+            for row in rows:
+                config = json.loads(row["config_json"])
+                digest = store_config(conn, config)
+                blob, state_format = encode_state(config, json.loads(row["state_json"]))
+                conn.execute('''
+                    UPDATE simulation_saves
+                    SET config_hash = ?, state_blob = ?, state_format = ?, config_json = NULL, state_json = NULL
+                    WHERE id = ?
+                ''', (digest, blob, state_format, row["id"]))
+        if not rows:
+            break
+        migrated += len(rows)
+        if migrated % 10000 == 0:
+            print(f"Migrated {migrated} saves...")
+    if vacuum and migrated:
+        get_db_connection(path).execute("VACUUM")
+    return migrated
+
+
+if __name__ == "__main__":
+    # python -m database.save_store migrate|compact
+    from database.models import init_db
+    if sys.argv[1:] == ["migrate"]:
+        init_db()
+        print(f"Done: {migrate_legacy_saves()} saves migrated.")
+    elif sys.argv[1:] == ["compact"]:
+        init_db()
+        print(f"Done: {compact_all()} save journals compacted.")
+    else:
+        print("usage: python -m database.save_store migrate|compact")
@@ -5,3 +5,9 @@
 const API_BASE_URL = 'https://ecolearnai-production.up.railway.app';
 
 console.log("API Config Loaded:", API_BASE_URL);
+
+// Session token from login/signup, sent to the routes that act for the logged-in user
+function authHeaders(headers = {}) {
+    const token = localStorage.getItem('ecoToken');
+    return token ? { ...headers, 'Authorization': `Bearer ${token}` } : headers;
+}
@@ -5,12 +5,13 @@ document.addEventListener('DOMContentLoaded', () => {
         return;
     }
 
-    fetch(`${API_BASE_URL}/api/user/${userEmail}`)
+    fetch(`${API_BASE_URL}/api/user/${userEmail}`, { headers: authHeaders() })
         .then(res => res.json())
         .then(data => {
             if (data.error) {
                 alert('User not found');
                 localStorage.removeItem('ecoUser');
+                localStorage.removeItem('ecoToken');
                 window.location.href = '/login';
             } else {
                 document.getElementById('user-name').textContent = data.name;
@@ -20,11 +21,13 @@ document.addEventListener('DOMContentLoaded', () => {
         .catch(() => {
             alert('Error fetching user data.');
             localStorage.removeItem('ecoUser');
+            localStorage.removeItem('ecoToken');
             window.location.href = '/login';
         });
 
     document.getElementById('logout-btn')?.addEventListener('click', () => {
         localStorage.removeItem('ecoUser');
+        localStorage.removeItem('ecoToken');
         window.location.href = '/login';
     });
 
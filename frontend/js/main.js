@@ -53,6 +53,7 @@ window.addEventListener('DOMContentLoaded', () => {
         if (logoutBtn) {
             logoutBtn.addEventListener('click', () => {
                 localStorage.removeItem('ecoUser');
+                localStorage.removeItem('ecoToken');
                 window.location.href = '/'; // Redirect to home on logout
             });
         }
@@ -114,6 +115,7 @@ window.addEventListener('DOMContentLoaded', () => {
             if (res.ok) {
                 alert(data.message);
                 localStorage.setItem('ecoUser', email);
+                localStorage.setItem('ecoToken', data.token);
                 window.location.href = '/dashboard';
             } else {
                 alert(data.error || 'Signup failed');
@@ -148,6 +150,7 @@ window.addEventListener('DOMContentLoaded', () => {
             if (res.ok) {
                 alert(data.message);
                 localStorage.setItem('ecoUser', email);
+                localStorage.setItem('ecoToken', data.token);
                 window.location.href = '/dashboard';
             } else {
                 alert(data.error || 'Login failed');
@@ -359,36 +359,96 @@ document.addEventListener('DOMContentLoaded', () => {
     const closeLoad = document.getElementById('close-load');
     const saveList = document.getElementById('save-list');
 
+    // The save this game writes to, and the state the server last stored for it.
+    // Once there is one, Save and autosave send only what changed (POST /api/save/<id>/delta).
+    const AUTOSAVE_MS = 30000;
+    let currentSaveId = null;
+    let savedState = null;
+    let saving = null;
+
+    function snapshotState() {
+        return {
+            grid: gridState.map(row => row.map(cell => cell ? cell.id : null)),
+            resources: { ...resources },
+            gameDay: gameDay
+        };
+    }
+
+    function stateDelta(base, now) {
+        // Same shape the server's apply_delta replays: removals, placements, additive resources, gameDay
+        const changes = {};
+        const place = [];
+        const remove = [];
+        now.grid.forEach((row, y) => row.forEach((id, x) => {
+            const before = base.grid[y] ? base.grid[y][x] : null;
+            if (id === before) return;
+            if (id) place.push([x, y, id]);
+            else remove.push([x, y]);
+        }));
+        if (place.length) changes.place = place;
+        if (remove.length) changes.remove = remove;
+        const resourceChanges = {};
+        for (const [key, val] of Object.entries(now.resources)) {
+            const change = val - (base.resources[key] || 0);
+            if (change) resourceChanges[key] = change;
+        }
+        if (Object.keys(resourceChanges).length) changes.resources = resourceChanges;
+        if (now.gameDay !== base.gameDay) changes.gameDay = now.gameDay;
+        return Object.keys(changes).length ? changes : null;
+    }
+
+    async function writeSave() {
+        const now = snapshotState();
+        if (currentSaveId !== null) {
+            const changes = stateDelta(savedState, now);
+            if (!changes) return true;
+            const res = await fetch(`${API_BASE_URL}/api/save/${currentSaveId}/delta`, {
+                method: 'POST',
+                headers: authHeaders({ 'Content-Type': 'application/json' }),
+                body: JSON.stringify({ email: user, changes: changes })
+            });
+            if (res.ok) {
+                savedState = now;
+                return true;
+            }
+            if (res.status !== 404) return false;
+            currentSaveId = null; // The save is gone: start a new one below
+        }
+
+        // First save of this game: the full config and state, which later deltas build on
+        const res = await fetch(`${API_BASE_URL}/api/save`, {
+            method: 'POST',
+            headers: authHeaders({ 'Content-Type': 'application/json' }),
+            body: JSON.stringify({
+                email: user,
+                title: config.title || "Untitled Simulation",
+                config: config,
+                state: { grid: gridState, resources: resources, gameDay: gameDay, history: [] }
+            })
+        });
+        if (!res.ok) return false;
+        currentSaveId = (await res.json()).id;
+        savedState = now;
+        return true;
+    }
+
+    function saveGame() {
+        // One write at a time, so a delta is never computed against a base still in flight
+        if (!saving) saving = writeSave().finally(() => { saving = null; });
+        return saving;
+    }
+
+    setInterval(() => {
+        if (currentSaveId !== null) saveGame().catch(e => console.error("Autosave failed:", e));
+    }, AUTOSAVE_MS);
+
     if (saveBtn) {
         saveBtn.addEventListener('click', async () => {
-            const user = localStorage.getItem('ecoUser'); // Is email?
             if (!user) return alert("Please login to save.");
 
             saveBtn.textContent = "Saving...";
-
-            // Gather state
-            const state = {
-                grid: gridState, // Entities need to be serialized carefully? 
-                // gridState contains objects from config.entities. 
-                // JSON.stringify works fine if they are simple objects.
-                resources: resources,
-                gameDay: gameDay,
-                history: [] // Future: Chat history
-            };
-
             try {
-                const res = await fetch(`${API_BASE_URL}/api/save`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        email: user,
-                        title: config.title || "Untitled Simulation",
-                        config: config,
-                        state: state
-                    })
-                });
-
-                if (res.ok) alert("Game Saved!");
+                if (await saveGame()) alert("Game Saved!");
                 else alert("Save failed.");
             } catch (e) {
                 console.error(e);
@@ -408,7 +468,7 @@ document.addEventListener('DOMContentLoaded', () => {
             saveList.innerHTML = '<p>Loading saves...</p>';
 
             try {
-                const res = await fetch(`${API_BASE_URL}/api/saves/${user}`);
+                const res = await fetch(`${API_BASE_URL}/api/saves/${user}`, { headers: authHeaders() });
                 const saves = await res.json();
 
                 saveList.innerHTML = '';
@@ -450,7 +510,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function loadGame(id) {
         try {
-            const res = await fetch(`${API_BASE_URL}/api/load/${id}`);
+            const res = await fetch(`${API_BASE_URL}/api/load/${id}`, { headers: authHeaders() });
             const data = await res.json();
 
             if (data.error) throw new Error(data.error);
@@ -515,6 +575,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
             }
 
+            // Later saves and autosaves go to the loaded save as deltas
+            currentSaveId = id;
+            savedState = snapshotState();
             loadModal.style.display = 'none';
             alert("Game Loaded!");
 
@@ -579,19 +642,74 @@ document.addEventListener('DOMContentLoaded', () => {
     const closeLoad = document.getElementById('close-load');
     const saveList = document.getElementById('save-list');
 
+    // After the first full save (or a load), Save and autosave send only deltas (POST /api/save/<id>/delta)
+    const AUTOSAVE_MS = 30000;
+    let currentSaveId = null, savedState = null, saving = null;
+
+    function snapshotState() {
+        return { grid: gridState.map(row => row.map(cell => cell ? cell.id : null)), resources: { ...resources }, gameDay: gameDay };
+    }
+
+    function stateDelta(base, now) {
+        const changes = {}, place = [], remove = [], resourceChanges = {};
+        now.grid.forEach((row, y) => row.forEach((id, x) => {
+            if (id === (base.grid[y] ? base.grid[y][x] : null)) return;
+            if (id) place.push([x, y, id]); else remove.push([x, y]);
+        }));
+        if (place.length) changes.place = place;
+        if (remove.length) changes.remove = remove;
+        for (const [key, val] of Object.entries(now.resources)) {
+            const change = val - (base.resources[key] || 0);
+            if (change) resourceChanges[key] = change;
+        }
+        if (Object.keys(resourceChanges).length) changes.resources = resourceChanges;
+        if (now.gameDay !== base.gameDay) changes.gameDay = now.gameDay;
+        return Object.keys(changes).length ? changes : null;
+    }
+
+    async function writeSave(user) {
+        const now = snapshotState();
+        if (currentSaveId !== null) {
+            const changes = stateDelta(savedState, now);
+            if (!changes) return true;
+            const res = await fetch(`${API_BASE_URL}/api/save/${currentSaveId}/delta`, {
+                method: 'POST',
+                headers: authHeaders({ 'Content-Type': 'application/json' }),
+                body: JSON.stringify({ email: user, changes: changes })
+            });
+            if (res.ok) { savedState = now; return true; }
+            if (res.status !== 404) return false;
+            currentSaveId = null;
+        }
+        const state = { grid: gridState, resources: resources, gameDay: gameDay, history: [] };
+        const res = await fetch(`${API_BASE_URL}/api/save`, {
+            method: 'POST',
+            headers: authHeaders({ 'Content-Type': 'application/json' }),
+            body: JSON.stringify({ email: user, title: config.title || "Untitled Simulation", config: config, state: state })
+        });
+        if (!res.ok) return false;
+        currentSaveId = (await res.json()).id;
+        savedState = now;
+        return true;
+    }
+
+    function saveGame(user) {
+        if (!saving) saving = writeSave(user).finally(() => { saving = null; });
+        return saving;
+    }
+
+    setInterval(() => {
+        const user = localStorage.getItem('ecoUser');
+        if (user && currentSaveId !== null) saveGame(user).catch(e => console.error("Autosave failed:", e));
+    }, AUTOSAVE_MS);
+
     if (saveBtn) {
         saveBtn.addEventListener('click', async () => {
             const user = localStorage.getItem('ecoUser');
             if (!user) return alert("Please login to save.");
             saveBtn.textContent = "Saving...";
-            const state = { grid: gridState, resources: resources, gameDay: gameDay, history: [] };
             try {
-                const res = await fetch(`${API_BASE_URL}/api/save`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ email: user, title: config.title || "Untitled Simulation", config: config, state: state })
-                });
-                if (res.ok) alert("Game Saved!");
+                if (await saveGame(user)) alert("Game Saved!");
                 else alert("Save failed.");
             } catch (e) { console.error(e); alert("Error saving game."); }
             finally { saveBtn.innerHTML = '<i class="fas fa-save"></i> Save'; }
@@ -605,7 +723,7 @@ document.addEventListener('DOMContentLoaded', () => {
             loadModal.style.display = 'flex';
             saveList.innerHTML = '<p>Loading saves...</p>';
             try {
-                const res = await fetch(`${API_BASE_URL}/api/saves/${user}`);
+                const res = await fetch(`${API_BASE_URL}/api/saves/${user}`, { headers: authHeaders() });
                 const saves = await res.json();
                 saveList.innerHTML = '';
                 if (saves.length === 0) { saveList.innerHTML = '<p>No saved games found.</p>'; return; }
@@ -624,7 +742,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function loadGame(id) {
         try {
-            const res = await fetch(`${API_BASE_URL}/api/load/${id}`);
+            const res = await fetch(`${API_BASE_URL}/api/load/${id}`, { headers: authHeaders() });
             const data = await res.json();
             if (data.error) throw new Error(data.error);
             config = data.config;
@@ -658,6 +776,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     gridEl.appendChild(cell);
                 }
             }
+            currentSaveId = id;
+            savedState = snapshotState();
             loadModal.style.display = 'none';
             alert("Game Loaded!");
         } catch (e) { console.error(e); alert("Failed to load save."); }
@@ -686,17 +806,48 @@ document.addEventListener('DOMContentLoaded', () => {
         chatInput.value = '';
         const loadingId = addMessage('Thinking...', 'ai');
         try {
-            const res = await fetch(`${API_BASE_URL}/api/simulation/chat`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: text, config: config })
+            const bubble = document.getElementById(loadingId);
+            const reply = await streamChat({ message: text, config: config }, (soFar) => {
+                bubble.textContent = soFar;
+                chatMessages.scrollTop = chatMessages.scrollHeight;
             });
-            const data = await res.json();
-            document.getElementById(loadingId).remove();
-            addMessage(data.reply || "I am silent.", 'ai');
+            bubble.textContent = reply || "I am silent.";
         } catch (err) { console.error(err); document.getElementById(loadingId).textContent = "Error: " + err.message; }
     }
 
+    // POSTs to the chat endpoint in streaming mode (server-sent events) and calls
+    // onUpdate with the reply so far as tokens arrive. Resolves to the full reply.
+    async function streamChat(body, onUpdate) {
+        const res = await fetch(`${API_BASE_URL}/api/simulation/chat`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+            body: JSON.stringify({ ...body, stream: true })
+        });
+        if (!res.body || !(res.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+            const data = await res.json();
+            return data.reply || data.error;
+        }
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '', reply = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let end;
+            while ((end = buffer.indexOf('\n\n')) >= 0) {
+                const event = buffer.slice(0, end);
+                buffer = buffer.slice(end + 2);
+                const dataLine = event.split('\n').find(line => line.startsWith('data:'));
+                if (!dataLine) continue;
+                const data = JSON.parse(dataLine.slice(5));
+                if (data.delta !== undefined) { reply += data.delta; onUpdate(reply); }
+                if (data.reply !== undefined) reply = data.reply;
+            }
+        }
+        return reply;
+    }
+
     function addMessage(text, type) {
         const div = document.createElement('div');
         div.id = 'msg-' + Date.now();
@@ -761,20 +912,20 @@ document.addEventListener('DOMContentLoaded', () => {
         if (!isAuto) { addLearnMessage(`u-${Date.now()}`, text, 'user'); learnInput.value = ''; }
         const loadingId = addLearnMessage(`l-${Date.now()}`, "Professor Eco is thinking...", 'ai');
         try {
-            const res = await fetch(`${API_BASE_URL}/api/simulation/chat`, { // Re-using chat endpoint for simplicity but ideally new one
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    message: text,
-                    config: config,
-                    current_resources: resources,
-                    topic: activeTopic,
-                    persona: "Professor"
-                })
+            const bubble = document.getElementById(loadingId);
+            // Re-using chat endpoint for simplicity but ideally new one
+            const reply = await streamChat({
+                message: text,
+                config: config,
+                current_resources: resources,
+                topic: activeTopic,
+                persona: "Professor"
+            }, (soFar) => {
+                bubble.textContent = soFar;
+                learnMsgs.scrollTop = learnMsgs.scrollHeight;
             });
-            const data = await res.json();
-            document.getElementById(loadingId).remove();
-            addLearnMessage(`ai-${Date.now()}`, data.reply, 'ai');
+            bubble.remove();
+            addLearnMessage(`ai-${Date.now()}`, reply, 'ai');
         } catch (e) { document.getElementById(loadingId).textContent = "Error: " + e.message; }
     }
 
@@ -1,18 +1,31 @@
+import io
 import os
-from flask import Flask, send_from_directory, request, jsonify
+import json
+from functools import wraps
+from flask import Flask, Response, send_from_directory, request, jsonify, g
 from user_system.auth import register_user, validate_user, get_user_by_email, create_reset_token, perform_password_reset
+from user_system.passwords import HashQueueFull
+from user_system.sessions import SESSIONS, bearer_token, is_staff
+from user_system.admin import import_roster, roster_format
+from user_system.roles import STUDENT, can_import
 from ai_module.analytics import LearningAnalytics
+from ai_module.ingest import IngestQueueFull
+from ui.leaderboard import Leaderboard
 from database.models import init_db
 from simulations.procedural_engine import generate_procedural_config
-from simulations.ai_generator import generate_simulation_config
-from simulations.llm_bridge import chat_with_simulation
+from simulations.ai_generator import generate_simulation_config, GENERATION_CACHE
+from simulations.llm_bridge import chat_with_simulation, stream_chat_with_simulation
+from simulations.llm_cache import LLM_CACHE
 from flask_cors import CORS
 
 # Initialize Database
 init_db()
+analytics = LearningAnalytics()
+leaderboard = Leaderboard()
+analytics.listeners.append(leaderboard.record)
 
 app = Flask(__name__)
-CORS(app) # Enable CORS for all routes  
+CORS(app, expose_headers=['X-Next-Cursor']) # Enable CORS for all routes
 
 # Serve index.html from frontend folder
 @app.route('/')
@@ -37,17 +50,48 @@ def signup_page():
 def login_page():
     return send_from_directory('frontend', 'login.html')
 
+# Password hashing is bounded (see user_system/passwords.py): a full queue is a retryable 503
+@app.errorhandler(HashQueueFull)
+def hash_queue_full(e):
+    response = jsonify({"error": str(e)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# Protected routes take the caller from the signed session token (see user_system/sessions.py),
+# checked in memory, instead of trusting the email the client sends
+def require_session(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.session = SESSIONS.verify(bearer_token(request.headers.get('Authorization')))
+        if g.session is None:
+            return jsonify({"error": "Login required"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def session_owns(email):
+    return g.session['email'] == email
+
+def session_is(user_id):
+    return g.session['id'] == user_id
+
+def session_response(user, message):
+    return jsonify({"message": message, "email": user['email'], "token": SESSIONS.issue(user), "user": user})
+
 @app.route('/signup', methods=['POST'])
 def signup():
     data = request.get_json()
     name = data.get('name')
     email = data.get('email')
     password = data.get('password')
-    role = data.get('role')
+    role = data.get('role') or STUDENT
+
+    # Self-signup only makes students; staff accounts come from an admin's roster import
+    if role != STUDENT:
+        return jsonify({"error": "Teacher and admin accounts are created by your school admin"}), 403
 
     success = register_user(name, email, password, role)
     if success:
-        return jsonify({"message": "Signup successful"}), 200
+        return session_response(get_user_by_email(email), "Signup successful"), 200
     else:
         return jsonify({"error": "Email already exists"}), 400
 
@@ -59,18 +103,42 @@ def login():
 
     valid = validate_user(email, password)
     if valid:
-        return jsonify({"message": "Login successful", "email": email}), 200
+        return session_response(get_user_by_email(email), "Login successful"), 200
     else:
         return jsonify({"error": "Invalid credentials"}), 401
 
 @app.route('/api/user/<email>', methods=['GET'])
+@require_session
 def api_user(email):
+    if not session_owns(email):
+        return jsonify({"error": "Forbidden"}), 403
     user = get_user_by_email(email)
     if user:
         return jsonify(user)
     else:
         return jsonify({"error": "User not found"}), 404
     
+# Bulk account creation from a CSV/NDJSON roster (see user_system/admin.py)
+@app.route('/api/admin/roster', methods=['POST'])
+@require_session
+def import_roster_route():
+    if not can_import(g.session['role']):
+        return jsonify({"error": "Forbidden"}), 403
+    fmt = request.args.get('format') or roster_format(request.mimetype)
+    if fmt is None:
+        return jsonify({"error": "Send the roster as text/csv or application/x-ndjson"}), 415
+
+    try:
+        # Read straight off the request body, so a large roster is never held whole in memory
+        stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8-sig', newline='')
+        report = import_roster(stream, fmt, g.session['role'], request.args.get('class'))
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    for class_name in report['classes']:
+        leaderboard.invalidate(class_name)
+    return jsonify(report), 200
+
 @app.route('/dashboard')
 def dashboard_page():
     return send_from_directory('frontend', 'dashboard.html')
@@ -96,9 +164,17 @@ def generate_simulation():
     data = request.get_json()
     prompt = data.get('prompt', '')
     use_llm = data.get('use_llm', False)
-    config = generate_simulation_config(prompt, use_llm)
+    seed = data.get('seed') # Optional: same prompt + seed gives the same (cached) world
+    # numpy's SeedSequence only takes non-negative seeds
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        return jsonify({"error": "seed must be a non-negative integer"}), 400
+    config = generate_simulation_config(prompt, use_llm, seed)
     return jsonify(config)
 
+@app.route('/api/builder/cache', methods=['GET'])
+def generation_cache_stats():
+    return jsonify(GENERATION_CACHE.stats())
+
 @app.route('/hub')
 def hub_page():
     return send_from_directory('frontend', 'hub.html')
@@ -199,77 +275,226 @@ def simulation_chat():
     # In a real app, we'd get the key from env
     # For demo, we might mock it or expect it in env
     api_key = os.environ.get("LLM_API_KEY", "MOCK") 
-    
+
+    # Clients that ask for it get the reply token by token over server-sent events;
+    # everyone else still gets the whole reply as JSON
+    if data.get('stream') or request.accept_mimetypes.best == 'text/event-stream':
+        def events():
+            reply = []
+            for delta in stream_chat_with_simulation(message, config, api_key, persona, resources, topic):
+                reply.append(delta)
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'reply': ''.join(reply)})}\n\n"
+
+        return Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
     reply = chat_with_simulation(message, config, api_key, persona, resources, topic)
     return jsonify({"reply": reply})
 
+# Landing page counters, served from memory
+@app.route('/api/stats/global', methods=['GET'])
+def global_stats():
+    return jsonify(analytics.get_global_stats())
+
+EVENTS_MAX_BATCH = 5000
+
+@app.route('/api/analytics/events', methods=['POST'])
+@require_session
+def track_events():
+    # Batched telemetry: queued for the background writer, committed within a fraction of a second
+    data = request.get_json(silent=True)
+    events = data.get('events') if isinstance(data, dict) else data
+    if not isinstance(events, list) or not events:
+        return jsonify({"error": "events must be a non-empty list"}), 400
+    if len(events) > EVENTS_MAX_BATCH:
+        return jsonify({"error": f"At most {EVENTS_MAX_BATCH} events per request"}), 413
+
+    # Events are always the caller's own; user_id may be left out
+    user_id = g.session['id']
+    if any(isinstance(e, dict) and e.get('user_id', user_id) != user_id for e in events):
+        return jsonify({"error": "Forbidden"}), 403
+    events = [dict(e, user_id=user_id) if isinstance(e, dict) else e for e in events]
+
+    try:
+        accepted = analytics.track_interactions(events)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except IngestQueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    return jsonify({"accepted": accepted}), 202
+
+@app.route('/api/analytics/ingest', methods=['GET'])
+def ingest_stats():
+    return jsonify(analytics.ingestor.stats())
+
+# Leaderboards are served from memory (see ui/leaderboard.py)
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+    window = request.args.get('window', 'all')
+    limit = request.args.get('limit', 10, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit < 1 or offset < 0:
+        return jsonify({"error": "limit must be positive and offset non-negative"}), 400
+    try:
+        return jsonify(leaderboard.top(window, limit, offset, request.args.get('class')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/leaderboard/rank/<int:user_id>', methods=['GET'])
+@require_session
+def get_leaderboard_rank(user_id):
+    if not session_is(user_id):
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        return jsonify(leaderboard.rank(user_id, request.args.get('window', 'all'), request.args.get('class')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+# Next modules from the offline item-item model (see ai_module/recommender.py)
+@app.route('/api/recommendations/<int:user_id>', methods=['GET'])
+@require_session
+def get_recommendations(user_id):
+    if not session_is(user_id):
+        return jsonify({"error": "Forbidden"}), 403
+    limit = min(request.args.get('limit', 5, type=int), 20)
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+    try:
+        return jsonify(analytics.recommender.recommend(user_id, limit))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/llm/cache', methods=['GET'])
+def llm_cache_stats():
+    return jsonify(LLM_CACHE.stats())
+
 # === SAVE/LOAD ENDPOINTS ===
-from database.db_config import get_db_connection
+from database.db_config import get_db_connection, db_transaction
+from database import save_store
 
 @app.route('/api/save', methods=['POST'])
+@require_session
 def save_simulation():
     data = request.json
-    email = data.get('email')
+    email = data.get('email', g.session['email'])
     title = data.get('title')
     config = data.get('config') # JSON object
     state = data.get('state')   # JSON object
     
     if not email or not config or not state:
         return jsonify({"error": "Missing data"}), 400
+    if not session_owns(email):
+        return jsonify({"error": "Forbidden"}), 403
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Serialize if they are dicts (Flask request.json automatically parses them)
-        import json
-        config_str = json.dumps(config)
-        state_str = json.dumps(state)
-        
-        cursor.execute('''
-            INSERT INTO simulation_saves (user_email, title, config_json, state_json)
-            VALUES (?, ?, ?, ?)
-        ''', (email, title, config_str, state_str))
+        # Config is stored once per content hash, the grid as entity indices
+        with db_transaction() as conn:
+            save_id = save_store.insert_save(conn, email, title, config, state)
         
-        conn.commit()
-        conn.close()
-        return jsonify({"message": "Game saved successfully!"}), 200
+        return jsonify({"message": "Game saved successfully!", "id": save_id}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/save/<int:save_id>/delta', methods=['POST'])
+@require_session
+def autosave_simulation(save_id):
+    # Incremental autosave: only the changes since the base save (see database/save_store.py)
+    data = request.json
+    email = data.get('email', g.session['email'])
+    changes = data.get('changes')
+
+    if not email or changes is None:
+        return jsonify({"error": "Missing data"}), 400
+    if not session_owns(email):
+        return jsonify({"error": "Forbidden"}), 403
+
+    try:
+        with db_transaction() as conn:
+            length = save_store.append_delta(conn, save_id, email, changes)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    if length is None:
+        return jsonify({"error": "Save not found"}), 404
+    return jsonify({"message": "Autosaved", "pending": length}), 200
+
+SAVES_PAGE_SIZE = 50
+SAVES_MAX_PAGE_SIZE = 200
+
 @app.route('/api/saves/<email>', methods=['GET'])
+@require_session
 def list_saves(email):
+    if not session_owns(email):
+        return jsonify({"error": "Forbidden"}), 403
+    # The body stays a plain list for old clients; the next page's cursor is in X-Next-Cursor
+    limit = min(request.args.get('limit', SAVES_PAGE_SIZE, type=int), SAVES_MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, title, saved_at FROM simulation_saves WHERE user_email = ? ORDER BY saved_at DESC', (email,))
-        rows = cursor.fetchall()
-        conn.close()
-        
-        saves = [{"id": r["id"], "title": r["title"], "date": r["saved_at"]} for r in rows]
-        return jsonify(saves)
+        saves, next_cursor = save_store.list_saves(get_db_connection(), email, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    response = jsonify(saves)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/api/saves/batch', methods=['POST'])
+@require_session
+def list_saves_batch():
+    # Teacher views: latest saves for many students in one query
+    if not is_staff(g.session):
+        return jsonify({"error": "Forbidden"}), 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    emails = data.get('emails')
+    limit = data.get('limit', 20)
+
+    if not isinstance(emails, list) or not all(isinstance(e, str) for e in emails):
+        return jsonify({"error": "emails must be a list"}), 400
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = min(limit, SAVES_MAX_PAGE_SIZE)
+
+    try:
+        return jsonify(save_store.list_saves_for_users(get_db_connection(), emails, limit))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/load/<int:save_id>', methods=['GET'])
+@require_session
 def load_save(save_id):
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT config_json, state_json FROM simulation_saves WHERE id = ?', (save_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            import json
-            return jsonify({
-                "config": json.loads(row["config_json"]),
-                "state": json.loads(row["state_json"])
-            })
-        else:
-            return jsonify({"error": "Save not found"}), 404
+        owner = save_store.save_owner(conn, save_id)
+        # Someone else's save answers like a missing one, so ids can't be probed
+        payload = save_store.read_save_payload(conn, save_id) if session_owns(owner) else None
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    if not payload:
+        return jsonify({"error": "Save not found"}), 404
+
+    # Stored JSON is streamed as-is; repeat loads revalidate against the ETag
+    etag, chunks = payload
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(chunks, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 if __name__ == '__main__':
     app.run(debug=True)
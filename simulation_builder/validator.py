@@ -0,0 +1,170 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from simulations.core.grid_engine import GridEngine, SCORE, CRISIS_INTERVAL
+
+# Thresholds a generated world must meet to be handed to students
+MAX_BANKRUPT_RATE = 0.9      # bankruptcy is (nearly) unavoidable above this
+MAX_DOMINANT_SHARE = 0.8     # winning strategies are mostly one entity above this
+MIN_SCORE_STD = 1e-9         # every strategy ends the same: choices don't matter
+
+# Chunks smaller than this are cheaper to run inline than to ship to a worker
+MIN_CHUNK = 2500
+
+_executor = None
+
+
+def _get_executor(workers):
+    # Kept for the life of the process so /api/builder/generate doesn't pay pool startup per request
+    global _executor
+    if _executor is None:
+        # spawn: forking a multi-threaded server process can deadlock the child
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    return _executor
+
+
+def _simulate_chunk(config: Dict, playthroughs: int, days: int, seed) -> Dict:
+    """Plays `playthroughs` randomized build strategies against one config"""
+    rng = np.random.default_rng(seed)
+    engine = GridEngine(config)
+    n_entities = len(engine.entity_ids)
+    counts = np.zeros((playthroughs, n_entities), dtype=np.int64)
+    resources = np.tile(engine.initial_resources(), (playthroughs, 1))
+    if n_entities == 0:
+        bankrupt_day = engine.run(days, counts, resources, rng=rng)["bankrupt_day"]
+        return {"scores": _score(engine, resources), "bankrupt_day": bankrupt_day, "counts": counts}
+
+    # A strategy is a preference over entities (Dirichlet: from specialists to
+    # generalists) plus how eagerly it reinvests during the game
+    preference = rng.dirichlet(np.full(n_entities, 0.5), size=playthroughs)
+    eagerness = rng.random(playthroughs)
+
+    # Opening: buy until nothing preferred is affordable or the grid is full
+    active = np.ones(playthroughs, dtype=bool)
+    for _ in range(engine.width * engine.height):
+        active &= _buy(engine, counts, resources, preference, active, rng)
+        if not active.any():
+            break
+
+    # Then alternate reinvesting and ticking to the next crisis check
+    bankrupt_day = np.full(playthroughs, -1, dtype=np.int64)
+    day = 1
+    while day < days + 1:
+        _buy(engine, counts, resources, preference, rng.random(playthroughs) < eagerness, rng)
+        step = min(CRISIS_INTERVAL - day % CRISIS_INTERVAL, days + 1 - day)
+        outcome = engine.run(step, counts, resources, start_day=day, rng=rng)
+        fresh = (outcome["bankrupt_day"] >= 0) & (bankrupt_day < 0)
+        bankrupt_day[fresh] = outcome["bankrupt_day"][fresh]
+        day = outcome["day"]
+
+    return {"scores": _score(engine, resources), "bankrupt_day": bankrupt_day, "counts": counts}
+
+
+def _buy(engine, counts, resources, preference, mask, rng):
+    """Each masked world buys one entity drawn from its affordable preferences"""
+    bought = np.zeros(len(counts), dtype=bool)
+    rows = np.flatnonzero(mask)
+    if rows.size == 0:
+        return bought
+    sub_counts, sub_resources = counts[rows], resources[rows]
+    weights = preference[rows] * engine.affordable(sub_resources)
+    totals = weights.sum(axis=1)
+    pick = rng.random(rows.size) * totals
+    entity = np.minimum((np.cumsum(weights, axis=1) <= pick[:, None]).sum(axis=1), counts.shape[1] - 1)
+    bought[rows] = engine.place(sub_counts, sub_resources, entity, totals > 0)
+    counts[rows], resources[rows] = sub_counts, sub_resources
+    return bought
+
+
+def _score(engine, resources):
+    # Worlds without an explicit score are judged on total final resources
+    if SCORE in engine.resource_index:
+        return resources[:, engine.resource_index[SCORE]].copy()
+    return resources.sum(axis=1)
+
+
+def evaluate_balance(config: Dict, playthroughs: int = 10000, days: int = 120,
+                     seed: Optional[int] = None, workers: Optional[int] = None) -> Dict:
+    """
+    Runs randomized build strategies against a config and reports balance metrics.
+    Work is split across a process pool when there is enough of it.
+    """
+    workers = workers or os.cpu_count() or 1
+    # The split depends only on the playthrough count, so a seeded run gives the same
+    # report whatever the number of workers
+    chunks = max(1, playthroughs // MIN_CHUNK)
+    sizes = [len(part) for part in np.array_split(np.arange(playthroughs), chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+
+    if chunks == 1 or workers == 1:
+        results = [_simulate_chunk(config, n, days, s) for n, s in zip(sizes, seeds)]
+    else:
+        executor = _get_executor(workers)
+        results = list(executor.map(_simulate_chunk, [config] * chunks, sizes, [days] * chunks, seeds))
+
+    scores = np.concatenate([r["scores"] for r in results])
+    bankrupt_day = np.concatenate([r["bankrupt_day"] for r in results])
+    counts = np.concatenate([r["counts"] for r in results])
+    return _summarize(config, scores, bankrupt_day, counts, days)
+
+
+def _summarize(config, scores, bankrupt_day, counts, days):
+    bankrupt = bankrupt_day >= 0
+    entity_ids = [e["id"] for e in config.get("entities", [])]
+
+    # Dominance: what the best 10% of strategies built
+    dominant_entity, dominant_share = None, 0.0
+    if entity_ids and len(scores):
+        top = scores >= np.quantile(scores, 0.9)
+        built = counts[top].sum(axis=0)
+        if built.sum() > 0:
+            dominant_entity = entity_ids[int(built.argmax())]
+            dominant_share = float(built.max() / built.sum())
+
+    return {
+        "playthroughs": int(len(scores)),
+        "days": days,
+        "bankrupt_rate": float(bankrupt.mean()) if len(scores) else 0.0,
+        "median_days_to_bankruptcy": float(np.median(bankrupt_day[bankrupt])) if bankrupt.any() else None,
+        "dominant_entity": dominant_entity,
+        "dominant_entity_share": round(dominant_share, 4),
+        "score_mean": float(scores.mean()) if len(scores) else 0.0,
+        "score_std": float(scores.std()) if len(scores) else 0.0,
+        "score_variance": float(scores.var()) if len(scores) else 0.0,
+    }
+
+
+def balance_problems(report: Dict) -> list:
+    """Human-readable reasons a report fails the thresholds (empty list means playable)"""
+    problems = []
+    if report["bankrupt_rate"] > MAX_BANKRUPT_RATE:
+        problems.append(f"Bankruptcy in {report['bankrupt_rate']:.0%} of playthroughs")
+    if report["dominant_entity_share"] > MAX_DOMINANT_SHARE:
+        problems.append(f"'{report['dominant_entity']}' is {report['dominant_entity_share']:.0%} of winning builds")
+    if report["score_std"] < MIN_SCORE_STD:
+        problems.append("Every strategy ends with the same score")
+    return problems
+
+
+def generate_balanced_config(generate: Callable[..., Dict], prompt: str, attempts: int = 3,
+                             seed: Optional[int] = None, **kwargs) -> Dict:
+    """
+    Calls `generate(prompt, seed=...)` until the result passes the balance checks.
+    If no attempt passes, the one with the fewest problems is returned.
+    With a seed, the attempts (and therefore the result) are reproducible.
+    """
+    best, best_problems = None, None
+    for n in range(max(1, attempts)):
+        attempt_seed = None if seed is None else seed + n
+        config = generate(prompt, seed=attempt_seed)
+        problems = balance_problems(evaluate_balance(config, seed=attempt_seed, **kwargs))
+        if not problems:
+            return config
+        if best is None or len(problems) < len(best_problems):
+            best, best_problems = config, problems
+    print(f"Balance check: returning best of {attempts} attempts ({'; '.join(best_problems)})")
+    return best
@@ -1,15 +1,44 @@
+import copy
 import os
 from .procedural_engine import generate_procedural_config
 from .llm_bridge import generate_with_llm
+from .result_cache import TTLCache
+from simulation_builder.validator import generate_balanced_config
 
-def generate_simulation_config(prompt, use_llm=False):
+# Seeded results are reproducible, so identical requests (a class typing the same
+# prompt) can be answered from memory. Unseeded requests are never cached.
+GENERATION_CACHE = TTLCache(
+    maxsize=int(os.environ.get("GENERATION_CACHE_SIZE", 512)),
+    ttl=float(os.environ.get("GENERATION_CACHE_TTL", 600)),
+)
+
+def normalize_prompt(prompt):
+    # Collapse whitespace within lines but keep line breaks: the text parser splits sentences on them
+    return "\n".join(" ".join(line.split()) for line in (prompt or "").strip().splitlines())
+
+def generate_simulation_config(prompt, use_llm=False, seed=None):
     """
     Main entry point for AI Simulation Generation.
     Prioritizes:
     1. LLM Generation (if requested AND API Key matches)
     2. Procedural Generation (Smart Mix & Match)
+    With a seed, the result is reproducible and cached.
     """
-    
+    if seed is None:
+        return _generate(prompt, use_llm, None)
+    if not isinstance(seed, int) or isinstance(seed, bool) or seed < 0:
+        raise ValueError("seed must be a non-negative integer")
+
+    prompt = normalize_prompt(prompt)
+    key = (prompt, bool(use_llm), seed)
+    config = GENERATION_CACHE.get(key)
+    if config is None:
+        config = _generate(prompt, use_llm, seed)
+        GENERATION_CACHE.set(key, config)
+    # Callers may annotate the config; never hand out the cached object itself
+    return copy.deepcopy(config)
+
+def _generate(prompt, use_llm, seed):
     # 1. Try LLM (Bonus Feature)
     if use_llm:
         api_key = os.environ.get("LLM_API_KEY")
@@ -34,4 +63,5 @@ def generate_simulation_config(prompt, use_llm=False):
                 pass 
 
     # 2. Procedural Fallback (Robust, Local)
-    return generate_procedural_config(prompt)
+    # Random worlds are play-tested first; unplayable ones are regenerated
+    return generate_balanced_config(generate_procedural_config, prompt, seed=seed, playthroughs=2000)
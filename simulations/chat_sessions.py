@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Hashable, List
+
+from .context_digest import estimate_tokens
+
+# Per-session limits: the oldest messages are dropped first
+MAX_SESSION_MESSAGES = 20
+MAX_SESSION_TOKENS = 2000
+# Global limit across all sessions: least recently used sessions are dropped first
+MAX_TOTAL_TOKENS = 2_000_000
+IDLE_TIMEOUT = 30 * 60  # seconds
+
+
+class ChatSession:
+    __slots__ = ("messages", "tokens", "last_seen")
+
+    def __init__(self, now: float):
+        self.messages = deque()  # (message dict, token estimate)
+        self.tokens = 0
+        self.last_seen = now
+
+
+class ChatSessionStore:
+    """
+    Conversation histories keyed by user id.
+
+    Each session is a ring buffer bounded by message count and token budget.
+    Sessions idle for longer than `idle_timeout` are dropped, and when the
+    total across sessions exceeds `max_total_tokens` the least recently used
+    sessions go first. Sessions are kept in LRU order, so both sweeps only
+    touch the sessions they evict.
+    """
+    def __init__(self, max_messages: int = MAX_SESSION_MESSAGES, max_tokens: int = MAX_SESSION_TOKENS,
+                 max_total_tokens: int = MAX_TOTAL_TOKENS, idle_timeout: float = IDLE_TIMEOUT,
+                 clock=time.monotonic):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.max_total_tokens = max_total_tokens
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._sessions = OrderedDict()  # user id -> ChatSession, least recently used first
+        self._lock = threading.Lock()
+        self.total_tokens = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    def _session(self, user_id: Hashable, now: float) -> ChatSession:
+        session = self._sessions.get(user_id)
+        if session is not None and now - session.last_seen > self.idle_timeout:
+            # Inactive too long: start a fresh conversation
+            self._drop(user_id)
+            self.evicted_idle += 1
+            session = None
+        if session is None:
+            session = self._sessions[user_id] = ChatSession(now)
+        self._sessions.move_to_end(user_id)
+        session.last_seen = now
+        return session
+
+    def _drop(self, user_id: Hashable):
+        session = self._sessions.pop(user_id)
+        self.total_tokens -= session.tokens
+
+    def _evict(self, now: float):
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen > self.idle_timeout:
+                self.evicted_idle += 1
+            elif self.total_tokens > self.max_total_tokens and len(self._sessions) > 1:
+                self.evicted_lru += 1
+            else:
+                break
+            self._drop(user_id)
+
+    def append(self, user_id: Hashable, role: str, content: str):
+        now = self._clock()
+        tokens = estimate_tokens(content)
+        with self._lock:
+            session = self._session(user_id, now)
+            session.messages.append(({"role": role, "content": content}, tokens))
+            session.tokens += tokens
+            self.total_tokens += tokens
+            # Trim the oldest messages, but always keep the one just added
+            while len(session.messages) > 1 and (len(session.messages) > self.max_messages
+                                                 or session.tokens > self.max_tokens):
+                _, dropped = session.messages.popleft()
+                session.tokens -= dropped
+                self.total_tokens -= dropped
+            self._evict(now)
+
+    def history(self, user_id: Hashable) -> List[Dict]:
+        """The session's messages, oldest first (empty if it expired)"""
+        now = self._clock()
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None or now - session.last_seen > self.idle_timeout:
+                return []
+            return [dict(message) for message, _ in session.messages]
+
+    def reset(self, user_id: Hashable):
+        with self._lock:
+            if user_id in self._sessions:
+                self._drop(user_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(s.messages) for s in self._sessions.values()),
+                "tokens": self.total_tokens,
+                "max_total_tokens": self.max_total_tokens,
+                "evicted_idle": self.evicted_idle,
+                "evicted_lru": self.evicted_lru,
+            }
@@ -0,0 +1,109 @@
+import math
+import os
+import re
+from typing import Dict, Optional
+
+from database.save_store import config_hash
+from .result_cache import TTLCache
+
+# Upper bound on the (estimated) tokens the world description may add to a chat prompt
+DIGEST_TOKEN_BUDGET = int(os.environ.get("CHAT_DIGEST_TOKENS", 350))
+DESCRIPTION_CHARS = 90
+
+# The config part of a digest only depends on the config, so it is built once per world
+DIGEST_CACHE = TTLCache(maxsize=256, ttl=3600.0)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough BPE token count without a tokenizer: a word costs one token per
+    4 characters (at least one), every punctuation mark one token. Good enough
+    for budgeting and comparing prompts, not for billing.
+    """
+    return sum(math.ceil(len(t) / 4) if t[0].isalnum() or t[0] == "_" else 1
+               for t in _TOKEN_RE.findall(text or ""))
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f"{value:+g}" if isinstance(value, (int, float)) else str(value)
+
+
+def _amounts(values: Dict, signed: bool = True) -> str:
+    return ", ".join(f"{k} {_number(v) if signed else v}" for k, v in (values or {}).items()) or "nothing"
+
+
+def _clip(text: str, limit: int) -> str:
+    text = (text or "").strip()
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def _entity_line(entity: Dict) -> str:
+    line = f"- {entity.get('name', entity.get('id'))}: costs {_amounts(entity.get('cost'), signed=False)}; " \
+           f"per day {_amounts(entity.get('effects'))}"
+    description = _clip(entity.get("description"), DESCRIPTION_CHARS)
+    if description:
+        line += f" ({description})"
+    return line
+
+
+def _impact(entity: Dict) -> float:
+    return sum(abs(v) for v in (entity.get("effects") or {}).values() if isinstance(v, (int, float)))
+
+
+def _world_digest(config: Dict, budget: int) -> str:
+    lines = [f"World: {config.get('title', 'Untitled')}"]
+    if config.get("description"):
+        lines.append(_clip(config["description"], 2 * DESCRIPTION_CHARS))
+    grid = config.get("grid") or {}
+    if grid:
+        lines.append(f"Grid: {grid.get('width')}x{grid.get('height')}")
+    lines.append(f"Starting resources: {_amounts(config.get('global_resources'), signed=False)}")
+    lines.append("Buildings (cost; change per day):")
+    used = estimate_tokens("\n".join(lines))
+
+    # Biggest effects first, so a trimmed digest keeps the entities that drive the game
+    entities = sorted(config.get("entities") or [], key=_impact, reverse=True)
+    shown = 0
+    for entity in entities:
+        line = _entity_line(entity)
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+        shown += 1
+
+    rest = entities[shown:]
+    if rest:
+        names = []
+        for entity in rest:
+            name = entity.get("name", entity.get("id"))
+            if used + estimate_tokens(name) + 12 > budget:
+                break
+            names.append(name)
+            used += estimate_tokens(name) + 1
+        more = f" ({', '.join(names)}{', ...' if len(names) < len(rest) else ''})" if names else ""
+        lines.append(f"- and {len(rest)} more{more}")
+    return "\n".join(lines)
+
+
+def build_context_digest(config: Dict, resources: Optional[Dict] = None,
+                         budget: int = DIGEST_TOKEN_BUDGET) -> str:
+    """
+    Compact, token-budgeted description of a world for chat prompts, in place
+    of the full config JSON. The config part is cached by content hash; current
+    resources are appended per call.
+    """
+    key = (config_hash(config), budget)
+    digest = DIGEST_CACHE.get(key)
+    if digest is None:
+        digest = _world_digest(config, budget)
+        DIGEST_CACHE.set(key, digest)
+    if resources:
+        digest += f"\nCurrent resources: {_amounts(resources, signed=False)}"
+    return digest
+
@@ -0,0 +1,215 @@
+import random
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Resource keys the crisis rules in frontend/js/simulation_engine.js look at
+POLLUTION = "pollution"
+SCORE = "score"
+BUDGET = "budget"
+CRISIS_INTERVAL = 5  # checkCrisis runs when gameDay % 5 == 0
+
+
+class GridEngine:
+    """
+    Headless port of gameLoop/checkCrisis for configs in the template.json schema.
+
+    Placement is kept as an entity-count vector rather than a grid: the daily
+    resource change is then counts @ effects, so the days between two crisis
+    checks advance in a single step. Every method also accepts a batch
+    (leading axis) of worlds so many playthroughs run in one call.
+    """
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.width = config["grid"]["width"]
+        self.height = config["grid"]["height"]
+        self.entity_ids = [e["id"] for e in config["entities"]]
+        self.entity_index = {eid: i for i, eid in enumerate(self.entity_ids)}
+        # Only resources declared in global_resources are tracked (effects on
+        # anything else are ignored by the frontend too)
+        self.resource_names = list(config["global_resources"].keys())
+        self.resource_index = {r: i for i, r in enumerate(self.resource_names)}
+
+        shape = (len(self.entity_ids), len(self.resource_names))
+        self.effects = np.zeros(shape)
+        self.costs = np.zeros(shape)
+        for i, entity in enumerate(config["entities"]):
+            for res, value in (entity.get("effects") or {}).items():
+                if res in self.resource_index:
+                    self.effects[i, self.resource_index[res]] = value
+            for res, value in (entity.get("cost") or {}).items():
+                if res in self.resource_index:
+                    self.costs[i, self.resource_index[res]] = value
+
+        self._pollution = self.resource_index.get(POLLUTION)
+        self._score = self.resource_index.get(SCORE)
+        self._budget = self.resource_index.get(BUDGET)
+        # Bankruptcy applies to every resource except score and pollution
+        self._currencies = np.array([i for r, i in self.resource_index.items() if r not in (SCORE, POLLUTION)], dtype=int)
+
+    # --- State conversion ---
+
+    def initial_resources(self) -> np.ndarray:
+        return np.array([float(v) for v in self.config["global_resources"].values()])
+
+    def counts_from_grid(self, grid: List[List[Optional[Dict]]]) -> np.ndarray:
+        """Collapses a saved gridState (2D list of entity objects or null) into a count vector"""
+        counts = np.zeros(len(self.entity_ids), dtype=np.int64)
+        for row in grid or []:
+            for cell in row:
+                if cell and cell.get("id") in self.entity_index:
+                    counts[self.entity_index[cell["id"]]] += 1
+        return counts
+
+    def resources_from_dict(self, resources: Dict) -> np.ndarray:
+        values = self.initial_resources()
+        for res, value in (resources or {}).items():
+            if res in self.resource_index and value is not None:
+                values[self.resource_index[res]] = value
+        return values
+
+    def resources_to_dict(self, values: np.ndarray) -> Dict:
+        return {r: _plain_number(values[i]) for r, i in self.resource_index.items()}
+
+    # --- Building ---
+
+    def affordable(self, resources: np.ndarray) -> np.ndarray:
+        """Boolean mask (..., entities) of what the current resources can pay for"""
+        return np.all(resources[..., None, :] >= self.costs, axis=-1)
+
+    def place(self, counts: np.ndarray, resources: np.ndarray, entity: np.ndarray, mask: Optional[np.ndarray] = None):
+        """Buys one `entity` per world (where `mask` is set), in place. Mirrors handleDrop's cost check."""
+        counts = np.asarray(counts)
+        entity = np.asarray(entity)
+        rows = np.arange(entity.size).reshape(entity.shape)
+        ok = np.all(resources >= self.costs[entity], axis=-1) & (counts.sum(axis=-1) < self.width * self.height)
+        if mask is not None:
+            ok &= mask
+        if counts.ndim == 1:
+            if ok:
+                counts[entity] += 1
+                resources -= self.costs[entity]
+            return ok
+        counts[rows[ok], entity[ok]] += 1
+        resources[ok] -= self.costs[entity[ok]]
+        return ok
+
+    # --- Ticking ---
+
+    def run(self, days: int, counts: np.ndarray, resources: np.ndarray, start_day: int = 1,
+            rng: Optional[np.random.Generator] = None) -> Dict:
+        """
+        Advances `days` game days in place and returns per-world outcome arrays.
+
+        Days between crisis checks are applied as one `k * (counts @ effects)`
+        step; only the checkCrisis rules (every 5th day) are evaluated day by day.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        single = np.ndim(counts) == 1
+        counts = np.atleast_2d(counts)
+        resources = np.atleast_2d(resources)
+        batch = counts.shape[0]
+        outcome = {
+            "bankrupt_day": np.full(batch, -1, dtype=np.int64),
+            "crises": np.zeros(batch, dtype=np.int64),
+            "destroyed": np.zeros_like(counts),
+        }
+
+        day = start_day
+        end = start_day + days
+        while day < end:
+            step_to = min((day // CRISIS_INTERVAL + 1) * CRISIS_INTERVAL, end)
+            resources += (step_to - day) * (counts @ self.effects)
+            day = step_to
+            if day % CRISIS_INTERVAL == 0:
+                self._check_crisis(day, counts, resources, outcome, rng)
+
+        outcome["day"] = day
+        if single:
+            outcome = {k: (v[0] if isinstance(v, np.ndarray) else v) for k, v in outcome.items()}
+        return outcome
+
+    def _check_crisis(self, day, counts, resources, outcome, rng):
+        if self._pollution is not None:
+            pollution = resources[:, self._pollution]
+            smog = (pollution > 50) & (pollution <= 100)
+            health = pollution > 100
+            collapse = pollution > 200
+            if self._score is not None:
+                resources[:, self._score] -= smog * 1 + health * 10
+            if self._budget is not None:
+                resources[:, self._budget] -= health * 100
+            outcome["crises"] += smog | health
+            self._destroy_random(counts, collapse & (rng.random(len(counts)) < 0.1), outcome, rng)
+
+        if self._currencies.size:
+            bankrupt = (resources[:, self._currencies] < 0).sum(axis=1)
+            if self._score is not None:
+                resources[:, self._score] -= 10 * bankrupt
+            first = (bankrupt > 0) & (outcome["bankrupt_day"] < 0)
+            outcome["bankrupt_day"][first] = day
+            outcome["crises"] += bankrupt > 0
+
+    def _destroy_random(self, counts, mask, outcome, rng):
+        # destroyRandomBuilding picks a uniformly random occupied cell, i.e. an
+        # entity type with probability proportional to its count
+        totals = counts.sum(axis=1)
+        rows = np.flatnonzero(mask & (totals > 0))
+        if rows.size == 0:
+            return
+        cumulative = np.cumsum(counts[rows], axis=1)
+        pick = rng.random(rows.size) * totals[rows]
+        entity = (cumulative <= pick[:, None]).sum(axis=1)
+        counts[rows, entity] -= 1
+        outcome["destroyed"][rows, entity] += 1
+
+
+def fast_forward_save(config: Dict, state: Dict, days: int, seed: Optional[int] = None) -> Dict:
+    """
+    Advances a saved game (the state blob the frontend posts to /api/save)
+    by `days` and returns a new state in the same shape.
+    """
+    engine = GridEngine(config)
+    grid = [list(row) for row in (state.get("grid") or [[None] * engine.width for _ in range(engine.height)])]
+    counts = engine.counts_from_grid(grid)
+    resources = engine.resources_from_dict(state.get("resources"))
+    outcome = engine.run(days, counts, resources, start_day=state.get("gameDay", 1),
+                         rng=np.random.default_rng(seed))
+
+    # Destroyed buildings lose their cells; which cell is cosmetic, so pick at random
+    picker = random.Random(seed)
+    for idx in np.flatnonzero(outcome["destroyed"]):
+        eid = engine.entity_ids[idx]
+        cells = [(y, x) for y, row in enumerate(grid) for x, cell in enumerate(row) if cell and cell.get("id") == eid]
+        for y, x in picker.sample(cells, int(outcome["destroyed"][idx])):
+            grid[y][x] = None
+
+    new_state = dict(state)
+    new_state.update({
+        "grid": grid,
+        "resources": engine.resources_to_dict(resources),
+        "gameDay": int(outcome["day"]),
+    })
+    return new_state
+
+
+def score_save(config: Dict, state: Dict, days: int = 0, seed: Optional[int] = None) -> Dict:
+    """Summary used to validate/score a save server-side"""
+    final = fast_forward_save(config, state, days, seed) if days else state
+    engine = GridEngine(config)
+    resources = engine.resources_from_dict(final.get("resources"))
+    counts = engine.counts_from_grid(final.get("grid"))
+    return {
+        "day": final.get("gameDay", 1),
+        "resources": engine.resources_to_dict(resources),
+        "buildings": int(counts.sum()),
+        "daily_change": engine.resources_to_dict(counts @ engine.effects),
+        "bankrupt": bool(engine._currencies.size and (resources[engine._currencies] < 0).any()),
+    }
+
+
+def _plain_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
@@ -1,8 +1,12 @@
 import os
 import json
-import requests
 import re
 
+from .llm_client import LLMError, CircuitOpenError, get_llm_client
+from .context_digest import build_context_digest
+from .llm_cache import LLM_CACHE, cache_key, normalize_text
+from database.save_store import config_hash
+
 def generate_with_llm(prompt, api_key):
     """
     Attempts to generate a simulation config using an external LLM API.
@@ -59,26 +63,36 @@ def generate_with_llm(prompt, api_key):
                                # but in a real app, this would be the parsed JSON.
             }
 
-        # Real Implementation Skeleton:
-        # response = requests.post("https://api.openai.com/v1/chat/completions", headers=..., json=...)
-        # content = response.json()['choices'][0]['message']['content']
-        
-        # Example Content parsing:
-        # reasoning_match = re.search(r'\[DESIGN\](.*?)\[/DESIGN\]', content, re.DOTALL)
-        # reasoning = reasoning_match.group(1).strip() if reasoning_match else "No design notes provided."
-        
-        # json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
-        # config = json.loads(json_match.group(1)) if json_match else None
-        
-        # return {"reasoning": reasoning, "config": config}
+        # A class generating the same theme at once shares one provider call
+        return LLM_CACHE.get_or_call(cache_key("generate", normalize_text(prompt)),
+                                     lambda: _design_with_llm(prompt, api_key, system_prompt))
 
-        print(f"LLM Bridge received Prompt: {prompt}. (Configure Real API Call in `simulations/llm_bridge.py`)")
-        return None 
+    except CircuitOpenError:
+        # Provider is known to be down: skip straight to the procedural engine
+        return None
 
     except Exception as e:
         print(f"LLM Bridge Error: {e}")
         return None
 
+def _design_with_llm(prompt, api_key, system_prompt):
+    content = get_llm_client(api_key).chat([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ])
+
+    reasoning_match = re.search(r'\[DESIGN\](.*?)\[/DESIGN\]', content, re.DOTALL)
+    reasoning = reasoning_match.group(1).strip() if reasoning_match else "No design notes provided."
+
+    json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
+    config = json.loads(json_match.group(1)) if json_match else None
+    if config is None:
+        # Not cached: the next request asks again instead of replaying a reply without a world
+        print(f"LLM Bridge: no config in reply ({reasoning[:80]})")
+        return None
+
+    return {"reasoning": reasoning, "config": config}
+
 import random
 
 PERSONAS = {
@@ -89,14 +103,11 @@ PERSONAS = {
     "Professor": "You are Professor Eco, a wise and friendly academic. You are here to teach the user about environmental science, economics, and causality. You love data. Use the provided gameplay stats to explain concepts. Be encouraging but scientific."
 }
 
-def chat_with_simulation(message, simulation_context, api_key, persona_type=None, resources=None, topic=None):
-    """
-    Chat with the current ecosystem.
-    simulation_context: The JSON config of the current simulation.
-    """
-    if not api_key:
-        return "I can't chat right now (No API Key). But this world looks fascinating!"
+NO_KEY_REPLY = "I can't chat right now (No API Key). But this world looks fascinating!"
+API_ERROR_REPLY = "I am unable to connect to the spirit realm (API Error)."
 
+def _chat_prompt(simulation_context, persona_type=None, resources=None, topic=None):
+    """Picks the persona and builds the system prompt; returns (persona_name, system_prompt)"""
     # 1. Select Persona
     if persona_type == "Professor":
         persona_name = "Professor"
@@ -104,15 +115,13 @@ def chat_with_simulation(message, simulation_context, api_key, persona_type=None
         
         # Add educational context
         extra_context = f"\n[The user is interested in the topic: '{topic}']" if topic else ""
-        if resources:
-            extra_context += f"\n[Current Simulation Stats: {json.dumps(resources)}]"
             
         system_prompt = f"""
         {persona_prompt}
         {extra_context}
         
-        The user is asking:
-        {json.dumps(simulation_context, indent=2)}
+        The user is asking about this world:
+        {build_context_digest(simulation_context, resources)}
     
         Answer their question in character. Start with a fun fact or observation about their stats.
         """
@@ -125,21 +134,109 @@ def chat_with_simulation(message, simulation_context, api_key, persona_type=None
         {persona_prompt}
         
         The user is asking about this world:
-        {json.dumps(simulation_context, indent=2)}
+        {build_context_digest(simulation_context, resources)}
     
         Answer their question in character. 
         Keep it brief (under 50 words).
         """
+    return persona_name, system_prompt
+
+def _mock_reply(persona_name, simulation_context):
+    return f"[{persona_name}]: I am the Spirit of {simulation_context.get('title', 'this world')}. [Mock Response]"
+
+def _chat_cache_key(persona_name, message, simulation_context, resources, topic):
+    # Stats and topic change the answer, so they are part of the key too
+    return cache_key("chat", persona_name, config_hash(simulation_context), normalize_text(message),
+                     topic, resources)
+
+def chat_with_simulation(message, simulation_context, api_key, persona_type=None, resources=None, topic=None):
+    """
+    Chat with the current ecosystem.
+    simulation_context: The JSON config of the current simulation.
+    """
+    if not api_key:
+        return NO_KEY_REPLY
+
+    persona_name, system_prompt = _chat_prompt(simulation_context, persona_type, resources, topic)
 
     try:
         if api_key == "MOCK":
-             return f"[{persona_name}]: I am the Spirit of {simulation_context.get('title', 'this world')}. [Mock Response]"
+            return _mock_reply(persona_name, simulation_context)
+
+        key = _chat_cache_key(persona_name, message, simulation_context, resources, topic)
+        return LLM_CACHE.get_or_call(key, lambda: get_llm_client(api_key).chat([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": message},
+        ]))
+
+    except LLMError:
+        return API_ERROR_REPLY
 
-        # Real Implementation:
-        # response = requests.post(...)
-        # return content
-        
-        return "I am unable to connect to the spirit realm (API Error)."
-    
     except Exception as e:
         return f"Error communing with spirits: {e}"
+
+def stream_chat_with_simulation(message, simulation_context, api_key, persona_type=None, resources=None, topic=None):
+    """
+    Same as chat_with_simulation, but yields the reply in pieces as the model produces them.
+    Failures are reported in-band, since part of the reply may already have been sent.
+    """
+    if not api_key:
+        yield NO_KEY_REPLY
+        return
+
+    persona_name, system_prompt = _chat_prompt(simulation_context, persona_type, resources, topic)
+
+    if api_key == "MOCK":
+        for i, word in enumerate(_mock_reply(persona_name, simulation_context).split(" ")):
+            yield word if i == 0 else " " + word
+        return
+
+    key = _chat_cache_key(persona_name, message, simulation_context, resources, topic)
+    cached = LLM_CACHE.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    # The first asker streams from the provider; identical questions arriving meanwhile
+    # wait for that one call and replay its reply
+    leader, call = LLM_CACHE.flights.begin(key)
+    if not leader:
+        try:
+            reply = LLM_CACHE.flights.wait(call)
+        except LLMError:
+            yield API_ERROR_REPLY
+            return
+        except Exception as e:
+            yield f"Error communing with spirits: {e}"
+            return
+        if reply is not None:
+            yield reply
+            return
+        # The leader's client went away mid-reply: ask on our own, without a flight
+
+    reply, complete, error = [], False, None
+    try:
+        # A flight for this question may have finished between our cache miss and begin()
+        cached = LLM_CACHE.peek(key) if leader else None
+        if cached is not None:
+            reply, complete = [cached], True
+            yield cached
+            return
+        for delta in get_llm_client(api_key).stream_chat([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": message},
+        ]):
+            reply.append(delta)
+            yield delta
+        complete = True
+        LLM_CACHE.set(key, "".join(reply))
+    except LLMError as e:
+        error = e
+        yield " (The spirits went quiet.)" if reply else API_ERROR_REPLY
+    except Exception as e:
+        error = e
+        yield f"Error communing with spirits: {e}"
+    finally:
+        # Also runs when the client disconnects (GeneratorExit), so waiters are never stranded
+        if leader:
+            LLM_CACHE.flights.end(key, call, "".join(reply) if complete else None, error)
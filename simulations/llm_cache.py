@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from database.db_config import BASE_DIR, db_transaction, get_db_connection
+
+LLM_CACHE_PATH = Path(os.environ.get("LLM_CACHE_PATH", BASE_DIR / "llm_cache.db"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 24 * 3600))
+
+
+def normalize_text(text: str) -> str:
+    # "What is smog?" and "what is  smog?" are the same question
+    return " ".join((text or "").lower().split())
+
+
+def cache_key(*parts) -> str:
+    """Stable key for any JSON-serializable parts (persona, config hash, message, ...)"""
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FlightAbandoned(Exception):
+    """The leading call stopped before finishing (client gone, interrupted), without a result"""
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution: the first caller runs
+    the function, the others wait for it and get the same result (or exception).
+    If the leader is interrupted, one of the waiters takes over the call.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [done event, result, error]
+        self.coalesced = 0
+
+    def begin(self, key: str) -> Tuple[bool, list]:
+        """Joins the call running for `key`, or starts one. Returns (is leader, call)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return False, call
+            call = self._calls[key] = [threading.Event(), None, None]
+            return True, call
+
+    def end(self, key: str, call: list, result: Any = None, error: Optional[Exception] = None):
+        """The leader publishes its outcome (exactly once) and releases the waiters"""
+        call[1], call[2] = result, error
+        with self._lock:
+            del self._calls[key]
+        call[0].set()
+
+    @staticmethod
+    def wait(call: list) -> Any:
+        call[0].wait()
+        if call[2] is not None:
+            raise call[2]
+        return call[1]
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        while True:
+            leader, call = self.begin(key)
+            if leader:
+                break
+            try:
+                return self.wait(call)
+            except FlightAbandoned:
+                continue  # the leader never finished: run it ourselves (or join whoever does)
+
+        result, error = None, FlightAbandoned(f"call for {key} was interrupted")
+        try:
+            result = fn()
+            error = None
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Also on GeneratorExit / KeyboardInterrupt, so the waiters are never stranded
+            self.end(key, call, result, error)
+
+
+class LLMResponseCache:
+    """
+    Provider responses persisted in a small SQLite file next to the main database,
+    so they survive restarts and are shared by every worker process.
+    """
+    def __init__(self, path: Path = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._ready = False
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_schema(self):
+        if self._ready:
+            return
+        with db_transaction(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+        self._ready = True
+
+    def _lookup(self, key: str) -> Optional[str]:
+        self._ensure_schema()
+        row = get_db_connection(self.path).execute(
+            "SELECT value FROM llm_cache WHERE key = ? AND created_at > ?", (key, time.time() - self.ttl)
+        ).fetchone()
+        return row["value"] if row else None
+
+    def peek(self, key: str) -> Any:
+        """Cached value for `key`, without counting a hit or miss (for re-checks after a miss)"""
+        text = self._lookup(key)
+        return None if text is None else json.loads(text)
+
+    def get(self, key: str) -> Any:
+        text = self._lookup(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(text)
+
+    def set(self, key: str, value: Any):
+        self.set_text(key, json.dumps(value))
+
+    def set_text(self, key: str, text: str):
+        self._ensure_schema()
+        with db_transaction(self.path) as conn:
+            conn.execute("INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                         (key, text, time.time()))
+
+    def get_or_call(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Cached value for `key`, or the result of `fn()` (stored if not None).
+        Identical concurrent misses make a single upstream call.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        def call():
+            # Another flight may have filled the cache between our miss and now
+            text = self._lookup(key)
+            if text is None:
+                result = fn()
+                if result is None:
+                    return None
+                text = json.dumps(result)
+                self.set_text(key, text)
+            return text
+
+        # Every caller decodes its own copy, so callers sharing a flight can't see each other's edits
+        text = self.flights.do(key, call)
+        return None if text is None else json.loads(text)
+
+    def purge_expired(self) -> int:
+        self._ensure_schema()
+        with db_transaction(self.path) as conn:
+            return conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (time.time() - self.ttl,)).rowcount
+
+    def stats(self) -> Dict:
+        self._ensure_schema()
+        size = get_db_connection(self.path).execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self.flights.coalesced,
+            }
+
+
+LLM_CACHE = LLMResponseCache()
@@ -0,0 +1,218 @@
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Provider settings (any OpenAI-compatible /chat/completions endpoint)
+LLM_API_BASE = os.environ.get("LLM_API_BASE", "https://api.openai.com/v1")
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")
+CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", 30))
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 2))
+BACKOFF_BASE = 0.2   # seconds; attempt n sleeps uniform(0, min(cap, base * 2**n))
+BACKOFF_CAP = 2.0
+POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", 16))
+
+# Statuses worth another attempt; anything else (bad key, bad request) fails immediately
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# Longest Retry-After we wait out inside a request; asked to wait longer, the call fails instead
+RETRY_AFTER_MAX = float(os.environ.get("LLM_RETRY_AFTER_MAX", 5))
+# Transport errors worth another attempt; others (bad URL, redirect loop) fail immediately
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class LLMError(Exception):
+    """The provider call failed (after retries)"""
+
+
+class CircuitOpenError(LLMError):
+    """The provider has been failing; calls are short-circuited until the breaker resets"""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failed calls.
+    While open every call fails fast; after `reset_timeout` one trial call is let
+    through (half-open) and its outcome closes or re-opens the breaker.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.short_circuited = 0
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if self._clock() - self.opened_at < self.reset_timeout:
+                    self.short_circuited += 1
+                    raise CircuitOpenError("LLM provider circuit is open")
+                self.state = "half_open"
+            elif self.state == "half_open":
+                # A trial call is already in flight
+                self.short_circuited += 1
+                raise CircuitOpenError("LLM provider circuit is half-open")
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = self._clock()
+
+
+class LLMClient:
+    """
+    Chat-completions client on one keep-alive connection pool, with connect/read
+    timeouts, bounded retries with jittered exponential backoff, and a circuit breaker.
+    """
+    def __init__(self, api_key: str, base_url: str = LLM_API_BASE, model: str = LLM_MODEL,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 max_retries: int = MAX_RETRIES, breaker: Optional[CircuitBreaker] = None,
+                 pool_size: int = POOL_SIZE, sleep=time.sleep):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self.session = requests.Session()
+        # Retries are done here (with jitter and breaker bookkeeping), not by urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+        self._stats = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "stream_failures": 0}
+        self._stats_lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        """A consistent snapshot of the counters"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, name: str):
+        # Request threads share one client, so every update goes through the lock
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def chat(self, messages: List[Dict], **params) -> str:
+        """Returns the assistant message content for a list of chat messages"""
+        response = self.request({"model": self.model, "messages": messages, **params})
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError) as e:
+            raise LLMError(f"Unexpected provider response: {e}")
+
+    def stream_chat(self, messages: List[Dict], **params) -> Iterator[str]:
+        """
+        Yields the assistant message content piece by piece as the provider sends it
+        (server-sent events). Retries only cover getting the stream started; a stream
+        that breaks partway counts as a failed call on the breaker.
+        """
+        response = self.request({"model": self.model, "messages": messages, "stream": True, **params}, stream=True)
+        failed = False
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+            failed = True
+            self._count("stream_failures")
+            self.breaker.record_failure()
+            raise LLMError(f"Stream interrupted: {e}")
+        finally:
+            response.close()
+            # The breaker hears about a stream only once it ends (or the caller stops reading)
+            if not failed:
+                self.breaker.record_success()
+
+    def request(self, payload: Dict, stream: bool = False) -> requests.Response:
+        """POSTs to /chat/completions with retries; raises LLMError or CircuitOpenError"""
+        self.breaker.before_call()
+        self._count("calls")
+        last_error = None
+        wait = None  # the provider's Retry-After, when it sent one
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+                self._sleep(wait if wait is not None else
+                            random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+            self._count("attempts")
+            wait = None
+            try:
+                response = self.session.post(f"{self.base_url}/chat/completions", json=payload,
+                                             timeout=self.timeout, stream=stream)
+            except requests.RequestException as e:
+                last_error = e
+                if isinstance(e, TRANSIENT_ERRORS):
+                    continue
+                break
+            if response.status_code < 400:
+                if not stream:
+                    self.breaker.record_success()
+                return response
+            last_error = LLMError(f"Provider returned HTTP {response.status_code}")
+            response.close()
+            if response.status_code not in RETRY_STATUSES:
+                break
+            wait = retry_after(response)
+            if wait is not None and wait > RETRY_AFTER_MAX:
+                break
+
+        self._count("failures")
+        self.breaker.record_failure()
+        raise LLMError(str(last_error)) from last_error
+
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After, in seconds or as an HTTP date), if any"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(api_key: str) -> LLMClient:
+    """Process-wide client per API key, so every request shares the same connection pool and breaker"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = LLMClient(api_key)
+        return client
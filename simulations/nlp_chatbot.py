@@ -1,33 +1,34 @@
 from openai import OpenAI
-from datetime import datetime, timedelta
+from datetime import timedelta
+from typing import Dict, List
+
+from simulations.chat_sessions import ChatSessionStore
 
 client = OpenAI()
 class EcoLearnChatbot:
-    def __init__(self):
-        self.conversation_history = []
-        self.last_interaction_time = None
+    def __init__(self, sessions: ChatSessionStore = None):
         self.inactivity_threshold = timedelta(minutes=30)  # 30 minutes threshold
+        # One bounded history per user; shared instances no longer mix conversations
+        self.sessions = sessions or ChatSessionStore(idle_timeout=self.inactivity_threshold.total_seconds())
 
-    def get_response(self, user_input: str) -> str:
-        current_time = datetime.now()
-        if self.last_interaction_time and (current_time - self.last_interaction_time) > self.inactivity_threshold:
-            self.reset_conversation()
-        
-        self.last_interaction_time = current_time
-        self.conversation_history.append({"role": "user", "content": user_input})
+    def get_response(self, user_input: str, user_id: int = None) -> str:
+        # Conversations idle past the threshold are reset by the session store
+        self.sessions.append(user_id, "user", user_input)
         
         # Simulate response generation (replace with actual model call)
         response = f"Echo: {user_input}"
         
-        self.conversation_history.append({"role": "assistant", "content": response})
+        self.sessions.append(user_id, "assistant", response)
         return response
 
-    def reset_conversation(self):
-        self.conversation_history = []
-        self.last_interaction_time = None
+    def conversation_history(self, user_id: int = None) -> List[Dict]:
+        return self.sessions.history(user_id)
+
+    def reset_conversation(self, user_id: int = None):
+        self.sessions.reset(user_id)
 
     def process_message(self, message: str, user_id: int = None) -> Dict:
-        response_text = self.get_response(message)
+        response_text = self.get_response(message, user_id)
         
         # Here you would parse the response to check if a simulation was created
         # For demonstration, let's assume any message containing "create simulation" creates one
@@ -50,14 +50,119 @@ ENTITIES = [
     { "id": "computer", "name": "Supercomputer", "icon": "🖥️", "desc": "Computing data.", "tags": ["tech", "future", "city"] }
 ]
 
+# --- COMPILED INDEXES (built once at import) ---
+
+class CatalogIndex:
+    """
+    Inverted indexes over the data pools.
+    Keywords from every biome/currency are compiled into one alternation that is
+    scanned once per prompt, and entity tags map to bitsets (ints) of entity positions.
+    """
+    def __init__(self, biomes, currencies, entities):
+        self.biomes = biomes
+        self.currencies = currencies
+        self.entities = entities
+
+        # keyword -> [(pool, position in pool)]
+        self.keyword_owners = {}
+        for pool_name, pool in (("biome", biomes), ("currency", currencies)):
+            for i, item in enumerate(pool):
+                for k in item["keywords"]:
+                    self.keyword_owners.setdefault(k.lower(), []).append((pool_name, i))
+
+        # A zero-width lookahead matches at every offset, so overlapping keywords are all seen.
+        # Longest-first means one match per offset; shorter keywords that are prefixes of
+        # the match are credited through `implied`.
+        keywords = sorted(self.keyword_owners, key=lambda k: (-len(k), k))
+        self.pattern = re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))") if keywords else None
+        self.implied = {k: [p for p in keywords if k.startswith(p)] for k in keywords}
+
+        self._pools = {}
+        self.tag_bits = {}
+        for i, ent in enumerate(entities):
+            for tag in ent["tags"]:
+                self.tag_bits[tag] = self.tag_bits.get(tag, 0) | (1 << i)
+
+    def match(self, prompt_lower):
+        """Best biome and currency for a prompt (None when nothing matches).
+        Ties: most keywords matched, then earliest mention, then catalog order."""
+        hits = {"biome": {}, "currency": {}}  # position in pool -> [distinct keywords, first offset]
+        seen = set()
+        if self.pattern:
+            for m in self.pattern.finditer(prompt_lower):
+                for k in self.implied[m.group(1)]:
+                    if k in seen:
+                        continue
+                    seen.add(k)
+                    for pool_name, i in self.keyword_owners[k]:
+                        entry = hits[pool_name].setdefault(i, [0, m.start()])
+                        entry[0] += 1
+
+        def best(pool_name, pool):
+            if not hits[pool_name]:
+                return None
+            i = min(hits[pool_name], key=lambda i: (-hits[pool_name][i][0], hits[pool_name][i][1], i))
+            return pool[i]
+
+        return best("biome", self.biomes), best("currency", self.currencies)
+
+    def entities_with_tags(self, tags):
+        """Entities sharing at least one tag, in catalog order"""
+        key = frozenset(tags)
+        pool = self._pools.get(key)
+        if pool is None:
+            bits = 0
+            for tag in key:
+                bits |= self.tag_bits.get(tag, 0)
+            pool = [self.entities[i] for i, bit in enumerate(reversed(bin(bits)[2:])) if bit == "1"]
+            # Biome x currency pairs are the only tag sets asked for, so this stays small
+            self._pools[key] = pool
+        return list(pool)
+
+CATALOG = CatalogIndex(BIOMES, CURRENCIES, ENTITIES)
+
+# --- TEXT PARSER ---
+
+VERBS_POSITIVE = frozenset(["produces", "creates", "generates", "yeilds", "provides", "increases", "restores"])
+VERBS_NEGATIVE = frozenset(["consumes", "eats", "destroys", "reduces", "needs", "requires", "depletes", "damages"])
+
+_SENTENCE_BREAK = re.compile(r'[.\n]')
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_READ_CHUNK = 64 * 1024
+
+def _iter_sentences(source):
+    """Yields the pieces between '.'/newline breaks from a string or a text file-like object,
+    reading files in chunks so long documents are never held in memory whole."""
+    if isinstance(source, str):
+        yield from _SENTENCE_BREAK.split(source)
+        return
+    # The unterminated tail, kept as the chunks it arrived in: only new text is ever scanned,
+    # so a document with no breaks at all still reads in linear time
+    pending = []
+    while True:
+        chunk = source.read(_READ_CHUNK)
+        if not chunk:
+            break
+        pieces = _SENTENCE_BREAK.split(chunk)
+        if len(pieces) == 1:
+            pending.append(chunk)
+            continue
+        pending.append(pieces[0])
+        yield "".join(pending)
+        yield from pieces[1:-1]
+        pending = [pieces[-1]]
+    yield "".join(pending)
+
 class TextParser:
     def __init__(self):
-        self.verbs_positive = ["produces", "creates", "generates", "yeilds", "provides", "increases", "restores"]
-        self.verbs_negative = ["consumes", "eats", "destroys", "reduces", "needs", "requires", "depletes", "damages"]
+        self.verbs_positive = VERBS_POSITIVE
+        self.verbs_negative = VERBS_NEGATIVE
         
     def parse(self, text):
         """
         Parses text to find entities, resources, and their relationships.
+        `text` may be a string or a file-like object; either way it is consumed
+        one sentence at a time in a single linear pass.
         Returns: {
             "entities": [{"name": "Goat", "effects": {"soil": -5}}],
             "resources": ["soil", "food"]
@@ -69,16 +174,13 @@ class TextParser:
             "detected": False
         }
         
-        # Split into lines/sentences
-        sentences = re.split(r'[.\n]', text)
-        
-        for sent in sentences:
+        for sent in _iter_sentences(text):
             sent = sent.strip()
             if not sent: continue
             
             # 1. Simple Definition: "Goats: high reproduction, destroy soil"
             if ":" in sent:
-                parts = sent.split(":")
+                parts = sent.split(":", 2)
                 subject = parts[0].strip()
                 desc = parts[1].strip()
                 
@@ -88,23 +190,7 @@ class TextParser:
                     
             # 2. Sentences: "Predators reduce overgrazing"
             else:
-                # Naive Subject-Verb-Object detection
-                words = sent.split()
-                # If starts with noun
-                if words[0][0].isupper() or len(words) < 10:
-                     # Look for impact verbs
-                     for i, w in enumerate(words):
-                         if w.lower() in self.verbs_positive + self.verbs_negative:
-                             subject = " ".join(words[:i])
-                             target = " ".join(words[i+1:])
-                             effect = 10 if w.lower() in self.verbs_positive else -10
-                             
-                             # Clean target (remove punctuation)
-                             target = re.sub(r'[^\w\s]', '', target).strip().lower()
-                             # Take last word as resource key usually (e.g. "destroy the soil" -> "soil")
-                             if target:
-                                res_key = target.split()[-1]
-                                self._add_effect(data, subject, res_key, effect)
+                self._parse_sentence(data, sent.split())
         
         # Determine if we successfully parsed enough to take over
         if len(data["entities"]) >= 1:
@@ -112,9 +198,34 @@ class TextParser:
             
         return data
 
+    def _parse_sentence(self, data, words):
+        # Naive Subject-Verb-Object detection
+        # If starts with noun
+        if not (words[0][0].isupper() or len(words) < 10):
+            return
+        positive, negative = self.verbs_positive, self.verbs_negative
+        cleaned = None
+        subject_start = 0
+        for i, w in enumerate(words):
+            w_lower = w.lower()
+            if w_lower not in positive and w_lower not in negative:
+                continue
+            if cleaned is None:
+                # Punctuation-stripped words, computed once per sentence. The object of every
+                # verb is the last word after it that survives cleaning ("destroy the soil" -> "soil").
+                cleaned = [_PUNCTUATION.sub('', word) for word in words]
+                last = max((j for j, c in enumerate(cleaned) if c), default=-1)
+            if last > i:
+                # The subject runs from the previous verb (or sentence start) up to this one,
+                # so run-on sentences stay linear instead of re-joining the whole prefix per verb
+                subject = " ".join(cleaned[subject_start:i]).strip()
+                effect = 10 if w_lower in positive else -10
+                self._add_effect(data, subject, cleaned[last].lower(), effect, clean=False)
+            subject_start = i + 1
+
     def _add_entity(self, data, name, desc):
         # Clean name
-        name = re.sub(r'[^\w\s]', '', name).strip()
+        name = _PUNCTUATION.sub('', name).strip()
         name_key = name.lower()
         
         if name_key not in data["entities"]:
@@ -127,29 +238,28 @@ class TextParser:
             
         # Try to parse effects from description
         # "destroy soil", "high reproduction"
-        desc_parts = [p.strip() for p in desc.split(",")]
-        for p in desc_parts:
+        for p in desc.split(","):
             words = p.split()
+            first_index = {}
+            for idx, w in enumerate(words):
+                first_index.setdefault(w, idx)
             for w in words:
                 w_lower = w.lower()
-                if w_lower in self.verbs_negative:
-                    # simplistic: look for noun after
-                    idx = words.index(w)
-                    if idx + 1 < len(words):
-                        res = words[idx+1].lower()
-                        self._add_effect(data, name, res, -5)
-                elif w_lower in self.verbs_positive:
-                    idx = words.index(w)
+                # simplistic: look for noun after (the first occurrence of the verb, as before)
+                if w_lower in self.verbs_negative or w_lower in self.verbs_positive:
+                    idx = first_index[w]
                     if idx + 1 < len(words):
-                        res = words[idx+1].lower()
-                        self._add_effect(data, name, res, 5)
+                        value = -5 if w_lower in self.verbs_negative else 5
+                        self._add_effect(data, name_key, words[idx+1].lower(), value, clean=False)
                 
                 # Special cases mentioned by user
                 if "reproduction" in w_lower:
-                    self._add_effect(data, name, "population", 2)
+                    self._add_effect(data, name_key, "population", 2, clean=False)
     
-    def _add_effect(self, data, entity_name, res_name, value):
-        entity_name = re.sub(r'[^\w\s]', '', entity_name).strip().lower()
+    def _add_effect(self, data, entity_name, res_name, value, clean=True):
+        if clean:
+            entity_name = _PUNCTUATION.sub('', entity_name)
+        entity_name = entity_name.strip().lower()
         if entity_name not in data["entities"]:
              data["entities"][entity_name] = {
                 "name": entity_name.capitalize(),
@@ -166,7 +276,10 @@ class TextParser:
         data["resources"].add(res_name)
         data["entities"][entity_name]["effects"][res_name] = value
 
-def generate_procedural_config(prompt):
+def generate_procedural_config(prompt, seed=None):
+    # The same prompt + seed always yields the same world; without a seed it's random as before
+    rng = random.Random(seed) if seed is not None else random
+
     # 0. Try Adaptive Parsing first
     print(f"DEBUG: Unknown Prompt received: {repr(prompt)}")
     parser = TextParser()
@@ -196,7 +309,7 @@ def generate_procedural_config(prompt):
                 else: icon = "📦"
                 
                 new_ent = {
-                    "id": f"{key}_{random.randint(100,999)}",
+                    "id": f"{key}_{rng.randint(100,999)}",
                     "name": ent["name"],
                     "icon": icon,
                     "description": ent["description"],
@@ -224,41 +337,28 @@ def generate_procedural_config(prompt):
     # Fallback to Standard Procedural Logic
     prompt_lower = prompt.lower()
     
-    # 1. Select Biome
-    selected_biome = random.choice(BIOMES)
-    for b in BIOMES:
-        for k in b["keywords"]:
-            if k in prompt_lower:
-                selected_biome = b
-                break
-    
-    # 2. Select Currency
-    selected_currency = random.choice(CURRENCIES)
-    for c in CURRENCIES:
-        for k in c["keywords"]:
-            if k in prompt_lower:
-                selected_currency = c
-                break
+    # 1 & 2. Select Biome and Currency (one pass over the prompt; random if nothing matches)
+    selected_biome, selected_currency = CATALOG.match(prompt_lower)
+    if selected_biome is None:
+        selected_biome = rng.choice(BIOMES)
+    if selected_currency is None:
+        selected_currency = rng.choice(CURRENCIES)
     
     # 3. Intelligent Entity Selection
     # Combine valid tags from Biome and Currency to form a "Theme Filter"
     allowed_tags = set(selected_biome.get("valid_tags", []) + selected_currency.get("valid_tags", []))
     
-    matching_pool = []
-    
-    for ent in ENTITIES:
-        # Strict Match: Entity MUST share a tag with the environment
-        if any(tag in allowed_tags for tag in ent["tags"]):
-            matching_pool.append(ent)
+    # Strict Match: Entity MUST share a tag with the environment
+    matching_pool = CATALOG.entities_with_tags(allowed_tags)
             
     # Select entities
     chosen_entities = []
     
     # Try to pick 4-6 entities
-    target_count = random.randint(4, 6)
+    target_count = rng.randint(4, 6)
     
     if len(matching_pool) >= target_count:
-        chosen_entities = random.sample(matching_pool, target_count)
+        chosen_entities = rng.sample(matching_pool, target_count)
     else:
         # If not enough matches, take all matches
         chosen_entities = matching_pool
@@ -271,11 +371,11 @@ def generate_procedural_config(prompt):
     c_name = selected_currency["name"].lower()
     
     for ent in chosen_entities:
-        cost_val = random.randint(50, 500)
-        effect_val = random.randint(1, 10)
+        cost_val = rng.randint(50, 500)
+        effect_val = rng.randint(1, 10)
         
         new_ent = {
-            "id": f"{ent['id']}_{random.randint(100,999)}",
+            "id": f"{ent['id']}_{rng.randint(100,999)}",
             "name": ent["name"],
             "icon": ent["icon"],
             "description": ent["desc"],
@@ -285,14 +385,14 @@ def generate_procedural_config(prompt):
         
         # Add Trade-offs (Upkeep / Pollution)
         # 1. Maintenance Cost (50% chance for high-cost items)
-        if cost_val > 200 and random.random() > 0.5:
-            new_ent["effects"][c_name] = -random.randint(5, 15) # Drains currency!
+        if cost_val > 200 and rng.random() > 0.5:
+            new_ent["effects"][c_name] = -rng.randint(5, 15) # Drains currency!
             new_ent["description"] += " Needs upkeep."
             
         # 2. Pollution (30% chance for tech/industry items)
         if "tech" in ent["tags"] or "industry" in ent["tags"]:
-             if random.random() > 0.7:
-                 new_ent["effects"]["pollution"] = random.randint(2, 8)
+             if rng.random() > 0.7:
+                 new_ent["effects"]["pollution"] = rng.randint(2, 8)
                  new_ent["description"] += " Pollutes."
                  
         final_entities_config.append(new_ent)
@@ -0,0 +1,296 @@
+"""
+Student leaderboards: all time, this week, and per class.
+
+Points are stored per user and period in leaderboard_points (each scored
+interaction, quizzes and simulation results alike, earns its rounded score)
+and kept current by Leaderboard.record, which runs in the transaction that
+records each batch of interactions (boards follow once that transaction
+commits). Each board is a RankIndex held in memory:
+"my rank" and top-K are answered without touching SQLite. Boards are built
+from the (period, points) index on first use, and rebuilt in the background
+once older than max_age so every worker process catches up with the others.
+
+Points can be recomputed from the raw log with:  python -m ui.leaderboard rebuild
+"""
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database.db_config import close_db_connections, db_transaction, get_db_connection, on_commit
+from ai_module.rollups import utc_timestamp
+
+ALL_TIME = "all"
+WINDOWS = ("all", "week")
+MAX_AGE = float(os.environ.get("LEADERBOARD_MAX_AGE", 60))
+MAX_LIMIT = 100
+
+
+def event_points(score) -> int:
+    # Half up, like SQLite's ROUND for the non-negative scores the seed query sums
+    return int(max(score, 0) + 0.5)
+
+
+def week_start(day: str) -> str:
+    """Monday of the week containing day ('YYYY-MM-DD...')"""
+    d = date.fromisoformat(day[:10])
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+class RankIndex:
+    """
+    Users ordered by integer points, highest first; equal points share a rank.
+
+    A Fenwick tree counts users per points value, so a user's rank (1 + users
+    with more points) and the points value at any rank take O(log P) for
+    P = the highest points value. Users with equal points are listed by id.
+    """
+    def __init__(self, points: Optional[Dict[int, int]] = None):
+        self._points = {}  # user id -> points
+        self._buckets = {}  # points -> user ids
+        self._size = 1
+        self._tree = [0, 0]
+        for user_id, value in (points or {}).items():
+            self._points[user_id] = value
+            self._buckets.setdefault(value, set()).add(user_id)
+        self._rebuild_tree(max(self._buckets, default=0) + 1)
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, user_id):
+        return user_id in self._points
+
+    def _rebuild_tree(self, size: int):
+        # Linear-time build from the bucket sizes
+        self._size = size
+        tree = [0] * (size + 1)
+        for value, users in self._buckets.items():
+            tree[value + 1] += len(users)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, value: int, delta: int):
+        i = value + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_at_most(self, value: int) -> int:
+        i, total = min(value + 1, self._size), 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _value_at(self, k: int) -> int:
+        """The k-th lowest points value (1-based)"""
+        i, step = 0, 1 << self._size.bit_length()
+        while step:
+            if i + step <= self._size and self._tree[i + step] < k:
+                i += step
+                k -= self._tree[i]
+            step >>= 1
+        return i  # tree index i + 1 holds points value i
+
+    def set(self, user_id: int, value: int):
+        value = max(value, 0)
+        old = self._points.get(user_id)
+        if old == value:
+            return
+        if old is not None:
+            bucket = self._buckets[old]
+            bucket.discard(user_id)
+            if not bucket:
+                del self._buckets[old]
+            self._add(old, -1)
+        self._points[user_id] = value
+        self._buckets.setdefault(value, set()).add(user_id)
+        if value >= self._size:
+            self._rebuild_tree(max(self._size * 2, value + 1))
+        else:
+            self._add(value, 1)
+
+    def add(self, user_id: int, delta: int):
+        self.set(user_id, self._points.get(user_id, 0) + delta)
+
+    def points(self, user_id: int) -> Optional[int]:
+        return self._points.get(user_id)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        value = self._points.get(user_id)
+        if value is None:
+            return None
+        return len(self._points) - self._count_at_most(value) + 1
+
+    def top(self, k: int, offset: int = 0) -> List[Tuple[int, int, int]]:
+        """(rank, user id, points) for positions offset+1 .. offset+k"""
+        entries, position = [], offset + 1
+        end = min(offset + k, len(self._points))
+        while position <= end:
+            value = self._value_at(len(self._points) - position + 1)
+            rank = len(self._points) - self._count_at_most(value) + 1
+            users = sorted(self._buckets[value])
+            for user_id in users[position - rank:end - rank + 1]:
+                entries.append((rank, user_id, value))
+            position = rank + len(users)
+        return entries
+
+
+class Leaderboard:
+    def __init__(self, db_path=None, max_age: float = MAX_AGE, clock=time.monotonic):
+        self.db_path = db_path
+        self.max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._boards = {}  # (period, class name or None) -> [RankIndex, loaded at]
+        self._refreshing = set()
+
+    def _period(self, window: str) -> str:
+        if window not in WINDOWS:
+            raise ValueError(f"window must be one of {', '.join(WINDOWS)}")
+        return ALL_TIME if window == ALL_TIME else week_start(utc_timestamp())
+
+    def _load(self, period: str, class_name: Optional[str]) -> RankIndex:
+        conn = get_db_connection(self.db_path)
+        if class_name is None:
+            rows = conn.execute("SELECT user_id, points FROM leaderboard_points WHERE period = ?", (period,))
+        else:
+            # Every member is ranked, with 0 points until they score
+            rows = conn.execute("""
+                SELECT cm.user_id, COALESCE(lp.points, 0)
+                FROM class_members cm
+                LEFT JOIN leaderboard_points lp ON lp.user_id = cm.user_id AND lp.period = ?
+                WHERE cm.class_name = ?
+            """, (period, class_name))
+        return RankIndex({row[0]: row[1] for row in rows})
+
+    def _board(self, window: str, class_name: Optional[str] = None) -> RankIndex:
+        key = (self._period(window), class_name)
+        with self._lock:
+            if key[0] != ALL_TIME:
+                self._drop_old_weeks(key[0])
+            entry = self._boards.get(key)
+            stale = (entry is not None and self._clock() - entry[1] > self.max_age
+                     and key not in self._refreshing)
+            if stale:
+                self._refreshing.add(key)
+        if entry is None:
+            board = self._load(*key)
+            with self._lock:
+                entry = self._boards.setdefault(key, [board, self._clock()])
+        elif stale:
+            threading.Thread(target=self._background_refresh, args=(key,), daemon=True).start()
+        return entry[0]
+
+    def _background_refresh(self, key):
+        try:
+            board = self._load(*key)
+            with self._lock:
+                self._boards[key] = [board, self._clock()]
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+            close_db_connections()
+
+    def record(self, conn, events: Iterable) -> int:
+        """Ingest listener: adds the points of a batch of interactions. Returns the points added."""
+        deltas, weeks = {}, {}
+        for user_id, _, _, score, _, timestamp in events:
+            if score is None:
+                continue
+            points, day = event_points(score), timestamp[:10]
+            if day not in weeks:
+                weeks[day] = week_start(day)
+            for period in (ALL_TIME, weeks[day]):
+                deltas[(user_id, period)] = deltas.get((user_id, period), 0) + points
+        if not deltas:
+            return 0
+        conn.executemany("""
+            INSERT INTO leaderboard_points (user_id, period, points)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id, period) DO UPDATE SET points = points + excluded.points
+        """, [(*key, points) for key, points in deltas.items()])
+        # A batch that rolls back must leave the boards alone, so they follow only after the commit
+        on_commit(lambda: self._apply(deltas), self.db_path)
+        return sum(points for (_, period), points in deltas.items() if period == ALL_TIME)
+
+    def _drop_old_weeks(self, this_week: str):
+        # Weeks that have left the window are never asked for again; called under the lock
+        for key in [k for k in self._boards if k[0] not in (ALL_TIME, this_week)]:
+            del self._boards[key]
+
+    def _apply(self, deltas: Dict[Tuple[int, str], int]):
+        # Boards are shared with request threads, so they change only under the lock
+        this_week = week_start(utc_timestamp())
+        with self._lock:
+            self._drop_old_weeks(this_week)
+            for (period, class_name), (board, _) in self._boards.items():
+                for (user_id, event_period), points in deltas.items():
+                    # Class boards only follow their members, who are all loaded
+                    if event_period == period and (class_name is None or user_id in board):
+                        board.add(user_id, points)
+
+    def top(self, window: str = ALL_TIME, limit: int = 10, offset: int = 0,
+            class_name: Optional[str] = None) -> List[Dict]:
+        board = self._board(window, class_name)
+        with self._lock:
+            entries = board.top(min(limit, MAX_LIMIT), offset)
+        names = self._names([user_id for _, user_id, _ in entries])
+        return [{"rank": rank, "user_id": user_id, "name": names.get(user_id), "points": points}
+                for rank, user_id, points in entries]
+
+    def rank(self, user_id: int, window: str = ALL_TIME, class_name: Optional[str] = None) -> Dict:
+        board = self._board(window, class_name)
+        with self._lock:
+            return {"user_id": user_id, "rank": board.rank(user_id), "points": board.points(user_id) or 0,
+                    "total": len(board)}
+
+    def _names(self, user_ids: List[int]) -> Dict[int, str]:
+        if not user_ids:
+            return {}
+        rows = get_db_connection(self.db_path).execute(
+            f"SELECT id, name FROM users WHERE id IN ({','.join('?' * len(user_ids))})", user_ids)
+        return {row[0]: row[1] for row in rows}
+
+    def invalidate(self, class_name: Optional[str] = None):
+        """Drops cached boards (a class's after its roster changed, or all), so they reload on next use"""
+        with self._lock:
+            for key in [k for k in self._boards if class_name is None or k[1] == class_name]:
+                del self._boards[key]
+
+
+def rebuild_points(path=None) -> int:
+    """Recomputes leaderboard_points from user_interactions. Returns the number of ranked users."""
+    with db_transaction(path) as conn:
+        conn.execute("DELETE FROM leaderboard_points")
+        conn.execute("""
+            INSERT INTO leaderboard_points (user_id, period, points)
+            SELECT user_id, 'all', SUM(CAST(ROUND(MAX(score, 0)) AS INTEGER))
+            FROM user_interactions
+            WHERE score IS NOT NULL
+            GROUP BY user_id
+        """)
+        conn.execute("""
+            INSERT INTO leaderboard_points (user_id, period, points)
+            SELECT user_id, DATE(timestamp, 'weekday 0', '-6 days'), SUM(CAST(ROUND(MAX(score, 0)) AS INTEGER))
+            FROM user_interactions
+            WHERE score IS NOT NULL
+            GROUP BY user_id, DATE(timestamp, 'weekday 0', '-6 days')
+        """)
+        return conn.execute("SELECT COUNT(*) FROM leaderboard_points WHERE period = 'all'").fetchone()[0]
+
+
+if __name__ == "__main__":
+    # python -m ui.leaderboard rebuild
+    from database.models import init_db
+    if sys.argv[1:] == ["rebuild"]:
+        init_db()
+        print(f"Done: leaderboard points rebuilt for {rebuild_points()} users.")
+    else:
+        print("usage: python -m ui.leaderboard rebuild")
@@ -0,0 +1,222 @@
+"""
+Bulk account import from a class roster, CSV or NDJSON.
+
+The roster is read as a stream, one row at a time, and written in chunks of
+IMPORT_CHUNK rows: passwords are hashed across the password pool, then the
+chunk goes in with one executemany inside its own transaction. A bad row never
+aborts the import. It is reported by row number with the reason, and an email
+that is already registered is caught by the users.email UNIQUE constraint.
+
+Columns (CSV header or JSON keys): name, email, and optionally password, role
+and class. Passwords given in the roster are hashed at full strength, which
+costs real CPU time per row. Rows without one (the fast path for whole
+schools) get no usable password, plus a one-time setup token valid for
+INVITE_TTL. The report lists these tokens; the student follows
+/reset-password?token=... to choose a password.
+
+    python -m user_system.admin import roster.csv [class name]
+"""
+import csv
+import json
+import os
+import secrets
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+
+from database.db_config import db_transaction
+from user_system import roles
+from user_system.passwords import HASHER
+
+IMPORT_CHUNK = int(os.environ.get("ROSTER_IMPORT_CHUNK", 1000))
+IMPORT_MAX_ROWS = int(os.environ.get("ROSTER_IMPORT_MAX_ROWS", 100_000))
+MAX_REPORTED_ERRORS = 1000
+INVITE_TTL = timedelta(days=int(os.environ.get("ROSTER_INVITE_DAYS", 14)))
+FORMATS = ("csv", "ndjson")
+REQUIRED_COLUMNS = ("name", "email")
+
+# Content types a roster upload may be sent as
+_MIMETYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+def roster_format(mimetype: Optional[str] = None, filename: Optional[str] = None) -> Optional[str]:
+    if filename:
+        ext = os.path.splitext(filename)[1].lower()
+        return {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(ext)
+    return _MIMETYPES.get(mimetype)
+
+
+def read_roster(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Yields (row number, fields, error) for each data row, fields keyed by lower-case column"""
+    if fmt == "csv":
+        reader = csv.reader(stream)
+        header = [h.strip().lower() for h in next(reader, [])]
+        missing = [c for c in REQUIRED_COLUMNS if c not in header]
+        if missing:
+            raise ValueError(f"roster header is missing: {', '.join(missing)}")
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            if len(row) > len(header):
+                yield reader.line_num, None, f"expected {len(header)} columns, got {len(row)}"
+            else:
+                yield reader.line_num, dict(zip(header, row)), None
+    elif fmt == "ndjson":
+        for line_num, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+            except ValueError:
+                yield line_num, None, "invalid JSON"
+                continue
+            if isinstance(fields, dict):
+                yield line_num, {str(k).lower(): v for k, v in fields.items()}, None
+            else:
+                yield line_num, None, "expected a JSON object"
+    else:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+
+def _field(fields: Dict, name: str) -> str:
+    value = fields.get(name)
+    return "" if value is None else str(value).strip()
+
+
+def _check_row(fields: Dict, importer_role: str, class_name: Optional[str]) -> Tuple[Optional[Tuple], Optional[str]]:
+    """(name, email, password, role, class) ready to insert, or the reason the row is rejected"""
+    name, email, password = _field(fields, "name"), _field(fields, "email"), _field(fields, "password")
+    role = _field(fields, "role").lower() or roles.STUDENT
+    if not name:
+        return None, "name is required"
+    local, _, domain = email.partition("@")
+    if not local or "." not in domain or " " in email:
+        return None, "invalid email"
+    if role not in roles.ROLES:
+        return None, f"role must be one of {', '.join(roles.ROLES)}"
+    if not roles.can_create(importer_role, role):
+        return None, f"a {importer_role} cannot create {role} accounts"
+    return (name, email, password, role, _field(fields, "class") or class_name), None
+
+
+class RosterImport:
+    """Runs one import and collects its report"""
+    def __init__(self, importer_role: str = roles.ADMIN, class_name: Optional[str] = None, path=None,
+                 chunk: int = IMPORT_CHUNK):
+        if not roles.can_import(importer_role):
+            raise PermissionError(f"a {importer_role} cannot import rosters")
+        self.importer_role = importer_role
+        self.class_name = class_name
+        self.path = path
+        self.chunk = chunk
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.classes = set()
+        self.invites = []
+        self._emails = set()  # seen earlier in this roster
+
+    def fail(self, row_num: int, email: Optional[str], error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_num, "email": email, "error": error})
+
+    def run(self, stream: TextIO, fmt: str) -> Dict:
+        pending = []
+        for row_num, fields, error in read_roster(stream, fmt):
+            if self.created + self.failed + len(pending) >= IMPORT_MAX_ROWS:
+                self.fail(row_num, None, f"roster is limited to {IMPORT_MAX_ROWS} rows; the rest was not read")
+                break
+            row = None
+            if error is None:
+                row, error = _check_row(fields, self.importer_role, self.class_name)
+            if error is None and row[1] in self._emails:
+                error = "email appears earlier in the roster"
+            if error is not None:
+                self.fail(row_num, fields and _field(fields, "email") or None, error)
+                continue
+            self._emails.add(row[1])
+            pending.append((row_num, row))
+            if len(pending) >= self.chunk:
+                self._write(pending)
+                pending = []
+        if pending:
+            self._write(pending)
+        return self.report()
+
+    def _write(self, pending):
+        with_password = [i for i, (_, row) in enumerate(pending) if row[2]]
+        hashed = HASHER.hash_many([pending[i][1][2] for i in with_password])
+        # No password: a random unusable value ("!" never parses as a hash), set through the invite
+        passwords = ["!" + secrets.token_hex(16) for _ in pending]
+        for i, stored in zip(with_password, hashed):
+            passwords[i] = stored
+
+        with db_transaction(self.path) as conn:
+            conn.executemany("""
+                INSERT INTO users (name, email, password, role) VALUES (?, ?, ?, ?)
+                ON CONFLICT(email) DO NOTHING
+            """, [(row[0], row[1], stored, row[3]) for (_, row), stored in zip(pending, passwords)])
+            # Every stored value is salted and unique, so ours is on a row only if this insert made it
+            existing = {r[0]: (r[1], r[2]) for r in conn.execute(
+                "SELECT email, id, password FROM users WHERE email IN (SELECT value FROM json_each(?))",
+                (json.dumps([row[1] for _, row in pending]),))}
+            members, invites = [], []
+            expiry = (datetime.now() + INVITE_TTL).strftime('%Y-%m-%d %H:%M:%S.%f')
+            for (row_num, row), stored in zip(pending, passwords):
+                user_id, current = existing.get(row[1], (None, None))
+                if current != stored:
+                    self.fail(row_num, row[1], "email already registered")
+                    continue
+                self.created += 1
+                if not row[2]:
+                    invites.append((row[1], secrets.token_urlsafe(32), expiry))
+                if row[4]:
+                    members.append((row[4], user_id))
+                    self.classes.add(row[4])
+            conn.executemany("INSERT OR IGNORE INTO class_members (class_name, user_id) VALUES (?, ?)", members)
+            conn.executemany("INSERT INTO reset_tokens (email, token, expiry) VALUES (?, ?, ?)", invites)
+        self.invites += [{"email": email, "token": token} for email, token, _ in invites]
+
+    def report(self) -> Dict:
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "classes": sorted(self.classes),
+            "invites": self.invites,
+        }
+
+
+def import_roster(stream: TextIO, fmt: str, importer_role: str = roles.ADMIN,
+                  class_name: Optional[str] = None, path=None) -> Dict:
+    """Creates the accounts in a roster. Returns counts and per-row errors."""
+    return RosterImport(importer_role, class_name, path).run(stream, fmt)
+
+
+if __name__ == "__main__":
+    # python -m user_system.admin import roster.csv [class name]
+    from database.models import init_db
+    if len(sys.argv) in (3, 4) and sys.argv[1] == "import" and roster_format(filename=sys.argv[2]):
+        init_db()
+        with open(sys.argv[2], encoding="utf-8-sig", newline="") as f:
+            report = import_roster(f, roster_format(filename=sys.argv[2]), class_name=(sys.argv[3:] or [None])[0])
+        for error in report["errors"]:
+            print(f"row {error['row']}: {error['error']} ({error['email']})")
+        if report["invites"]:
+            invites_path = f"{sys.argv[2]}.invites.csv"
+            with open(invites_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["email", "setup_token"])
+                writer.writerows((i["email"], i["token"]) for i in report["invites"])
+            print(f"Setup tokens for {len(report['invites'])} accounts written to {invites_path}")
+        print(f"Done: {report['created']} accounts created, {report['failed']} rows rejected.")
+    else:
+        print("usage: python -m user_system.admin import roster.csv|roster.ndjson [class name]")
@@ -1,54 +1,65 @@
+import os
 import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
 from pathlib import Path
 import secrets
 from datetime import datetime, timedelta
-from database.db_config import get_db_connection
+from database.db_config import get_db_connection, db_transaction
+from user_system.passwords import HASHER
+from simulations.result_cache import TTLCache
+
+# Read-through cache of profiles by email: the dashboard asks on every load.
+# Register and password reset drop the entry; the TTL bounds edits made elsewhere.
+PROFILE_CACHE = TTLCache(maxsize=int(os.environ.get("PROFILE_CACHE_SIZE", 4096)),
+                         ttl=float(os.environ.get("PROFILE_CACHE_TTL", 300)))
 
 def register_user(name, email, password, role):
-    hashed_pw = generate_password_hash(password)
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Hashing runs in the process pool; HashQueueFull propagates so the route can answer 503
+    hashed_pw = HASHER.hash(password)
 
     try:
-        cursor.execute('''
-            INSERT INTO users (name, email, password, role)
-            VALUES (?, ?, ?, ?)
-        ''', (name, email, hashed_pw, role))
-        conn.commit()
+        with db_transaction() as conn:
+            conn.execute('''
+                INSERT INTO users (name, email, password, role)
+                VALUES (?, ?, ?, ?)
+            ''', (name, email, hashed_pw, role))
+        PROFILE_CACHE.pop(email)
         print("Inserting user:", name, email, role)
         return True
     except sqlite3.IntegrityError:
         print("User with this email already exist")
         return False  # email already exists
-    finally:
-        conn.close()
 
 def validate_user(email, password):
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT password FROM users WHERE email = ?', (email,))
-    row = cursor.fetchone()
-    conn.close()
-
-    if row and check_password_hash(row['password'], password):
-        return True
-    return False
+    row = conn.execute('SELECT password FROM users WHERE email = ?', (email,)).fetchone()
+    if not row:
+        return False
+
+    valid, new_hash = HASHER.verify(row['password'], password)
+    if new_hash:
+        # Stored with older hash parameters: upgrade while we have the password
+        with db_transaction() as conn:
+            conn.execute('UPDATE users SET password = ? WHERE email = ? AND password = ?',
+                         (new_hash, email, row['password']))
+    return valid
 
 def get_user_by_email(email):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    user = PROFILE_CACHE.get(email)
+    if user is not None:
+        return dict(user)
 
-    cursor.execute('SELECT name, email, role FROM users WHERE email = ?', (email,))
-    row = cursor.fetchone()
-    conn.close()
+    conn = get_db_connection()
+    row = conn.execute('SELECT id, name, email, role FROM users WHERE email = ?', (email,)).fetchone()
 
     if row:
-        return {
+        user = {
+            "id": row['id'],
             "name": row['name'],
             "email": row['email'],
             "role": row['role']
         }
+        PROFILE_CACHE.set(email, user)
+        return dict(user)
     return None
 
 def create_reset_token(email):
@@ -59,20 +70,14 @@ def create_reset_token(email):
     token = secrets.token_urlsafe(32)
     expiry = datetime.now() + timedelta(hours=1)
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO reset_tokens (email, token, expiry) VALUES (?, ?, ?)', (email, token, expiry))
-    conn.commit()
-    conn.close()
+    with db_transaction() as conn:
+        conn.execute('INSERT INTO reset_tokens (email, token, expiry) VALUES (?, ?, ?)', (email, token, expiry))
     
     return token
 
 def verify_reset_token(token):
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT email, expiry FROM reset_tokens WHERE token = ?', (token,))
-    result = cursor.fetchone()
-    conn.close()
+    result = conn.execute('SELECT email, expiry FROM reset_tokens WHERE token = ?', (token,)).fetchone()
 
     if not result:
         return None, "Invalid or expired token"
@@ -96,13 +101,11 @@ def perform_password_reset(token, new_password):
     if error:
         return False, error
     
-    hashed_pw = generate_password_hash(new_password)
+    hashed_pw = HASHER.hash(new_password)
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('UPDATE users SET password = ? WHERE email = ?', (hashed_pw, email))
-    cursor.execute('DELETE FROM reset_tokens WHERE token = ?', (token,))
-    conn.commit()
-    conn.close()
+    with db_transaction() as conn:
+        conn.execute('UPDATE users SET password = ? WHERE email = ?', (hashed_pw, email))
+        conn.execute('DELETE FROM reset_tokens WHERE token = ?', (token,))
+    PROFILE_CACHE.pop(email)
     
     return True, "Password updated successfully"
@@ -0,0 +1,137 @@
+"""
+Password hashing off the request threads.
+
+Hashes are computed in a small process pool, so a burst of logins burns CPU
+in worker processes instead of holding every web thread (and the GIL) while
+other routes wait. At most HASH_MAX_PENDING hashes may be queued or running;
+beyond that callers get HashQueueFull at once and the route answers 503,
+rather than letting a login storm queue without bound.
+
+The method is configurable (PASSWORD_HASH_METHOD, any werkzeug method such as
+"scrypt:32768:8:1" or "pbkdf2:sha256:1000000"). Stored hashes made with other
+parameters still verify, and are upgraded on the user's next login.
+"""
+import atexit
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# 0 hashes on the calling thread (scripts, single-process tools)
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 32))
+HASH_TIMEOUT = 30.0  # seconds
+HASH_BATCH = 64  # passwords per pool task in hash_many
+
+
+class HashQueueFull(Exception):
+    """Too many hashes are already queued; try again shortly"""
+
+
+def hash_method(stored: str) -> str:
+    # werkzeug hashes are "method$salt$hash"
+    return stored.split("$", 1)[0]
+
+
+def _hash_all(passwords: List[str], method: str) -> List[str]:
+    return [generate_password_hash(p, method) for p in passwords]
+
+
+def _verify_and_upgrade(stored: str, password: str, method: str) -> Tuple[bool, Optional[str]]:
+    # One round trip to the pool: verify, and rehash while the password is at hand
+    if not check_password_hash(stored, password):
+        return False, None
+    if hash_method(stored) != method:
+        return True, generate_password_hash(password, method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self, method: str = HASH_METHOD, workers: int = HASH_WORKERS,
+                 max_pending: int = HASH_MAX_PENDING, timeout: float = HASH_TIMEOUT):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self.rejected = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a multi-threaded server process can deadlock the child
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+                atexit.register(self.shutdown)
+            return self._pool
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashQueueFull("Too many sign-ins in progress, try again in a moment")
+        try:
+            return self._executor().submit(fn, *args).result(self.timeout)
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords: List[str], method: Optional[str] = None) -> List[str]:
+        """
+        Hashes a batch (bulk imports) in HASH_BATCH chunks across the pool, in order.
+        Each chunk in flight holds a max_pending slot like any other hash, and at most one
+        chunk per worker is queued, so sign-ins meanwhile wait behind a few short chunks.
+        Unlike a sign-in, a batch waits up to `timeout` for a slot before HashQueueFull.
+        """
+        method = method or self.method
+        if self.workers <= 0:
+            return _hash_all(passwords, method)
+        executor = self._executor()
+        hashed, pending = [], deque()
+
+        def collect():
+            try:
+                return pending.popleft().result(self.timeout)
+            finally:
+                self._slots.release()
+
+        try:
+            for start in range(0, len(passwords), HASH_BATCH):
+                if len(pending) >= self.workers:
+                    hashed += collect()
+                if not self._slots.acquire(timeout=self.timeout):
+                    self.rejected += 1
+                    raise HashQueueFull("Password hashing is saturated, try the import again shortly")
+                pending.append(executor.submit(_hash_all, passwords[start:start + HASH_BATCH], method))
+            while pending:
+                hashed += collect()
+        finally:
+            while pending:
+                pending.popleft().cancel()
+                self._slots.release()
+        return hashed
+
+    def verify(self, stored: str, password: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash if the stored one used other parameters)"""
+        return self._run(_verify_and_upgrade, stored, password, self.method)
+
+    def needs_rehash(self, stored: str) -> bool:
+        return hash_method(stored) != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+HASHER = PasswordHasher()
@@ -0,0 +1,26 @@
+"""
+Account roles (the users.role CHECK constraint) and what each may manage.
+"""
+STUDENT = "student"
+TEACHER = "teacher"
+ADMIN = "admin"
+ROLES = (STUDENT, TEACHER, ADMIN)
+STAFF_ROLES = (TEACHER, ADMIN)
+
+# Roles whose accounts each role may create in a roster import
+CREATABLE_ROLES = {
+    TEACHER: (STUDENT,),
+    ADMIN: ROLES,
+}
+
+
+def is_staff(role: str) -> bool:
+    return role in STAFF_ROLES
+
+
+def can_import(role: str) -> bool:
+    return role in CREATABLE_ROLES
+
+
+def can_create(role: str, new_role: str) -> bool:
+    return new_role in CREATABLE_ROLES.get(role, ())
@@ -0,0 +1,78 @@
+"""
+Stateless session tokens.
+
+Login hands out a signed, timestamped token carrying the user's id, email and
+role. Every request verifies it with an HMAC check and the expiry in memory,
+so protected routes know who is calling without a database round-trip, and
+any worker holding the same secret can verify tokens issued by any other.
+
+The secret comes from SECRET_KEY; without it one is generated on first use
+and kept next to the database so restarts and sibling workers share it.
+Being stateless, a token stays valid until it expires (SESSION_MAX_AGE):
+changing the password does not revoke sessions already issued.
+"""
+import os
+import secrets
+from pathlib import Path
+from typing import Dict, Optional
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from database.db_config import BASE_DIR
+from user_system import roles
+
+SECRET_PATH = Path(os.environ.get("SESSION_SECRET_PATH", BASE_DIR / "session_secret"))
+SESSION_MAX_AGE = int(os.environ.get("SESSION_MAX_AGE", 12 * 3600))  # seconds
+
+
+def _load_secret(path: Path = SECRET_PATH) -> str:
+    if os.environ.get("SECRET_KEY"):
+        return os.environ["SECRET_KEY"]
+    if not path.exists():
+        # Written in full to a private file, then linked into place: the link fails if another
+        # worker got there first, and nobody ever sees a partly written secret
+        tmp = Path(f"{path}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink()
+    secret = path.read_text().strip()
+    if not secret:
+        raise RuntimeError(f"Session secret {path} is empty; delete it or set SECRET_KEY")
+    return secret
+
+
+class SessionTokens:
+    def __init__(self, secret: Optional[str] = None, max_age: int = SESSION_MAX_AGE):
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret or _load_secret(), salt="session")
+
+    def issue(self, user: Dict) -> str:
+        return self._serializer.dumps({"id": user["id"], "email": user["email"], "role": user["role"]})
+
+    def verify(self, token: Optional[str]) -> Optional[Dict]:
+        """The session a token carries, or None if it is missing, forged or expired"""
+        if not token:
+            return None
+        try:
+            return self._serializer.loads(token, max_age=self.max_age)
+        except (SignatureExpired, BadSignature):
+            return None
+
+
+def bearer_token(header: Optional[str]) -> Optional[str]:
+    # "Authorization: Bearer <token>"
+    scheme, _, token = (header or "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" else None
+
+
+def is_staff(session: Dict) -> bool:
+    return roles.is_staff(session.get("role"))
+
+
+SESSIONS = SessionTokens()